@@ -1,19 +1,140 @@
-from fastapi import FastAPI, HTTPException
+import os
+import json
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, FileResponse, Response
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
-from module.script import generate_ad_script
-from utils.db_config import store_script_in_db
+from typing import List, Dict, Any, Literal, Optional, Iterator, AsyncIterator
+from modules.script import generate_ad_script, stream_ad_script, cached_ad_script
+from modules.script_cache import get_script_cache, SCRIPT_CACHE_SEMANTIC
+from modules.jobs import get_job_manager, shutdown_job_manager
+from modules.rate_limit import get_rate_limiter
+from utils.metrics import REGISTRY, CONTENT_TYPE, HTTP_SECONDS, JOBS, record_rate_limiters, trace_context, trace, timed
+from utils.prompt import warm_prompts
+from utils.db_config import (
+    store_script_in_db,
+    init_db_pool,
+    close_db_pool,
+    start_script_writer,
+    stop_script_writer,
+)
+
+# Index the scripts already in Postgres into the semantic cache at startup
+SCRIPT_CACHE_WARM_FROM_DB = os.getenv("SCRIPT_CACHE_WARM_FROM_DB", "0") == "1"
+# Campaign ideas accepted per batch request, and how many are generated at once;
+# the shared Groq rate limiter decides how fast they actually go out
+BATCH_MAX_IDEAS = int(os.getenv("BATCH_MAX_IDEAS", "100"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "8"))
+# How often the job event stream checks for new progress
+JOB_POLL_INTERVAL_S = float(os.getenv("JOB_POLL_INTERVAL_S", "0.5"))
+# Build prompts, LLM chains, the pipeline graph and embedding models in the
+# background at startup, instead of on the first request that needs them
+APP_WARMUP = os.getenv("APP_WARMUP", "0") == "1"
+
+def _warm_script_cache():
+    cache = get_script_cache()
+    if cache is None:
+        return
+    try:
+        # Load the embedding model here rather than on the first script request
+        cache.warm()
+    except Exception as e:
+        print(f"Could not load the script cache embedding model, the semantic tier will load it on first use: {e}")
+    if not SCRIPT_CACHE_WARM_FROM_DB:
+        return
+    try:
+        print(f"Indexed {cache.warm_from_db()} stored script(s) for the script cache")
+    except Exception as e:
+        print(f"Could not warm the script cache from the database: {e}")
+
+def _warm_pipeline():
+    # Importing trim pulls in the graph, ffmpeg and the downloader
+    import trim  # noqa: F401
+    from graph.pipeline import get_pipeline
+    from graph.nodes.script_generator import get_script_chain
+    from graph.nodes.video_finder_node import get_search_chain, get_rank_chain
+    for getter in (get_pipeline, get_script_chain, get_search_chain, get_rank_chain):
+        getter()
+
+def _warm_models():
+    from modules.reranker import RANKER_MODE
+    from modules.keywords import get_keyword_extractor, SEARCH_TERMS_BACKEND
+    from utils.embeddings import get_sentence_model
+    # Only load models that are configured to be used
+    if SEARCH_TERMS_BACKEND != "llm":
+        get_keyword_extractor().warm()
+    elif RANKER_MODE == "embedding":
+        get_sentence_model()
+    if RANKER_MODE == "visual":
+        from modules.visual_reranker import get_visual_reranker
+        get_visual_reranker().warm()
+
+def _warmup():
+    """Builds lazily initialized clients and models, one component at a time."""
+    for component, warm in (("prompts", warm_prompts), ("pipeline", _warm_pipeline), ("models", _warm_models)):
+        try:
+            with timed("warmup", component=component):
+                warm()
+        except Exception as e:
+            print(f"Warmup of {component} failed, it will be built on first use: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Opens the database pool and background writer; drains them on shutdown."""
+    try:
+        init_db_pool()
+    except Exception as e:
+        print(f"Database pool unavailable, writes will open their own connections: {e}")
+    start_script_writer()
+    if SCRIPT_CACHE_SEMANTIC or SCRIPT_CACHE_WARM_FROM_DB:
+        threading.Thread(target=_warm_script_cache, name="script-cache-warmup", daemon=True).start()
+    if APP_WARMUP:
+        # Runs while the server already accepts requests; anything not warm
+        # yet is built by the first request that needs it
+        threading.Thread(target=_warmup, name="app-warmup", daemon=True).start()
+    yield
+    shutdown_job_manager(wait=False)
+    stop_script_writer()
+    close_db_pool()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Video Ad Script Generator API",
     description="API for generating creative ad scripts using LLM",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Times every request and tags its trace events with the request id."""
+    request_id = request.headers.get("X-Request-ID")
+    with trace_context(request_id) as trace_id:
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            duration = time.perf_counter() - start
+            # Label by route template so /jobs/{job_id} stays one series
+            route = request.scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_SECONDS.observe(duration, method=request.method, route=path, status=status)
+            trace("http", method=request.method, route=path, status=status, duration_s=round(duration, 6))
+    response.headers["X-Request-ID"] = trace_id
+    return response
+
 # Define request and response models
 class ScriptRequest(BaseModel):
     campaign_idea: str = Field(..., description="The campaign idea or concept for the ad")
+    bypass_cache: bool = Field(False, description="Always generate a fresh script instead of reusing a cached one")
     
 class SceneModel(BaseModel):
     scene: int
@@ -25,6 +146,7 @@ class SceneModel(BaseModel):
 class ScriptResponse(BaseModel):
     campaign_idea: str
     script: List[Dict[str, Any]]
+    cache: Optional[str] = Field(None, description="\"exact\" or \"semantic\" when served from the script cache")
     
 # Root endpoint
 @app.get("/")
@@ -38,23 +160,243 @@ async def create_script(request: ScriptRequest):
     """
     Generate an ad script based on the provided campaign idea.
     
-    The script is generated using an LLM and stored in the database.
+    The script is generated using an LLM and stored in the database, unless
+    a script for the same or a very similar idea is already cached.
     """
     try:
-        # Generate the script using the LLM
-        script = generate_ad_script(request.campaign_idea)
-        
-        # Store the script in the database
-        store_script_in_db(request.campaign_idea, script)
+        # The cache, LLM and database calls block, so run them off the event loop
+        script, cache_tier = None, None
+        if not request.bypass_cache:
+            script, cache_tier = await run_in_threadpool(cached_ad_script, request.campaign_idea)
+
+        if script is None:
+            # Generate the script using the LLM
+            script = await run_in_threadpool(generate_ad_script, request.campaign_idea, bypass_cache=True)
+
+            # Queue the script for the background database writer
+            await run_in_threadpool(store_script_in_db, request.campaign_idea, script)
         
         # Return the response
         return {
             "campaign_idea": request.campaign_idea,
-            "script": script
+            "script": script,
+            "cache": cache_tier
         }
+    except queue.Full:
+        raise HTTPException(status_code=503, detail="Database writer is overloaded, please retry")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating script: {str(e)}")
 
+class BatchScriptRequest(BaseModel):
+    campaign_ideas: List[str] = Field(..., min_length=1, description="Campaign ideas to write scripts for")
+    bypass_cache: bool = Field(False, description="Always generate fresh scripts instead of reusing cached ones")
+
+class BatchScriptResult(BaseModel):
+    campaign_idea: str
+    script: Optional[List[Dict[str, Any]]] = None
+    cache: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchScriptResponse(BaseModel):
+    results: List[BatchScriptResult]
+    succeeded: int
+    failed: int
+
+def _script_for_batch(campaign_idea: str, bypass_cache: bool) -> Dict[str, Any]:
+    try:
+        script, cache_tier = None, None
+        if not bypass_cache:
+            script, cache_tier = cached_ad_script(campaign_idea)
+        if script is None:
+            script = generate_ad_script(campaign_idea, bypass_cache=True)
+            store_script_in_db(campaign_idea, script)
+        return {"campaign_idea": campaign_idea, "script": script, "cache": cache_tier}
+    except queue.Full:
+        return {"campaign_idea": campaign_idea, "error": "Database writer is overloaded"}
+    except Exception as e:
+        return {"campaign_idea": campaign_idea, "error": f"Error generating script: {str(e)}"}
+
+def _generate_batch(campaign_ideas: List[str], bypass_cache: bool) -> List[Dict[str, Any]]:
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch") as pool:
+        return list(pool.map(lambda idea: _script_for_batch(idea, bypass_cache), campaign_ideas))
+
+# Batch script generation endpoint
+@app.post("/generate-script/batch", response_model=BatchScriptResponse)
+async def create_scripts_batch(request: BatchScriptRequest):
+    """
+    Generate scripts for many campaign ideas in one request.
+
+    Ideas are generated concurrently, but every Groq call goes through the
+    shared rate limiter, so a large batch is paced to the account's request
+    and token limits instead of failing on 429s. Each idea succeeds or fails
+    on its own; results come back in request order.
+    """
+    if len(request.campaign_ideas) > BATCH_MAX_IDEAS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_IDEAS} campaign ideas per batch")
+
+    results = await run_in_threadpool(_generate_batch, request.campaign_ideas, request.bypass_cache)
+    failed = sum(1 for r in results if r.get("error"))
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
+
+def _sse(event: str, data: Any) -> str:
+    """Formats one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _stream_script_events(campaign_idea: str, bypass_cache: bool = False) -> Iterator[str]:
+    if not bypass_cache:
+        script, cache_tier = cached_ad_script(campaign_idea)
+        if script is not None:
+            for scene in script:
+                yield _sse("scene", scene)
+            yield _sse("done", {"campaign_idea": campaign_idea, "scene_count": len(script), "cache": cache_tier})
+            return
+
+    scenes = []
+    try:
+        for scene in stream_ad_script(campaign_idea):
+            scenes.append(scene)
+            yield _sse("scene", scene)
+    except Exception as e:
+        yield _sse("error", {"detail": f"Error generating script: {str(e)}"})
+        return
+
+    # Store the complete script once every scene has been sent
+    try:
+        store_script_in_db(campaign_idea, scenes)
+    except queue.Full:
+        print(f"Dropped streamed script for '{campaign_idea}': database writer is overloaded")
+    yield _sse("done", {"campaign_idea": campaign_idea, "scene_count": len(scenes), "cache": None})
+
+# Streaming script generation endpoint
+@app.post("/generate-script/stream")
+async def create_script_stream(request: ScriptRequest):
+    """
+    Generate an ad script and stream it as server-sent events.
+
+    Emits a `scene` event as soon as each scene is complete, so clients can
+    start searching for scene 1's footage while later scenes are still being
+    written, then a final `done` event (or an `error` event).
+    """
+    # Starlette iterates sync generators in its threadpool, so the blocking
+    # stream never runs on the event loop
+    return StreamingResponse(
+        _stream_script_events(request.campaign_idea, request.bypass_cache),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+class JobRequest(ScriptRequest):
+    ranker: Optional[Literal["llm", "embedding", "visual"]] = Field(None, description="Defaults to VIDEO_RANKER")
+    target_resolution: Optional[str] = Field(None, description="Output resolution, e.g. \"1920x1080\"")
+    assignment: Optional[Literal["scene", "script"]] = Field(None, description="Defaults to CLIP_ASSIGNMENT")
+    assembly: Optional[Literal["copy", "render"]] = Field(None, description="\"render\" burns in on-screen text; defaults to ASSEMBLY_MODE")
+    tts_backend: Optional[Literal["elevenlabs", "playht", "stub", "none"]] = Field(None, description="Voice-over backend; defaults to TTS_BACKEND")
+
+class JobStatus(BaseModel):
+    job_id: str
+    campaign_idea: str
+    status: str
+    stage: Optional[str] = None
+    output_path: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+def _get_job_or_404(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return job
+
+# Full script-to-video job endpoints
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+async def create_job(request: JobRequest):
+    """
+    Queue a full run: script, clip search, download, trim and assembly.
+
+    Returns immediately with the job id; poll `GET /jobs/{job_id}` or stream
+    `GET /jobs/{job_id}/events` for progress.
+    """
+    options = request.model_dump(exclude={"campaign_idea"}, exclude_none=True)
+    try:
+        job = get_job_manager().submit(request.campaign_idea, **options)
+    except queue.Full:
+        raise HTTPException(status_code=503, detail="Too many jobs in progress, please retry")
+    return job.to_dict()
+
+@app.post("/jobs/{job_id}/resume", response_model=JobStatus, status_code=202)
+async def resume_job(job_id: str):
+    """
+    Rerun a failed job under the same id.
+
+    The saved script and every clip already found are reused, so only the
+    stages that failed cost LLM and Pixabay calls again. Works across
+    restarts when checkpoints are stored in SQLite.
+    """
+    try:
+        # A job unknown to this process is rebuilt from its checkpoint, which reads SQLite
+        job = await run_in_threadpool(get_job_manager().resume, job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except queue.Full:
+        raise HTTPException(status_code=503, detail="Too many jobs in progress, please retry")
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Current status and stage of a job."""
+    return _get_job_or_404(job_id).to_dict()
+
+async def _job_events(job_id: str) -> AsyncIterator[str]:
+    manager = get_job_manager()
+    seq = 0
+    while True:
+        job = manager.get(job_id)
+        if job is None:
+            return
+        finished = job.finished
+        for event in manager.events_since(job_id, seq):
+            seq = event["seq"] + 1
+            yield _sse("progress", event)
+        if finished:
+            yield _sse("done", job.to_dict())
+            return
+        await asyncio.sleep(JOB_POLL_INTERVAL_S)
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Stream a job's progress as server-sent events.
+
+    Replays every `progress` event so far (one per stage start/finish), keeps
+    streaming new ones, and ends with a `done` event carrying the final status.
+    """
+    _get_job_or_404(job_id)
+    return StreamingResponse(
+        _job_events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/jobs/{job_id}/video")
+async def get_job_video(job_id: str):
+    """Download the finished ad."""
+    job = _get_job_or_404(job_id)
+    if job.status != "succeeded" or not job.output_path:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}, no video available")
+    return FileResponse(job.output_path, media_type="video/mp4", filename=os.path.basename(job.output_path))
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for the API process."""
+    record_rate_limiters({name: get_rate_limiter(name).stats() for name in ("groq", "pixabay")})
+    for status, count in get_job_manager().counts().items():
+        JOBS.set(count, status=status)
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 # Run the application with uvicorn
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,42 @@
+import os
+from typing import Dict, Tuple
+import ffmpeg
+
+# Pixabay's rendition names and the sizes the synthetic clips are rendered at
+RENDITION_SIZES: Dict[str, Tuple[int, int]] = {
+    "large": (1920, 1080),
+    "medium": (1280, 720),
+    "small": (960, 540),
+    "tiny": (640, 360),
+}
+
+
+def make_clip(path: str, width: int, height: int, duration_s: float = 6.0, fps: int = 30):
+    """
+    Renders a small H.264/AAC test clip: ffmpeg's test pattern plus a sine tone.
+    """
+    video = ffmpeg.input(f"testsrc2=size={width}x{height}:rate={fps}:duration={duration_s}", f="lavfi")
+    audio = ffmpeg.input(f"sine=frequency=440:sample_rate=44100:duration={duration_s}", f="lavfi")
+    (
+        ffmpeg
+        .output(video, audio, path, vcodec="libx264", preset="ultrafast", pix_fmt="yuv420p",
+                acodec="aac", ac=2, g=fps, movflags="+faststart")
+        .run(quiet=True, overwrite_output=True)
+    )
+
+
+def make_rendition_clips(clips_dir: str, duration_s: float = 6.0) -> Dict[str, str]:
+    """
+    Creates one synthetic clip per Pixabay rendition, reusing existing ones.
+
+    Returns:
+        {rendition name: path}
+    """
+    os.makedirs(clips_dir, exist_ok=True)
+    paths = {}
+    for rendition, (width, height) in RENDITION_SIZES.items():
+        path = os.path.join(clips_dir, f"{rendition}.mp4")
+        if not os.path.exists(path):
+            make_clip(path, width, height, duration_s)
+        paths[rendition] = path
+    return paths
@@ -0,0 +1,176 @@
+import json
+import re
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# Scenes returned for every script request; their descriptions match the
+# queries recorded in fixtures/pixabay_videos.json
+FAKE_SCENES: List[Dict[str, Any]] = [
+    {
+        "scene": 1,
+        "duration": "3s",
+        "visual_description": "Waves roll onto a sunny beach as the camera glides over the sand.",
+        "dialogue": "Escape starts here.",
+        "on_screen_text": "Summer, reimagined",
+        "search_query": "sunny beach waves",
+    },
+    {
+        "scene": 2,
+        "duration": "3s",
+        "visual_description": "A busy city street at night, neon signs reflecting on wet asphalt.",
+        "dialogue": "The city never sleeps.",
+        "on_screen_text": "Stay curious",
+        "search_query": "city street night",
+    },
+    {
+        "scene": 3,
+        "duration": "3s",
+        "visual_description": "Friends hike up a green mountain trail at sunrise.",
+        "dialogue": "Neither do we.",
+        "on_screen_text": "Go further",
+        "search_query": "mountain hiking sunrise",
+    },
+]
+
+
+def fake_completion(messages: List[Dict[str, str]]) -> str:
+    """
+    Picks a canned answer by recognising which of the app's prompts was sent.
+    """
+    text = "\n".join(m.get("content", "") for m in messages)
+    if "Each scene needs its own clip" in text:
+        # Script-level assignment: every scene ranks its first allowed candidates
+        rankings = {}
+        for scene_id, allowed in re.findall(r"^(\w+): .*; allowed: ([\d, ]+)$", text, re.MULTILINE):
+            rankings[scene_id] = [int(i) for i in allowed.split(",")[:3]]
+        return json.dumps({"rankings": rankings})
+    if "ad scriptwriter" in text:
+        if any(m.get("role") == "system" for m in messages):
+            # modules.script expects a bare JSON array of scenes
+            return json.dumps(FAKE_SCENES)
+        # The LangGraph node parses ScriptOutput
+        return json.dumps({"scenes": [
+            {**{k: v for k, v in s.items() if k != "scene"}, "scene_id": s["scene"]} for s in FAKE_SCENES
+        ]})
+    if "THE SINGLE BEST" in text:
+        return json.dumps({"best_index": 0})
+    for scene in FAKE_SCENES:
+        if scene["visual_description"] in text:
+            return json.dumps({"queries": [scene["search_query"]]})
+    return json.dumps({"queries": ["nature landscape"]})
+
+
+class FakeGroqServer:
+    """
+    Local OpenAI-compatible chat-completions endpoint.
+
+    Each response waits `latency_s`, then "generates" its completion at
+    `tokens_per_s` (~4 characters per token), so benchmarks see realistic
+    time-to-first-token and generation time without calling Groq. Both plain
+    and `stream: true` requests are supported.
+    """
+
+    def __init__(self, latency_s: float = 0.05, tokens_per_s: float = 2000.0, port: int = 0):
+        """
+        Args:
+            latency_s: Delay before the first token
+            tokens_per_s: Generation speed
+            port: Port to bind on 127.0.0.1 (0 picks a free one)
+        """
+        self.latency_s = latency_s
+        self.tokens_per_s = tokens_per_s
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def completions_url(self) -> str:
+        return f"{self.base_url}/openai/v1/chat/completions"
+
+    def start(self) -> "FakeGroqServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-groq", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; without this, delayed
+            # ACKs add ~40 ms to every response
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with fake._lock:
+                    fake.requests += 1
+
+                content = fake_completion(body.get("messages", []))
+                time.sleep(fake.latency_s)
+                if body.get("stream"):
+                    self._stream(body, content)
+                else:
+                    time.sleep(len(content) / 4 / fake.tokens_per_s)
+                    self._send_json(body, content)
+
+            def _send_json(self, body: Dict[str, Any], content: str):
+                payload = json.dumps({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4,
+                        "completion_tokens": len(content) // 4,
+                        "total_tokens": 0,
+                    },
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body: Dict[str, Any], content: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                # One chunk per ~4 tokens keeps the event count reasonable
+                step = 16
+                for i in range(0, len(content), step):
+                    piece = content[i:i + step]
+                    time.sleep(len(piece) / 4 / fake.tokens_per_s)
+                    chunk = {"choices": [{"index": 0, "delta": {"content": piece}}], "model": body.get("model")}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import zlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse, parse_qs
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "pixabay_videos.json")
+
+
+class FakePixabayServer:
+    """
+    Local stand-in for Pixabay's `/api/videos/` endpoint and its video CDN.
+
+    Search responses come from recorded fixtures keyed by query; any other
+    query gets one of the recorded responses, chosen deterministically. Clip
+    and thumbnail URLs in the fixtures use a `{base_url}` placeholder and are
+    served from `clips_dir`, with HTTP Range support for resumable downloads
+    and remote trimming. File sizes in the responses are the real sizes of
+    the served clips.
+    """
+
+    def __init__(self, clips_dir: str, fixtures_path: str = FIXTURES_PATH, latency_s: float = 0.02, port: int = 0):
+        """
+        Args:
+            clips_dir: Directory containing `<rendition>.mp4` synthetic clips
+            fixtures_path: Recorded search responses
+            latency_s: Delay added to every search response
+            port: Port to bind on 127.0.0.1 (0 picks a free one)
+        """
+        self.clips_dir = clips_dir
+        self.latency_s = latency_s
+        self.searches = 0
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+        with open(fixtures_path) as f:
+            self.fixtures: Dict[str, Any] = json.load(f)["responses"]
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def videos_url(self) -> str:
+        return f"{self.base_url}/api/videos/"
+
+    def start(self) -> "FakePixabayServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-pixabay", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def response_for(self, query: str, page: int, per_page: int) -> Dict[str, Any]:
+        """Builds the search response for a query from the fixtures."""
+        key = query.strip().lower()
+        if key not in self.fixtures:
+            keys = sorted(self.fixtures)
+            key = keys[zlib.crc32(key.encode()) % len(keys)]
+        recorded = self.fixtures[key]
+
+        start = (page - 1) * per_page
+        hits = json.loads(json.dumps(recorded["hits"][start:start + per_page]).replace("{base_url}", self.base_url))
+        for hit in hits:
+            for rendition in hit["videos"].values():
+                path = os.path.join(self.clips_dir, os.path.basename(urlparse(rendition["url"]).path))
+                if os.path.exists(path):
+                    rendition["size"] = os.path.getsize(path)
+        return {"total": recorded["total"], "totalHits": recorded["totalHits"], "hits": hits}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; without this, delayed
+            # ACKs add ~40 ms to every response
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._serve(head=False)
+
+            def do_HEAD(self):
+                self._serve(head=True)
+
+            def _serve(self, head: bool):
+                url = urlparse(self.path)
+                if url.path.rstrip("/") == "/api/videos":
+                    self._search(parse_qs(url.query))
+                elif url.path.startswith("/clips/"):
+                    self._clip(os.path.basename(url.path), head)
+                else:
+                    self.send_error(404)
+
+            def _search(self, params: Dict[str, Any]):
+                if not params.get("key"):
+                    self.send_error(400, "missing key")
+                    return
+                with fake._lock:
+                    fake.searches += 1
+                time.sleep(fake.latency_s)
+                body = json.dumps(fake.response_for(
+                    params.get("q", [""])[0],
+                    int(params.get("page", ["1"])[0]),
+                    int(params.get("per_page", ["20"])[0]),
+                )).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _clip(self, name: str, head: bool):
+                path = os.path.join(fake.clips_dir, name)
+                if not os.path.exists(path):
+                    self.send_error(404)
+                    return
+                size = os.path.getsize(path)
+                start, end = 0, size - 1
+                status = 200
+                range_header = self.headers.get("Range")
+                if range_header and range_header.startswith("bytes="):
+                    first, _, last = range_header[len("bytes="):].partition("-")
+                    start = int(first) if first else 0
+                    end = min(int(last), size - 1) if last else size - 1
+                    if start >= size:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{size}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    status = 206
+
+                self.send_response(status)
+                self.send_header("Content-Type", "video/mp4")
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(end - start + 1))
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                self.end_headers()
+                if head:
+                    return
+                with open(path, "rb") as f:
+                    f.seek(start)
+                    remaining = end - start + 1
+                    while remaining > 0:
+                        chunk = f.read(min(remaining, 256 * 1024))
+                        if not chunk:
+                            break
+                        try:
+                            self.wfile.write(chunk)
+                        except (BrokenPipeError, ConnectionResetError):
+                            return
+                        remaining -= len(chunk)
+                with fake._lock:
+                    fake.bytes_served += end - start + 1 - remaining
+
+        return Handler
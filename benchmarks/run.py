@@ -0,0 +1,360 @@
+"""
+Hermetic benchmark of every pipeline stage against local Groq and Pixabay
+stand-ins.
+
+    python -m benchmarks.run                                # run and compare with benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --stages script search --iterations 50 --output results.json
+    python -m benchmarks.run --stages script --compare-terms    # also compare KeyBERT and LLM search terms
+
+Exits with status 1 if any stage regressed beyond --tolerance.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+
+# ——— CONFIG ———
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "10"))
+DEFAULT_TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "0.25"))
+STAGES = ("script", "search", "rank", "download", "trim", "pipeline")
+PROMPT = "Promote a summer travel pass for beaches, cities and mountains."
+
+
+@dataclass
+class StageResult:
+    name: str
+    iterations: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    mean_ms: float
+    throughput_per_s: float     # completed iterations per second of measured time
+    peak_rss_mb: float          # this process only; ffmpeg children are not included
+
+
+class RSSSampler:
+    """
+    Tracks this process's peak resident set size while active, sampling
+    /proc/self/statm. Falls back to the lifetime peak where /proc is missing.
+    """
+
+    def __init__(self, interval_s: float = 0.005):
+        self.interval_s = interval_s
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def _current(self) -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self._page_size
+        except OSError:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Linux reports KiB, macOS bytes
+            return peak if sys.platform == "darwin" else peak * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, self._current())
+            self._stop.wait(self.interval_s)
+
+    def __enter__(self) -> "RSSSampler":
+        self.peak_bytes = self._current()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self._current())
+
+
+def measure(name: str, fn: Callable[[int], Any], iterations: int,
+            setup: Optional[Callable[[int], Any]] = None) -> StageResult:
+    """
+    Times `fn(i)` for each iteration; `setup(i)`, if given, runs untimed before
+    each call and its return value is passed to `fn` instead of `i`.
+    """
+    latencies: List[float] = []
+    errors = 0
+    with RSSSampler() as rss:
+        for i in range(iterations):
+            arg = setup(i) if setup else i
+            start = time.perf_counter()
+            try:
+                fn(arg)
+            except Exception as e:
+                errors += 1
+                print(f"  {name} iteration {i} failed: {e}")
+            latencies.append(time.perf_counter() - start)
+
+    ms = np.array(latencies) * 1000
+    return StageResult(
+        name=name,
+        iterations=iterations,
+        errors=errors,
+        p50_ms=round(float(np.percentile(ms, 50)), 3),
+        p95_ms=round(float(np.percentile(ms, 95)), 3),
+        mean_ms=round(float(ms.mean()), 3),
+        throughput_per_s=round((iterations - errors) / max(sum(latencies), 1e-9), 3),
+        peak_rss_mb=round(rss.peak_bytes / 1024 ** 2, 1),
+    )
+
+
+def configure_environment(groq_url: str, pixabay_url: str, resolution: str):
+    """
+    Points every Groq and Pixabay client at the local servers. Must run
+    before the app's modules are imported, since they read config at import.
+    """
+    os.environ.update({
+        "GROQ_API_KEY": "benchmark",
+        "GROQ_API_URL": f"{groq_url}/openai/v1/chat/completions",  # modules.script
+        "GROQ_API_BASE": groq_url,                                  # langchain-groq
+        "GROQ_BASE_URL": groq_url,                                  # groq SDK
+        "PIXABAY_API_KEY": "benchmark",
+        "PIXABAY_VIDEO_URL": f"{pixabay_url}/api/videos/",
+        # Measure the work itself, not cache hits or account quotas
+        "PIXABAY_CACHE_ENABLED": "0",
+        "SCRIPT_CACHE_ENABLED": "0",
+        "GROQ_RPM": "1000000",
+        "GROQ_TPM": "1000000000",
+        "PIXABAY_RPM": "1000000",
+        "VIDEO_RANKER": "llm",
+        "SEARCH_TERMS_BACKEND": "llm",
+        "TARGET_RESOLUTION": resolution,
+    })
+
+
+def run_stages(stages: List[str], iterations: int, pipeline_iterations: int, work_dir: str) -> Dict[str, StageResult]:
+    # Imported only after configure_environment
+    from modules.script import generate_ad_script
+    from modules.pixabay_client import get_pixabay_client
+    from modules.downloader import ClipDownloader
+    from modules.renditions import select_rendition, parse_resolution, TARGET_RESOLUTION
+    from graph.nodes.video_finder_node import llm_rank, get_search_chain, get_rank_chain
+    from graph.pipeline import get_pipeline
+    from trim import VideoAssembler, make_ad
+
+    # Chains and the graph are built on first use; build them up front so
+    # only steady-state latency is measured
+    for getter in (get_search_chain, get_rank_chain, get_pipeline):
+        getter()
+    script = generate_ad_script(PROMPT, bypass_cache=True)
+    queries = [scene["search_query"] for scene in script]
+    searches = get_pixabay_client().search_many(queries, per_page=20)
+    target = parse_resolution(TARGET_RESOLUTION)
+    clips = {}
+    for scene, result in zip(script, searches):
+        hit = result["hits"][0]
+        rendition, f = select_rendition(hit["videos"], target)
+        clips[scene["scene"]] = {
+            "video_file_url": f["url"],
+            "pixabay_id": hit["id"],
+            "rendition": rendition,
+            "file_size": f["size"],
+        }
+    warm_downloader = ClipDownloader(os.path.join(work_dir, "warm_clips"))
+    warm_downloader.download_many({
+        "url": c["video_file_url"], "pixabay_id": c["pixabay_id"], "rendition": c["rendition"],
+    } for c in clips.values())
+
+    def fresh_dir(stage: str, i: int) -> str:
+        path = os.path.join(work_dir, stage, str(i))
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        return path
+
+    def download(i: int):
+        downloader = ClipDownloader(fresh_dir("download", i))
+        downloader.download_many({
+            "url": c["video_file_url"], "pixabay_id": c["pixabay_id"],
+            "rendition": c["rendition"], "expected_size": c["file_size"],
+        } for c in clips.values())
+
+    def make_trim_assembler(i: int) -> VideoAssembler:
+        # Clips come from a warm cache so only trimming is measured
+        path = fresh_dir("trim", i)
+        assembler = VideoAssembler(output_dir=path, temp_dir=path, downloader=warm_downloader)
+        assembler.load_script_and_clips(script, clips)
+        return assembler
+
+    def trim(assembler: VideoAssembler):
+        failed = [r for r in assembler.trim_clips(mode="download") if r.error]
+        if failed:
+            raise RuntimeError(failed[0].error)
+
+    def pipeline(i: int):
+        path = fresh_dir("pipeline", i)
+        final = make_ad(PROMPT, assembler=VideoAssembler(output_dir=path, temp_dir=os.path.join(path, "temp")),
+                        bypass_cache=True)
+        if final.error:
+            raise RuntimeError(final.error)
+
+    benchmarks: Dict[str, tuple] = {
+        "script": (lambda i: generate_ad_script(PROMPT, bypass_cache=True), None, iterations),
+        "search": (lambda i: get_pixabay_client().search_many(queries, per_page=20, raise_on_error=True),
+                   None, iterations),
+        "rank": (lambda i: llm_rank(script[i % len(script)]["visual_description"],
+                                    searches[i % len(searches)]["hits"]), None, iterations),
+        "download": (download, None, iterations),
+        "trim": (trim, make_trim_assembler, iterations),
+        "pipeline": (pipeline, None, pipeline_iterations),
+    }
+
+    results = {}
+    for name in stages:
+        fn, setup, n = benchmarks[name]
+        print(f"Benchmarking {name} ({n} iterations)...")
+        results[name] = measure(name, fn, n, setup)
+    return results
+
+
+def compare_search_terms() -> Dict[str, Any]:
+    """
+    Generates search terms for the benchmark script's scenes with both the
+    LLM and KeyBERT, and reports how closely they agree (see
+    `modules.keywords.compare_terms`).
+    """
+    from modules.script import generate_ad_script
+    from modules.keywords import get_keyword_extractor, compare_terms
+    from graph.nodes.video_finder_node import llm_search_terms
+
+    descriptions = [scene["visual_description"] for scene in generate_ad_script(PROMPT, bypass_cache=True)]
+    llm_terms = [llm_search_terms(desc) for desc in descriptions]
+    keybert_terms = get_keyword_extractor().extract(descriptions)
+    return compare_terms(llm_terms, keybert_terms)
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Returns a description of every stage that regressed versus the baseline:
+    p95 latency or peak RSS above, or throughput below, by more than `tolerance`.
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get("stages", {}).get(name)
+        if base is None:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']:.1f} ms vs baseline {base['p95_ms']:.1f} ms")
+        if current["throughput_per_s"] < base["throughput_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {current['throughput_per_s']:.2f}/s "
+                               f"vs baseline {base['throughput_per_s']:.2f}/s")
+        if current["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {current['peak_rss_mb']:.1f} MB vs baseline {base['peak_rss_mb']:.1f} MB")
+        if current["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: {current['errors']} errors vs baseline {base.get('errors', 0)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ad pipeline against local Groq/Pixabay stand-ins")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--pipeline-iterations", type=int, default=max(3, DEFAULT_ITERATIONS // 2))
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Fake Groq time to first token (s)")
+    parser.add_argument("--llm-tokens-per-s", type=float, default=2000.0, help="Fake Groq generation speed")
+    parser.add_argument("--search-latency", type=float, default=0.02, help="Fake Pixabay response delay (s)")
+    parser.add_argument("--resolution", default="1280x720", help="TARGET_RESOLUTION for the run")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", help="Write this run's results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative regression before failing")
+    parser.add_argument("--compare-terms", action="store_true",
+                        help="Also report how closely KeyBERT's search terms match the LLM's")
+    args = parser.parse_args()
+
+    from benchmarks.clips import make_rendition_clips
+    from benchmarks.fake_groq import FakeGroqServer
+    from benchmarks.fake_pixabay import FakePixabayServer
+
+    work_dir = tempfile.mkdtemp(prefix="ad-bench-")
+    try:
+        clips_dir = os.path.join(work_dir, "source_clips")
+        print("Rendering synthetic clips...")
+        make_rendition_clips(clips_dir)
+
+        groq = FakeGroqServer(latency_s=args.llm_latency, tokens_per_s=args.llm_tokens_per_s).start()
+        pixabay = FakePixabayServer(clips_dir, latency_s=args.search_latency).start()
+        configure_environment(groq.base_url, pixabay.base_url, args.resolution)
+        # Repo modules live one level up and use top-level imports
+        sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+        stage_results = run_stages(args.stages, args.iterations, args.pipeline_iterations, work_dir)
+        term_comparison = None
+        if args.compare_terms:
+            print("Comparing KeyBERT and LLM search terms...")
+            try:
+                term_comparison = compare_search_terms()
+            except Exception as e:
+                # KeyBERT needs its embedding model; the timing results still count
+                print(f"  search term comparison failed: {e}")
+        groq.stop()
+        pixabay.stop()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "iterations": args.iterations,
+            "pipeline_iterations": args.pipeline_iterations,
+            "llm_latency_s": args.llm_latency,
+            "llm_tokens_per_s": args.llm_tokens_per_s,
+            "search_latency_s": args.search_latency,
+            "resolution": args.resolution,
+        },
+        "stages": {name: asdict(r) for name, r in stage_results.items()},
+    }
+    if term_comparison is not None:
+        results["search_terms"] = term_comparison
+
+    print(f"\n{'stage':<10}{'p50 ms':>10}{'p95 ms':>10}{'ops/s':>10}{'RSS MB':>10}{'errors':>8}")
+    for r in stage_results.values():
+        print(f"{r.name:<10}{r.p50_ms:>10.1f}{r.p95_ms:>10.1f}{r.throughput_per_s:>10.2f}{r.peak_rss_mb:>10.1f}{r.errors:>8}")
+
+    if term_comparison is not None:
+        print(f"\nSearch terms, KeyBERT vs LLM: word overlap {term_comparison['mean_word_overlap']:.2f}, "
+              f"semantic similarity {term_comparison['mean_semantic']:.2f}")
+        for scene in term_comparison["scenes"]:
+            print(f"  {scene['word_overlap']:.2f}  {scene['semantic']:.2f}  "
+                  f"llm: {', '.join(scene['llm'])} | keybert: {', '.join(scene['keybert'])}")
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {path}")
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results["stages"], baseline, args.tolerance)
+    if regressions:
+        print(f"\nRegressions against {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
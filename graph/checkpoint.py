@@ -0,0 +1,50 @@
+import os
+import sqlite3
+from typing import Any, Dict
+from dotenv import load_dotenv
+from utils.lazy import singleton
+
+load_dotenv()
+
+# ——— CONFIG ———
+# Checkpoint pipeline runs that have a run id, so they can be resumed
+PIPELINE_CHECKPOINTS = os.getenv("PIPELINE_CHECKPOINTS", "1") == "1"
+PIPELINE_CHECKPOINT_PATH = os.getenv(
+    "PIPELINE_CHECKPOINT_PATH", os.path.join(".cache", "pipeline_checkpoints.sqlite")
+)
+
+
+@singleton
+def get_checkpointer():
+    """
+    Returns the process-wide LangGraph checkpointer.
+
+    Checkpoints go to SQLite at PIPELINE_CHECKPOINT_PATH, so runs survive a
+    restart. Without the optional `langgraph-checkpoint-sqlite` package they
+    are kept in memory, which still lets a failed run resume in this process.
+    """
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError:
+        from langgraph.checkpoint.memory import InMemorySaver
+        print("langgraph-checkpoint-sqlite is not installed; pipeline checkpoints are kept in memory only")
+        return InMemorySaver()
+
+    if os.path.dirname(PIPELINE_CHECKPOINT_PATH):
+        os.makedirs(os.path.dirname(PIPELINE_CHECKPOINT_PATH), exist_ok=True)
+    # LangGraph runs scene tasks on worker threads; SqliteSaver serializes access itself
+    conn = sqlite3.connect(PIPELINE_CHECKPOINT_PATH, check_same_thread=False)
+    return SqliteSaver(conn)
+
+
+def run_config(run_id: str) -> Dict[str, Any]:
+    """LangGraph config addressing the checkpoints of one run."""
+    return {"configurable": {"thread_id": run_id}}
+
+
+def delete_checkpoints(run_id: str):
+    """Drops a run's checkpoints once it no longer needs resuming."""
+    try:
+        get_checkpointer().delete_thread(run_id)
+    except Exception as e:
+        print(f"Could not delete checkpoints of run {run_id}: {e}")
@@ -0,0 +1,136 @@
+from itertools import zip_longest
+from typing import Any, Dict, List
+import numpy as np
+from modules.reranker import RANKER_MODE, check_ranker
+from modules.renditions import parse_resolution, TARGET_RESOLUTION
+from modules.visual_reranker import get_visual_reranker
+from modules.assignment import (
+    candidate_union,
+    rankings_to_scores,
+    assign_distinct,
+    ASSIGN_LLM_CANDIDATES,
+)
+from graph.nodes.llm import invoke_chain
+from graph.nodes.video_finder_node import get_finder_llm, get_reranker, clip_result, FINDER_MODEL
+from utils.metrics import timed
+from utils.prompt import get_assign_clips_prompt, get_assignment_parser
+from utils.prompt_budget import fit_candidates, RANK_PROMPT_TOKEN_BUDGET, ASSIGN_MAX_TOKENS_PER_SCENE
+
+
+def _rank_order(allowed: np.ndarray, prior: np.ndarray) -> List[int]:
+    """
+    Union columns ordered every scene's best candidate first, then every
+    scene's second best, and so on, so trimming from the end drops each
+    scene's weakest candidates rather than the last scenes' candidates.
+    """
+    ranked = []
+    for row in range(allowed.shape[0]):
+        columns = np.flatnonzero(allowed[row])
+        ranked.append(columns[np.argsort(-prior[row, columns], kind="stable")].tolist())
+    tiers = zip_longest(*ranked)
+    return list(dict.fromkeys(column for tier in tiers for column in tier if column is not None))
+
+
+def _scene_lines(scenes: List[Dict[str, Any]], allowed: np.ndarray, columns: List[int]) -> str:
+    position = {column: i for i, column in enumerate(columns)}
+    lines = []
+    for row, scene in enumerate(scenes):
+        shown = ", ".join(str(position[c]) for c in np.flatnonzero(allowed[row]) if c in position)
+        lines.append(f"{scene['scene_id']}: {scene['visual_description']}; allowed: {shown}")
+    return "\n".join(lines)
+
+
+def llm_assignment_scores(
+    scenes: List[Dict[str, Any]],
+    union: List[Dict[str, Any]],
+    allowed: np.ndarray,
+    prior: np.ndarray,
+) -> np.ndarray:
+    """
+    Ranks candidates for every scene with a single LLM call and turns the
+    rankings into a scenes x candidates score matrix.
+
+    The prompt carries as many candidates as fit RANK_PROMPT_TOKEN_BUDGET per
+    scene. Candidates left out of it keep their prior score, so they can
+    still be assigned if the LLM's picks run out.
+    """
+    prompt = get_assign_clips_prompt()
+    order = _rank_order(allowed, prior)
+    # Rendered with every candidate's column listed, which overestimates the final prompt slightly
+    all_lines = _scene_lines(scenes, allowed, order)
+    shown, table = fit_candidates(
+        [union[c] for c in order],
+        lambda t: prompt.format(scenes=all_lines, video_info=t),
+        budget=RANK_PROMPT_TOKEN_BUDGET * len(scenes),
+        max_candidates=len(order),
+    )
+    columns = order[:len(shown)]
+    inputs = {"scenes": _scene_lines(scenes, allowed, columns), "video_info": table}
+
+    max_tokens = 16 + ASSIGN_MAX_TOKENS_PER_SCENE * len(scenes)
+    llm = get_finder_llm().bind(max_tokens=max_tokens)
+    chain = prompt | llm | get_assignment_parser()
+    output = invoke_chain("graph.assign", chain, prompt, inputs, FINDER_MODEL, max_tokens=max_tokens)
+
+    # The LLM answers with positions in the prompt's table; map them back to union columns
+    rankings = [
+        [columns[i] for i in output.rankings.get(str(scene["scene_id"]), []) if 0 <= i < len(columns)]
+        for scene in scenes
+    ]
+    return rankings_to_scores(rankings, allowed, prior)
+
+
+def assign_clips_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    LangGraph node for script-level assignment: takes the candidates every
+    scene's `find_candidates` left in `clips`, scores all scenes against all
+    candidates at once (one LLM call for the "llm" ranker, none otherwise)
+    and gives each scene a distinct clip.
+
+    Scenes without candidates keep their error result; a scene that loses
+    every one of its candidates to other scenes gets "no_distinct_clip".
+    """
+    pending = [c for c in state.get("clips", []) if "candidates" in c]
+    if not pending:
+        return {}
+
+    descriptions = {s["scene_id"]: s["visual_description"] for s in state["script"]["scenes"]}
+    scenes = [{"scene_id": c["scene_id"], "visual_description": descriptions[c["scene_id"]]} for c in pending]
+    ranker = check_ranker(state.get("ranker", RANKER_MODE))
+
+    # Only each scene's best few candidates go into the single LLM prompt
+    limit = ASSIGN_LLM_CANDIDATES if ranker == "llm" else None
+    union, allowed, prior = candidate_union(
+        [c["candidates"][:limit] for c in pending], [c["prefilter_scores"][:limit] for c in pending]
+    )
+    # On a resumed run, clips already given to other scenes stay theirs
+    taken = {c.get("pixabay_id") for c in state["clips"] if "candidates" not in c and not c.get("error")}
+    if taken:
+        allowed &= ~np.isin([video["id"] for video in union], list(taken))[None, :]
+
+    with timed("assign", scenes=len(pending), ranker=ranker, candidates=len(union)) as span:
+        try:
+            if ranker == "llm":
+                scores = llm_assignment_scores(scenes, union, allowed, prior)
+            else:
+                local = get_reranker() if ranker == "embedding" else get_visual_reranker()
+                # Every scene is scored against every candidate in one encoding pass
+                descs = [s["visual_description"] for s in scenes]
+                scores = np.vstack(local.score_many(descs, [union] * len(scenes))).astype(np.float64)
+        except Exception as e:
+            # The prefilter scores still give every scene a sensible distinct clip
+            print(f"Script-level ranking failed, assigning by prefilter scores: {e}")
+            scores = prior
+            span["fallback"] = True
+        picks = assign_distinct(scores, allowed)
+        span["unassigned"] = sum(p is None for p in picks)
+
+    target = parse_resolution(state.get("target_resolution", TARGET_RESOLUTION))
+    clips = []
+    for row, (clip, pick) in enumerate(zip(pending, picks)):
+        if pick is None:
+            clips.append({"scene_id": clip["scene_id"], "error": "no_distinct_clip"})
+            continue
+        rank_score = float(scores[row, pick])
+        clips.append(clip_result(clip["scene_id"], clip["search_query"], union[pick], target, ranker, rank_score))
+    return {"clips": clips}
@@ -0,0 +1,45 @@
+from typing import Any, Dict
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable
+from modules.rate_limit import get_rate_limiter, estimate_tokens
+from utils.metrics import llm_call
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """Adds up the token usage Groq reports for every LLM call in a chain run."""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.prompt_tokens += usage.get("input_tokens", 0)
+                self.completion_tokens += usage.get("output_tokens", 0)
+
+
+def invoke_chain(caller: str, chain: Runnable, prompt: BasePromptTemplate, inputs: Dict[str, Any],
+                 model: str, max_tokens: int) -> Any:
+    """
+    Runs a prompt | llm | parser chain through the shared Groq rate limiter,
+    recording latency and token usage under `caller`.
+
+    Args:
+        caller: Metric label, e.g. "graph.search_terms"
+        chain: The chain to invoke
+        prompt: The chain's prompt, used to estimate the request's token cost
+        inputs: Prompt variables
+        model: Model name, for the metric label
+        max_tokens: Expected completion length, for the token cost estimate
+    """
+    cost = estimate_tokens(prompt.format(**inputs), max_tokens=max_tokens)
+    usage = TokenUsageHandler()
+    with llm_call(caller, model) as span:
+        result = get_rate_limiter("groq").call(chain.invoke, inputs, config={"callbacks": [usage]}, cost=cost)
+        span["prompt_tokens"] = usage.prompt_tokens
+        span["completion_tokens"] = usage.completion_tokens
+    return result
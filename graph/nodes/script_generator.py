@@ -1,21 +1,41 @@
 from typing import Any, Dict
-from langchain_groq import ChatGroq
 from utils.models import ScriptOutput
-from langchain_core.runnables import Runnable
-from utils.prompt import script_prompt, script_parser
+from utils.lazy import singleton
+from utils.prompt import get_script_prompt, get_script_parser
+from modules.script_cache import get_script_cache
+from graph.nodes.llm import invoke_chain
 
-# Initialize the Groq LLM model
-groq_llm = ChatGroq(
-    model="mistral-saba-24b",
-    temperature=0.7,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-)
+SCRIPT_MODEL = "mistral-saba-24b"
 
-script_chain: Runnable = script_prompt | groq_llm | script_parser
+@singleton
+def get_script_chain():
+    """The script prompt | Groq LLM | parser chain, built on first use."""
+    from langchain_groq import ChatGroq
+    groq_llm = ChatGroq(
+        model=SCRIPT_MODEL,
+        temperature=0.7,
+        max_tokens=None,
+        timeout=None,
+        # Retries on 429 are handled by the shared rate limiter
+        max_retries=0,
+    )
+    return get_script_prompt() | groq_llm | get_script_parser()
 
 def generate_script_node(state: Dict[str, Any]) -> Dict[str, Any]:
     user_prompt = state["user_prompt"]
-    script_output: ScriptOutput = script_chain.invoke({"user_prompt": user_prompt})
-    return {"script": script_output.model_dump()}
\ No newline at end of file
+    cache = get_script_cache()
+
+    # Reuse a stored script for the same or a very similar idea, unless asked not to
+    if cache is not None and not state.get("bypass_cache"):
+        script, _ = cache.get(user_prompt, namespace="graph")
+        if script is not None:
+            return {"script": script}
+
+    inputs = {"user_prompt": user_prompt}
+    script_output: ScriptOutput = invoke_chain(
+        "graph.script", get_script_chain(), get_script_prompt(), inputs, SCRIPT_MODEL, max_tokens=800
+    )
+    script = script_output.model_dump()
+    if cache is not None:
+        cache.put(user_prompt, script, namespace="graph")
+    return {"script": script}
\ No newline at end of file
@@ -1,89 +1,194 @@
 import os
-import requests
 from dotenv import load_dotenv
-from typing import Any, Dict, List
-from langchain_groq import ChatGroq
-from langchain_core.runnables import Runnable
-from utils.prompt import search_terms_prompt, search_terms_parser, rank_videos_prompt, rank_video_parser
+from typing import Any, Dict, List, Optional, Tuple
+from modules.pixabay_client import get_pixabay_client
+from modules.reranker import EmbeddingReranker, RANKER_MODE, check_ranker
+from modules.visual_reranker import get_visual_reranker
+from modules.keywords import generate_search_terms, SEARCH_TERMS_BACKEND
+from modules.renditions import select_rendition, parse_resolution, TARGET_RESOLUTION
+from modules.prefilter import prefilter_candidates, parse_duration, SEARCH_PER_PAGE
+from graph.nodes.llm import invoke_chain
+from utils.lazy import singleton
+from utils.metrics import timed
+from utils.prompt_budget import fit_candidates, RANK_MAX_TOKENS, SEARCH_TERMS_MAX_TOKENS
+from utils.prompt import (
+    get_search_terms_prompt,
+    get_search_terms_parser,
+    get_rank_videos_prompt,
+    get_rank_video_parser,
+)
 load_dotenv()
 
-# Initialize once
 PIXABAY_API_KEY = os.getenv("PIXABAY_API_KEY")
-groq_llm = ChatGroq(
-    model="mistral-saba-24b",
-    temperature=0.5,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-)
+FINDER_MODEL = "mistral-saba-24b"
 
-search_chain: Runnable = search_terms_prompt | groq_llm | search_terms_parser
-rank_chain: Runnable = rank_videos_prompt | groq_llm | rank_video_parser
+# Built on first use, then shared by every scene
+@singleton
+def get_finder_llm():
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        model=FINDER_MODEL,
+        temperature=0.5,
+        max_tokens=None,
+        timeout=None,
+        # Retries on 429 are handled by the shared rate limiter
+        max_retries=0,
+    )
 
-def generate_video_node(state: Dict[str, Any]) -> Dict[str, Any]:
+# Structured answers are a few tokens long; the caps stop runaway completions
+@singleton
+def get_search_chain():
+    llm = get_finder_llm().bind(max_tokens=SEARCH_TERMS_MAX_TOKENS)
+    return get_search_terms_prompt() | llm | get_search_terms_parser()
+
+@singleton
+def get_rank_chain():
+    llm = get_finder_llm().bind(max_tokens=RANK_MAX_TOKENS)
+    return get_rank_videos_prompt() | llm | get_rank_video_parser()
+
+@singleton
+def get_reranker() -> EmbeddingReranker:
+    return EmbeddingReranker()
+
+def llm_search_terms(desc: str) -> List[str]:
     """
-    LangGraph node: given a scene dict with:
-      - scene_id: int
-      - visual_description: str
-    returns the best Pixabay clip metadata.
+    Asks the LLM for 3 stock-video queries for one scene description.
+    """
+    inputs = {"scene_description": desc}
+    return invoke_chain(
+        "graph.search_terms", get_search_chain(), get_search_terms_prompt(), inputs, FINDER_MODEL,
+        max_tokens=SEARCH_TERMS_MAX_TOKENS,
+    ).queries
+
+def llm_rank(desc: str, hits: List[Dict[str, Any]]) -> int:
+    """
+    Asks the LLM for the best of the first hits, as many as fit the ranking
+    prompt's token budget; returns an index into `hits`.
+    """
+    prompt = get_rank_videos_prompt()
+    options, table = fit_candidates(hits, lambda t: prompt.format(scene_description=desc, video_info=t))
+    inputs = {
+        "scene_description": desc,
+        "video_info"       : table
+    }
+    best_index = invoke_chain(
+        "graph.rank", get_rank_chain(), prompt, inputs, FINDER_MODEL, max_tokens=RANK_MAX_TOKENS
+    ).best_index
+    return min(max(best_index, 0), len(options)-1)
+
+def find_candidates(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Steps 1-2 of `generate_video_node`: search terms, search and prefilter.
+
+    Returns:
+        {"scene_id", "search_query", "candidates": best-first hits,
+        "prefilter_scores": aligned heuristic scores}, or an error result
     """
-    # import ipdb; ipdb.set_trace()
     scene_id = state["scene_id"]
     desc     = state["visual_description"]
 
-    # 1) Generate 3 stock-video queries
-    terms = search_chain.invoke({"scene_description": desc}).queries
+    # 1) Generate 3 stock-video queries, unless they were batched upstream
+    terms = state.get("search_terms")
+    if not terms:
+        backend = state.get("search_terms_backend", SEARCH_TERMS_BACKEND)
+        with timed("search_terms", scene_id=scene_id, backend=backend):
+            terms = generate_search_terms([desc], llm_search_terms, backend)[0]
 
-    # 2) Fetch hits for each query
-    hits: List[Dict[str, Any]] = []
-    for term in terms:
-        resp = requests.get(
-            "https://pixabay.com/api/videos/",
-            params={"key": PIXABAY_API_KEY, "q": term, "per_page": 20}
-        )
-        resp.raise_for_status()
-        hits.extend(resp.json().get("hits", []))
+    # 2) Fetch hits for all queries concurrently
+    with timed("search", scene_id=scene_id, queries=len(terms)) as span:
+        results = get_pixabay_client().search_many(terms, per_page=SEARCH_PER_PAGE, raise_on_error=True)
+        span["hits"] = sum(len(result.get("hits", [])) for result in results)
 
-    # Deduplicate
-    unique = {v["id"]: v for v in hits}.values()
-    hits = list(unique)
+    # Deduplicate, remembering each clip's best position in any query's results
+    unique: Dict[int, Dict[str, Any]] = {}
+    positions: Dict[int, int] = {}
+    for result in results:
+        for position, v in enumerate(result.get("hits", [])):
+            unique.setdefault(v["id"], v)
+            positions[v["id"]] = min(position, positions.get(v["id"], position))
+    hits = list(unique.values())
     if not hits:
         return {"scene_id": scene_id, "error": "no_videos_found"}
 
-    # 3) Build the `options` JSON for ranking
-    options = []
-    for i, v in enumerate(hits[:10]):
-        options.append({
-            "id"        : i,
-            "tags"      : v.get("tags",""),
-            "duration"  : v.get("duration",0),
-            "resolution": f"{v['videos']['large']['width']}x{v['videos']['large']['height']}",
-            "views"     : v.get("views",0)
-        })
-    video_info = {"options": options}
-
-    # 4) Pick best index via LLM
-    best_index = rank_chain.invoke({
-        "scene_description": desc,
-        "video_info"       : video_info
-    }).best_index
+    # Drop clips that are too short or in the wrong orientation; only the
+    # top-scoring few go on to the ranker
+    target = parse_resolution(state.get("target_resolution", TARGET_RESOLUTION))
+    with timed("prefilter", scene_id=scene_id, candidates=len(hits)) as span:
+        prefiltered = prefilter_candidates(
+            hits, parse_duration(state.get("duration")), target, positions=[positions[v["id"]] for v in hits]
+        )
+        span.update(
+            kept=len(prefiltered.indices),
+            dropped_short=prefiltered.dropped_short,
+            dropped_orientation=prefiltered.dropped_orientation,
+            relaxed=prefiltered.relaxed,
+        )
 
-    best = hits[min(best_index, len(hits)-1)]
+    return {
+        "scene_id"        : scene_id,
+        "search_query"    : terms[0] if terms else "",
+        "candidates"      : [hits[i] for i in prefiltered.indices],
+        "prefilter_scores": [float(prefiltered.scores[i]) for i in prefiltered.indices],
+    }
 
-    # 5) Choose highest-res file
+def clip_result(scene_id: int, search_query: str, best: Dict[str, Any], target: Tuple[int, int],
+                ranker: str, rank_score: Optional[float]) -> Dict[str, Any]:
+    """
+    Steps 4-5 of `generate_video_node`: the chosen hit's smallest rendition
+    that meets the output resolution, as the scene's clip metadata.
+    """
     files = best["videos"]
-    best_file = max(files.values(), key=lambda f: f["width"]*f["height"])
-
-    # 6) Return
+    rendition, best_file = select_rendition(files, target)
     return {
         "scene_id"   : scene_id,
-        "search_query": terms[0] if terms else "",
+        "search_query": search_query,
         "pixabay_id" : best["id"],
         "page_url"   : best["pageURL"],
         "video_url"  : best_file["url"],
+        "rendition"  : rendition,
         "thumbnail"  : best_file["thumbnail"],
         "duration_s" : best.get("duration"),
         "tags"       : best.get("tags"),
         "resolution" : f"{best_file['width']}x{best_file['height']}",
-        "file_size"  : best_file["size"]
+        "file_size"  : best_file["size"],
+        "ranker"     : ranker,
+        "rank_score" : rank_score,
+        "renditions" : files
     }
+
+def generate_video_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    LangGraph node: given a scene dict with:
+      - scene_id: int
+      - visual_description: str
+      - search_terms: optional, precomputed queries (e.g. one KeyBERT pass per script)
+      - search_terms_backend: optional, "llm", "keybert" or "auto" (defaults to SEARCH_TERMS_BACKEND)
+      - ranker: optional, "llm", "embedding" or "visual" (defaults to VIDEO_RANKER)
+      - target_resolution: optional, e.g. "1920x1080" (defaults to TARGET_RESOLUTION)
+      - duration: optional scene duration such as "5s"; shorter clips are skipped
+    returns the best Pixabay clip metadata.
+    """
+    scene_id = state["scene_id"]
+    desc     = state["visual_description"]
+    ranker   = check_ranker(state.get("ranker", RANKER_MODE))
+
+    found = find_candidates(state)
+    if found.get("error"):
+        return found
+    hits = found["candidates"]
+
+    # 3) Pick best index, via the LLM, local tag embeddings or thumbnail embeddings
+    with timed("rank", scene_id=scene_id, ranker=ranker, candidates=len(hits)) as span:
+        if ranker in ("embedding", "visual"):
+            local = get_reranker() if ranker == "embedding" else get_visual_reranker()
+            result = local.rank(desc, hits, llm_fallback=lambda top: llm_rank(desc, top))
+            best_index = result.best_index
+            rank_score = float(result.scores[best_index])
+            span["used_fallback"] = result.used_fallback
+        else:
+            best_index = llm_rank(desc, hits)
+            rank_score = None
+
+    # 4) Choose the smallest file that still meets the output resolution, 5) return
+    target = parse_resolution(state.get("target_resolution", TARGET_RESOLUTION))
+    return clip_result(scene_id, found["search_query"], hits[best_index], target, ranker, rank_score)
@@ -0,0 +1,256 @@
+import os
+from typing import Any, Dict, List, Optional, Annotated, TypedDict
+from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
+from graph.nodes.script_generator import generate_script_node
+from graph.nodes.video_finder_node import generate_video_node, find_candidates
+from graph.nodes.assignment_node import assign_clips_node
+from graph.checkpoint import get_checkpointer, run_config
+from modules.assignment import CLIP_ASSIGNMENT
+from modules.reranker import check_ranker
+from utils.lazy import singleton
+from modules.keywords import get_keyword_extractor, SEARCH_TERMS_BACKEND
+from modules.renditions import (
+    select_renditions_for_script,
+    parse_resolution,
+    TARGET_RESOLUTION,
+    SCRIPT_BYTE_BUDGET,
+)
+
+# Maximum number of scenes searched at the same time
+MAX_SCENE_CONCURRENCY = int(os.getenv("MAX_SCENE_CONCURRENCY", "8"))
+
+
+def merge_clips(left: List[Dict[str, Any]], right: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Reducer for per-scene results: later results for a scene replace earlier
+    ones, and the merged list is always in scene order regardless of which
+    scene finished first.
+    """
+    merged = {clip["scene_id"]: clip for clip in (left or []) + (right or [])}
+    return [merged[scene_id] for scene_id in sorted(merged)]
+
+
+class PipelineState(TypedDict, total=False):
+    user_prompt: str
+    bypass_cache: bool
+    script: Dict[str, Any]
+    ranker: str
+    search_terms_backend: str
+    search_terms: Dict[int, List[str]]
+    target_resolution: str
+    byte_budget: int
+    assignment: str
+    # Every option of the job that started the run, for rebuilding it from its checkpoint
+    run_options: Dict[str, Any]
+    clips: Annotated[List[Dict[str, Any]], merge_clips]
+
+
+def normalize_scenes(script: Any) -> List[Dict[str, Any]]:
+    """
+    Accepts either the graph's `{"scenes": [...]}` script or the list returned
+    by `modules.script.generate_ad_script`, and returns scenes keyed by `scene_id`.
+    """
+    scenes = script.get("scenes", []) if isinstance(script, dict) else script
+    return [
+        {**scene, "scene_id": scene.get("scene_id", scene.get("scene"))}
+        for scene in scenes
+    ]
+
+
+def script_node(state: PipelineState) -> Dict[str, Any]:
+    """Generates the script, unless one was passed in."""
+    if state.get("script"):
+        return {"script": {"scenes": normalize_scenes(state["script"])}}
+    return generate_script_node(state)
+
+
+def plan_search_terms_node(state: PipelineState) -> Dict[str, Any]:
+    """
+    With the KeyBERT backend, extracts every scene's search terms in one
+    batched pass instead of once per scene inside the fan-out.
+    """
+    if state.get("search_terms_backend", SEARCH_TERMS_BACKEND) != "keybert":
+        return {}
+
+    scenes = state["script"]["scenes"]
+    terms = get_keyword_extractor().extract([s["visual_description"] for s in scenes])
+    return {"search_terms": {s["scene_id"]: t for s, t in zip(scenes, terms)}}
+
+
+def fan_out_scenes(state: PipelineState) -> List[Send]:
+    """
+    Dispatches one `find_clip` task per scene. When a checkpointed run is
+    rerun, scenes that already have a clip keep it and are not searched again.
+    """
+    search_terms = state.get("search_terms") or {}
+    found = {clip["scene_id"] for clip in state.get("clips", []) if not clip.get("error")}
+    sends = []
+    for scene in state["script"]["scenes"]:
+        if scene["scene_id"] in found:
+            continue
+        scene_state = {
+            "scene_id": scene["scene_id"],
+            "visual_description": scene["visual_description"],
+            "duration": scene.get("duration"),
+        }
+        for key in ("ranker", "search_terms_backend", "target_resolution", "assignment"):
+            if key in state:
+                scene_state[key] = state[key]
+        if scene["scene_id"] in search_terms:
+            scene_state["search_terms"] = search_terms[scene["scene_id"]]
+        sends.append(Send("find_clip", scene_state))
+    return sends
+
+
+def find_clip_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Runs `generate_video_node` for one scene, or only its search and
+    prefilter steps when clips are assigned per script. Exceptions are turned
+    into an error result so a failing scene never takes the others down with it.
+    """
+    try:
+        if state.get("assignment", CLIP_ASSIGNMENT) == "script":
+            clip = find_candidates(state)
+        else:
+            clip = generate_video_node(state)
+    except Exception as e:
+        clip = {"scene_id": state["scene_id"], "error": f"{type(e).__name__}: {e}"}
+    return {"clips": [clip]}
+
+
+def fit_budget_node(state: PipelineState) -> Dict[str, Any]:
+    """
+    Re-picks renditions across all scenes so the script's total download
+    stays within `byte_budget`.
+    """
+    budget = state.get("byte_budget", SCRIPT_BYTE_BUDGET)
+    found = [c for c in state.get("clips", []) if not c.get("error") and c.get("renditions")]
+    if not budget or not found:
+        return {}
+
+    target = parse_resolution(state.get("target_resolution", TARGET_RESOLUTION))
+    choices = select_renditions_for_script([c["renditions"] for c in found], target, budget)
+    updated = []
+    for clip, (rendition, f) in zip(found, choices):
+        updated.append({
+            **clip,
+            "rendition" : rendition,
+            "video_url" : f["url"],
+            "thumbnail" : f.get("thumbnail", clip.get("thumbnail")),
+            "resolution": f"{f['width']}x{f['height']}",
+            "file_size" : f.get("size"),
+        })
+    return {"clips": updated}
+
+
+def build_pipeline(checkpointer=None):
+    """
+    Builds the script-to-clips graph:
+
+        write_script -> plan_search_terms -> find_clip (one per scene, in parallel)
+            -> assign_clips -> fit_budget
+
+    assign_clips only does work in script-level assignment mode, where
+    find_clip returns candidates instead of a pick.
+
+    Args:
+        checkpointer: Optional LangGraph checkpointer; runs then need a run id
+
+    Returns:
+        The compiled LangGraph
+    """
+    builder = StateGraph(PipelineState)
+    builder.add_node("write_script", script_node)
+    builder.add_node("plan_search_terms", plan_search_terms_node)
+    builder.add_node("find_clip", find_clip_node)
+    builder.add_node("assign_clips", assign_clips_node)
+    builder.add_node("fit_budget", fit_budget_node)
+
+    builder.add_edge(START, "write_script")
+    builder.add_edge("write_script", "plan_search_terms")
+    builder.add_conditional_edges("plan_search_terms", fan_out_scenes, ["find_clip"])
+    builder.add_edge("find_clip", "assign_clips")
+    builder.add_edge("assign_clips", "fit_budget")
+    builder.add_edge("fit_budget", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+@singleton
+def get_pipeline():
+    """The compiled pipeline, built on first use."""
+    return build_pipeline()
+
+
+@singleton
+def get_checkpointed_pipeline():
+    """The compiled pipeline saving a checkpoint after every step, for runs with a run id."""
+    return build_pipeline(checkpointer=get_checkpointer())
+
+
+def get_run_state(run_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the last checkpointed state of a run (its script, options and
+    the clips found so far), or None if the run has no checkpoints.
+    """
+    snapshot = get_checkpointed_pipeline().get_state(run_config(run_id))
+    return dict(snapshot.values) if snapshot.values else None
+
+
+def run_pipeline(
+    user_prompt: Optional[str] = None,
+    script: Optional[Any] = None,
+    max_concurrency: int = MAX_SCENE_CONCURRENCY,
+    run_id: Optional[str] = None,
+    **options,
+) -> Dict[str, Any]:
+    """
+    Runs the pipeline for a campaign idea or an existing script.
+
+    With a `run_id`, every step is checkpointed and calling again with the
+    same id resumes the run: an interrupted run continues from its last step,
+    reusing the scenes that had already finished, and a finished one only
+    searches again for scenes that failed. The script is never regenerated.
+
+    Args:
+        user_prompt: Campaign idea; used when no script is given
+        script: Existing script, in either the graph or the `generate_ad_script` format
+        max_concurrency: Maximum number of scenes searched at once
+        run_id: Checkpoint key of the run, e.g. a job id
+        **options: Optional `ranker`, `search_terms_backend`, `bypass_cache`,
+            `target_resolution`, `byte_budget` and `assignment` ("scene" or
+            "script") overrides, and `run_options`, which is only saved with
+            the run
+
+    Returns:
+        Final state with `script` and `clips` (one result per scene, in scene order)
+
+    Raises:
+        ValueError: For an unknown ranker, or neither a prompt nor a script
+    """
+    if "ranker" in options:
+        # Checked up front; inside the graph it would only fail each scene
+        check_ranker(options["ranker"])
+    if run_id is not None:
+        pipeline = get_checkpointed_pipeline()
+        config = {**run_config(run_id), "max_concurrency": max_concurrency}
+        snapshot = pipeline.get_state(config)
+        if snapshot.next:
+            # Interrupted mid-run: finish the pending step with the saved
+            # state; scene tasks that completed before are not run again
+            return pipeline.invoke(None, config=config)
+        if snapshot.values and script is None:
+            script = snapshot.values.get("script")
+    else:
+        pipeline = get_pipeline()
+        config = {"max_concurrency": max_concurrency}
+
+    if user_prompt is None and script is None:
+        raise ValueError("Either user_prompt or script is required")
+
+    state: Dict[str, Any] = {**options, "clips": []}
+    if user_prompt is not None:
+        state["user_prompt"] = user_prompt
+    if script is not None:
+        state["script"] = script
+    return pipeline.invoke(state, config=config)
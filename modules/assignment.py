@@ -0,0 +1,104 @@
+import os
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ——— CONFIG ———
+# "scene" ranks every scene on its own; "script" assigns distinct clips to
+# all scenes at once from one score matrix
+CLIP_ASSIGNMENT = os.getenv("CLIP_ASSIGNMENT", "scene")
+CLIP_ASSIGNMENT_MODES = ("scene", "script")
+# Candidates per scene shown to the LLM in script mode
+ASSIGN_LLM_CANDIDATES = int(os.getenv("ASSIGN_LLM_CANDIDATES", "6"))
+
+# Cost of a scene/candidate pair the solver must not use
+_FORBIDDEN = 1e9
+
+
+def candidate_union(
+    candidate_lists: List[List[Dict[str, Any]]],
+    prior_lists: Optional[List[List[float]]] = None,
+) -> Tuple[List[Dict[str, Any]], np.ndarray, np.ndarray]:
+    """
+    Merges every scene's candidates into one list of distinct clips.
+
+    Args:
+        candidate_lists: Each scene's candidate Pixabay hits
+        prior_lists: Optional per-candidate scores aligned with `candidate_lists`
+            (e.g. prefilter scores)
+
+    Returns:
+        (union of candidates, `allowed` scenes x union mask of which scene
+        searched which clip, `prior` scenes x union matrix, 0 where not allowed)
+    """
+    index: Dict[Any, int] = {}
+    union: List[Dict[str, Any]] = []
+    for candidates in candidate_lists:
+        for video in candidates:
+            if video["id"] not in index:
+                index[video["id"]] = len(union)
+                union.append(video)
+
+    allowed = np.zeros((len(candidate_lists), len(union)), dtype=bool)
+    prior = np.zeros((len(candidate_lists), len(union)), dtype=np.float64)
+    for row, candidates in enumerate(candidate_lists):
+        scores = prior_lists[row] if prior_lists else [0.0] * len(candidates)
+        for video, score in zip(candidates, scores):
+            allowed[row, index[video["id"]]] = True
+            prior[row, index[video["id"]]] = score
+    return union, allowed, prior
+
+
+def rankings_to_scores(
+    rankings: List[List[int]],
+    allowed: np.ndarray,
+    prior: Optional[np.ndarray] = None,
+    depth: int = 3,
+) -> np.ndarray:
+    """
+    Turns per-scene ranked candidate lists (e.g. from the LLM) into a score
+    matrix: the first pick scores 1, the next (depth-1)/depth, and so on.
+    Unranked candidates score 0. `prior` (scaled to at most 0.1) breaks ties,
+    so the solver still has a preference among candidates the LLM didn't rank.
+    """
+    scores = np.zeros(allowed.shape, dtype=np.float64)
+    for row, ranked in enumerate(rankings):
+        for position, column in enumerate(ranked[:depth]):
+            if 0 <= column < allowed.shape[1] and allowed[row, column] and scores[row, column] == 0:
+                scores[row, column] = (depth - position) / depth
+    if prior is not None and prior.size:
+        finite = np.where(allowed, prior, 0.0)
+        top = np.abs(finite).max()
+        if top > 0:
+            scores += 0.1 * finite / top
+    return scores
+
+
+def assign_distinct(scores: np.ndarray, allowed: np.ndarray) -> List[Optional[int]]:
+    """
+    Picks one distinct candidate per scene, maximizing the total score.
+
+    Solved exactly with the Hungarian algorithm (scipy's
+    `linear_sum_assignment`), so no clip is used twice.
+
+    Args:
+        scores: scenes x candidates score matrix, higher is better
+        allowed: Mask of pairs that may be assigned
+
+    Returns:
+        Column index per scene, or None for a scene that can't get a distinct
+        clip (it has fewer allowed candidates than scenes competing for them)
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    if scores.size == 0:
+        return [None] * scores.shape[0]
+    cost = np.where(allowed, -scores, _FORBIDDEN)
+    rows, columns = linear_sum_assignment(cost)
+    picks: List[Optional[int]] = [None] * scores.shape[0]
+    for row, column in zip(rows, columns):
+        if allowed[row, column]:
+            picks[row] = int(column)
+    return picks
@@ -0,0 +1,227 @@
+import os
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Iterable, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from utils.metrics import timed, with_trace, DOWNLOAD_BYTES, CLIP_CACHE
+
+load_dotenv()
+
+# ——— CONFIG ———
+CLIP_CACHE_MAX_BYTES = int(os.getenv("CLIP_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "8"))
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT_S = float(os.getenv("DOWNLOAD_TIMEOUT_S", "30"))
+
+
+def clip_key(url: str, pixabay_id: Optional[int] = None, rendition: Optional[str] = None) -> str:
+    """
+    Cache key for a clip file: the Pixabay id and rendition when known,
+    otherwise a hash of the URL.
+    """
+    if pixabay_id is not None and rendition:
+        return f"pixabay_{pixabay_id}_{rendition}"
+    return "url_" + hashlib.sha256(url.encode()).hexdigest()[:16]
+
+
+class ClipDownloader:
+    """
+    Concurrent, resumable download cache for source clips.
+
+    - Files are named by Pixabay id and rendition, so a clip is reused only
+      when it really is the same clip.
+    - Transfers stream into a `.part` file with large buffers and resume with
+      an HTTP Range request if a previous attempt was interrupted.
+    - A finished transfer is renamed into place atomically, so a file under
+      its final name is always complete.
+    - Once the cache exceeds `max_bytes`, the least recently used clips are
+      deleted. Clips a run has submitted stay pinned until that run calls
+      `release`; pins are counted per submission, so runs sharing a clip
+      don't unpin it for each other.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int = CLIP_CACHE_MAX_BYTES,
+        max_workers: int = DOWNLOAD_WORKERS,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+        timeout: float = DOWNLOAD_TIMEOUT_S,
+    ):
+        """
+        Args:
+            cache_dir: Directory holding downloaded clips
+            max_bytes: Size cap for the directory before LRU eviction
+            max_workers: Parallel downloads
+            chunk_size: Read/write buffer size in bytes
+            timeout: Connect/read timeout per request
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="clip-download")
+
+        # Submissions per clip not yet released; pinned clips are never evicted
+        self._pinned: Dict[str, int] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str) -> str:
+        """Final location of the clip with the given key."""
+        return os.path.join(self.cache_dir, f"{key}.mp4")
+
+    def submit(
+        self,
+        url: str,
+        pixabay_id: Optional[int] = None,
+        rendition: Optional[str] = None,
+        expected_size: Optional[int] = None,
+    ) -> Future:
+        """
+        Starts downloading a clip in the background, or returns the running download.
+
+        Args:
+            url: Clip URL
+            pixabay_id: Pixabay video id, for the cache key
+            rendition: Pixabay rendition name ("large", "medium", ...), for the cache key
+            expected_size: Size reported by Pixabay; validates the file when the
+                server sends no Content-Length
+
+        Returns:
+            Future resolving to the local file path
+        """
+        key = clip_key(url, pixabay_id, rendition)
+        with self._lock:
+            self._pinned[key] = self._pinned.get(key, 0) + 1
+            future = self._inflight.get(key)
+            started = future is None
+            if started:
+                future = self._executor.submit(with_trace(self._fetch), url, key, expected_size)
+                self._inflight[key] = future
+        if started:
+            # Outside the lock: the callback runs inline if the future is already done
+            future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def download(self, url: str, pixabay_id: Optional[int] = None, rendition: Optional[str] = None,
+                 expected_size: Optional[int] = None) -> str:
+        """Blocking version of `submit`."""
+        return self.submit(url, pixabay_id, rendition, expected_size).result()
+
+    def download_many(self, clips: Iterable[Dict]) -> List[str]:
+        """
+        Downloads several clips in parallel.
+
+        Args:
+            clips: Dicts with `url` and optionally `pixabay_id`, `rendition`, `expected_size`
+
+        Returns:
+            Local paths, in the same order as `clips`
+        """
+        futures = [self.submit(**clip) for clip in clips]
+        return [f.result() for f in futures]
+
+    def release(self, paths: Iterable[str]):
+        """
+        Drops one pin per path, one for each `submit` the caller made, and
+        evicts clips over the size cap that are no longer pinned by anyone.
+        """
+        with self._lock:
+            for path in paths:
+                key = os.path.splitext(os.path.basename(path))[0]
+                count = self._pinned.get(key, 0) - 1
+                if count > 0:
+                    self._pinned[key] = count
+                else:
+                    self._pinned.pop(key, None)
+        self._evict()
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def _fetch(self, url: str, key: str, expected_size: Optional[int]) -> str:
+        final_path = self.path_for(key)
+        if os.path.exists(final_path):
+            # Record the access for LRU eviction
+            os.utime(final_path)
+            CLIP_CACHE.inc(result="hit")
+            return final_path
+        CLIP_CACHE.inc(result="miss")
+
+        part_path = final_path + ".part"
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        with timed("download", key=key, resumed_from=offset) as span:
+            start, fetched = time.perf_counter(), 0
+            with self._session.get(url, headers=headers, stream=True, timeout=self.timeout) as r:
+                if r.status_code == 416:
+                    # Nothing left to fetch; the partial file is already complete
+                    pass
+                else:
+                    r.raise_for_status()
+                    if offset and r.status_code != 206:
+                        # Server ignored the Range header; start over
+                        offset = 0
+                    # Trust the server's length over the size in Pixabay's metadata
+                    if "Content-Length" in r.headers:
+                        expected_size = offset + int(r.headers["Content-Length"])
+
+                    with open(part_path, "ab" if offset else "wb", buffering=self.chunk_size) as f:
+                        for chunk in r.iter_content(chunk_size=self.chunk_size):
+                            f.write(chunk)
+                            fetched += len(chunk)
+            DOWNLOAD_BYTES.inc(fetched)
+            span["bytes"] = fetched
+            span["mb_per_s"] = round(fetched / 1024 ** 2 / max(time.perf_counter() - start, 1e-9), 3)
+
+        size = os.path.getsize(part_path)
+        if expected_size is not None and size != expected_size:
+            if size > expected_size:
+                os.remove(part_path)
+            raise IOError(f"Incomplete download for {key}: got {size} of {expected_size} bytes")
+
+        os.replace(part_path, final_path)
+        self._evict()
+        return final_path
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".mp4"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name[:-len(".mp4")], path))
+
+        total = sum(size for _, size, _, _ in entries)
+        if total <= self.max_bytes:
+            return
+
+        with self._lock:
+            pinned = set(self._pinned)
+        for _, size, key, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key in pinned:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,289 @@
+import os
+import time
+import uuid
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from utils.metrics import trace_context
+from graph.checkpoint import PIPELINE_CHECKPOINTS
+
+load_dotenv()
+
+# ——— CONFIG ———
+# Full script-to-video runs executing at once
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Jobs accepted but not yet finished; further submissions are rejected
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "16"))
+# Finished jobs kept in memory for polling
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "200"))
+JOB_OUTPUT_DIR = os.getenv("JOB_OUTPUT_DIR", os.path.join("outputs", "jobs"))
+
+
+@dataclass
+class Job:
+    """
+    One script-to-video run and its progress log.
+    """
+    id: str
+    campaign_idea: str
+    options: Dict[str, Any]
+    status: str = "queued"
+    stage: Optional[str] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    output_path: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status summary without the event log."""
+        return {
+            "job_id": self.id,
+            "campaign_idea": self.campaign_idea,
+            "status": self.status,
+            "stage": self.stage,
+            "output_path": self.output_path,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs full script-to-video jobs on a bounded worker pool, off the API's
+    event loop.
+
+    A job's clip search is checkpointed under its id (see `graph.checkpoint`),
+    so `resume` can rerun a failed job without regenerating its script or
+    searching again for scenes that were already found. A job whose ad had to
+    leave scenes out also fails, with the partial ad as its output, so it can
+    be resumed for the missing scenes.
+
+    Every stage update is appended to the job's event log with an increasing
+    `seq`, so clients can poll for the current status or read the log
+    incrementally with `events_since`.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = JOB_WORKERS,
+        max_pending: int = JOB_QUEUE_SIZE,
+        history: int = JOB_HISTORY,
+        output_dir: str = JOB_OUTPUT_DIR,
+    ):
+        """
+        Args:
+            max_workers: Jobs executing concurrently
+            max_pending: Queued plus running jobs before `submit` rejects new ones
+            history: Finished jobs remembered for status lookups
+            output_dir: Each job writes its files under output_dir/<job id>
+        """
+        self.max_pending = max_pending
+        self.history = history
+        self.output_dir = output_dir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._pending = 0
+        self._downloader = None
+        self._lock = threading.Lock()
+
+    def submit(self, campaign_idea: str, **options) -> Job:
+        """
+        Queues a job.
+
+        Args:
+            campaign_idea: Campaign idea to turn into an ad
+            **options: Pipeline overrides passed to `make_ad` (ranker, target_resolution, ...)
+
+        Returns:
+            The queued Job
+
+        Raises:
+            queue.Full: If `max_pending` jobs are already queued or running
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise queue.Full
+            self._pending += 1
+            job = Job(id=uuid.uuid4().hex, campaign_idea=campaign_idea, options=options)
+            self._jobs[job.id] = job
+            self._trim_history()
+        self._record(job, "queued", {"status": "queued"})
+        self._executor.submit(self._run, job)
+        return job
+
+    def resume(self, job_id: str) -> Optional[Job]:
+        """
+        Queues a failed job again under the same id. A job this process no
+        longer remembers (e.g. after a restart) is rebuilt from its checkpoint.
+
+        Args:
+            job_id: Id of the job to resume
+
+        Returns:
+            The queued Job, or None if the job is unknown and has no checkpoint
+
+        Raises:
+            ValueError: If the job is still queued or running, or already succeeded
+            queue.Full: If `max_pending` jobs are already queued or running
+        """
+        job = self.get(job_id)
+        if job is None:
+            job = self._job_from_checkpoint(job_id)
+            if job is None:
+                return None
+
+        with self._lock:
+            # Another call may have rebuilt and queued it meanwhile
+            job = self._jobs.get(job_id, job)
+            if job.status != "failed":
+                raise ValueError(f"Job is {job.status}, only failed jobs can be resumed")
+            if self._pending >= self.max_pending:
+                raise queue.Full
+            self._pending += 1
+            job.status = "queued"
+            job.error = None
+            job.output_path = None
+            job.started_at = job.finished_at = None
+            self._jobs[job.id] = job
+            self._jobs.move_to_end(job.id)
+            self._trim_history()
+            self._append_event(job, "queued", {"status": "queued", "resumed": True})
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def events_since(self, job_id: str, seq: int = 0) -> List[Dict[str, Any]]:
+        """Returns the job's events with `seq` >= the given value."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return [] if job is None else job.events[seq:]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of remembered jobs per status."""
+        with self._lock:
+            counts = {status: 0 for status in ("queued", "running", "succeeded", "failed")}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def _record(self, job: Job, stage: str, details: Dict[str, Any]):
+        with self._lock:
+            self._append_event(job, stage, details)
+
+    @staticmethod
+    def _append_event(job: Job, stage: str, details: Dict[str, Any]):
+        job.stage = stage
+        job.events.append({"seq": len(job.events), "stage": stage, "time": time.time(), **details})
+
+    @staticmethod
+    def _job_from_checkpoint(job_id: str) -> Optional[Job]:
+        if not PIPELINE_CHECKPOINTS:
+            return None
+        from graph.pipeline import get_run_state
+
+        saved = get_run_state(job_id)
+        if not saved or not saved.get("user_prompt"):
+            return None
+        # make_ad saves every option it was called with as `run_options`
+        options = dict(saved.get("run_options") or {})
+        return Job(id=job_id, campaign_idea=saved["user_prompt"], options=options, status="failed")
+
+    def _shared_downloader(self):
+        from modules.downloader import ClipDownloader
+
+        with self._lock:
+            if self._downloader is None:
+                self._downloader = ClipDownloader(os.path.join(self.output_dir, "clips"))
+            return self._downloader
+
+    def _run(self, job: Job):
+        # Imported here so the API can start without loading the media stack
+        from trim import VideoAssembler, make_ad
+
+        with self._lock:
+            job.status = "running"
+            job.started_at = time.time()
+        try:
+            job_dir = os.path.join(self.output_dir, job.id)
+            assembler = VideoAssembler(
+                output_dir=job_dir,
+                temp_dir=os.path.join(job_dir, "temp"),
+                downloader=self._shared_downloader(),
+            )
+            # Every trace event of the run carries the job id
+            with trace_context(job.id):
+                final = make_ad(
+                    job.campaign_idea,
+                    assembler=assembler,
+                    progress=lambda stage, details: self._record(job, stage, details),
+                    run_id=job.id if PIPELINE_CHECKPOINTS else None,
+                    **job.options,
+                )
+            if final.error:
+                status, error = "failed", final.error
+            elif final.missing_scenes:
+                # The partial ad is kept, but the job stays resumable for the missing scenes
+                status = "failed"
+                error = f"No clip for scene(s) {', '.join(map(str, final.missing_scenes))}"
+            else:
+                status, error = "succeeded", None
+            output_path = final.output_path
+        except Exception as e:
+            status, error, output_path = "failed", str(e), None
+
+        with self._lock:
+            job.status = status
+            job.error = error
+            job.output_path = output_path
+            job.finished_at = time.time()
+            self._pending -= 1
+            # Same critical section as the status change, so a reader that sees
+            # the job finished also sees its last event
+            self._append_event(job, "done", {"status": status, "error": error})
+
+
+_shared_manager: Optional[JobManager] = None
+_shared_lock = threading.Lock()
+
+def get_job_manager() -> JobManager:
+    """
+    Returns the process-wide JobManager.
+    """
+    global _shared_manager
+    if _shared_manager is None:
+        with _shared_lock:
+            if _shared_manager is None:
+                _shared_manager = JobManager()
+    return _shared_manager
+
+
+def shutdown_job_manager(wait: bool = True):
+    """Stops the shared manager, if it was started."""
+    global _shared_manager
+    with _shared_lock:
+        if _shared_manager is not None:
+            _shared_manager.shutdown(wait=wait)
+            _shared_manager = None
@@ -0,0 +1,201 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from utils.embeddings import EMBEDDING_MODEL, get_sentence_model
+from utils.metrics import with_trace
+
+load_dotenv()
+
+# ——— CONFIG ———
+# "llm" asks Groq, "keybert" extracts locally, "auto" asks Groq but falls
+# back to KeyBERT when the call errors or exceeds SEARCH_TERMS_LLM_TIMEOUT_S
+SEARCH_TERMS_BACKEND = os.getenv("SEARCH_TERMS_BACKEND", "llm")
+SEARCH_TERMS_LLM_TIMEOUT_S = float(os.getenv("SEARCH_TERMS_LLM_TIMEOUT_S", "3"))
+SEARCH_TERMS_BACKENDS = ("llm", "keybert", "auto")
+
+# Threads that run LLM calls we may stop waiting for
+_llm_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search-terms-llm")
+
+
+class KeywordExtractor:
+    """
+    Offline search-term generation with KeyBERT.
+
+    All scene descriptions of a script are processed in a single batched
+    `extract_keywords` call on the shared sentence-transformers model, so no
+    network round trip sits on the critical path.
+    """
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        top_n: int = 3,
+        ngram_range: Tuple[int, int] = (1, 2),
+        diversity: float = 0.5,
+    ):
+        """
+        Args:
+            model_name: sentence-transformers model shared with the reranker
+            top_n: Number of search terms per description
+            ngram_range: Allowed phrase lengths in words
+            diversity: MMR diversity, so the terms don't all say the same thing
+        """
+        self.model_name = model_name
+        self.top_n = top_n
+        self.ngram_range = ngram_range
+        self.diversity = diversity
+        self._keybert = None
+        self._lock = threading.Lock()
+
+    def _get_keybert(self):
+        if self._keybert is None:
+            with self._lock:
+                if self._keybert is None:
+                    from keybert import KeyBERT
+                    self._keybert = KeyBERT(model=get_sentence_model(self.model_name))
+        return self._keybert
+
+    def warm(self):
+        """Loads KeyBERT and its embedding model ahead of the first request."""
+        self._get_keybert()
+
+    def extract(self, descriptions: List[str]) -> List[List[str]]:
+        """
+        Extracts short noun phrases from each description.
+
+        Args:
+            descriptions: Scene descriptions, typically every scene of a script
+
+        Returns:
+            One list of up to `top_n` search terms per description
+        """
+        if not descriptions:
+            return []
+
+        keywords = self._get_keybert().extract_keywords(
+            list(descriptions),
+            keyphrase_ngram_range=self.ngram_range,
+            stop_words="english",
+            top_n=self.top_n,
+            use_mmr=True,
+            diversity=self.diversity,
+        )
+        # KeyBERT returns a flat list for a single document
+        if len(descriptions) == 1:
+            keywords = [keywords]
+
+        terms = []
+        for description, scored in zip(descriptions, keywords):
+            found = [kw for kw, _ in scored]
+            terms.append(found or [description])
+        return terms
+
+
+_shared_extractor: Optional[KeywordExtractor] = None
+_shared_lock = threading.Lock()
+
+def get_keyword_extractor() -> KeywordExtractor:
+    """
+    Returns the process-wide KeywordExtractor.
+    """
+    global _shared_extractor
+    if _shared_extractor is None:
+        with _shared_lock:
+            if _shared_extractor is None:
+                _shared_extractor = KeywordExtractor()
+    return _shared_extractor
+
+
+def generate_search_terms(
+    descriptions: List[str],
+    llm_terms: Callable[[str], List[str]],
+    backend: str = SEARCH_TERMS_BACKEND,
+    timeout: float = SEARCH_TERMS_LLM_TIMEOUT_S,
+) -> List[List[str]]:
+    """
+    Produces search terms for every scene with the selected backend.
+
+    Args:
+        descriptions: Scene descriptions
+        llm_terms: Generates terms for one description with the LLM
+        backend: "llm", "keybert" or "auto"
+        timeout: In "auto" mode, seconds to wait for the LLM before falling back
+
+    Returns:
+        One list of search terms per description
+    """
+    if backend not in SEARCH_TERMS_BACKENDS:
+        raise ValueError(f"Unknown search terms backend '{backend}', expected one of {SEARCH_TERMS_BACKENDS}")
+
+    if backend == "keybert":
+        return get_keyword_extractor().extract(descriptions)
+    if backend == "llm":
+        return [llm_terms(d) for d in descriptions]
+
+    # "auto": issue all LLM calls at once and replace the slow or failed ones
+    futures = [_llm_executor.submit(with_trace(llm_terms), d) for d in descriptions]
+    deadline = time.monotonic() + timeout
+    terms: List[Optional[List[str]]] = []
+    for future in futures:
+        try:
+            remaining = max(0.0, deadline - time.monotonic())
+            terms.append(future.result(timeout=remaining) or None)
+        except Exception as e:
+            print(f"Falling back to KeyBERT search terms: {e!r}")
+            terms.append(None)
+
+    missing = [i for i, t in enumerate(terms) if t is None]
+    if missing:
+        fallback = get_keyword_extractor().extract([descriptions[i] for i in missing])
+        for i, t in zip(missing, fallback):
+            terms[i] = t
+    return terms
+
+
+def compare_terms(
+    llm_terms: List[List[str]],
+    keybert_terms: List[List[str]],
+    model_name: str = EMBEDDING_MODEL,
+) -> Dict[str, Any]:
+    """
+    Measures how closely KeyBERT's terms match the LLM's, scene by scene.
+
+    Two scores are reported per scene:
+      - word_overlap: Jaccard similarity of the words used by both term sets
+      - semantic: mean, over the LLM terms, of the best cosine similarity to
+        any KeyBERT term
+
+    Args:
+        llm_terms: LLM search terms per scene
+        keybert_terms: KeyBERT search terms per scene, aligned with `llm_terms`
+        model_name: Embedding model used for the semantic score
+
+    Returns:
+        Dictionary with per-scene scores and their means
+    """
+    model = get_sentence_model(model_name)
+    scenes = []
+    for llm, kb in zip(llm_terms, keybert_terms):
+        llm_words = {w for t in llm for w in t.lower().split()}
+        kb_words = {w for t in kb for w in t.lower().split()}
+        union = llm_words | kb_words
+        overlap = len(llm_words & kb_words) / len(union) if union else 0.0
+
+        semantic = 0.0
+        if llm and kb:
+            emb = model.encode(list(llm) + list(kb), convert_to_numpy=True,
+                               normalize_embeddings=True, show_progress_bar=False)
+            sims = emb[:len(llm)] @ emb[len(llm):].T
+            semantic = float(sims.max(axis=1).mean())
+
+        scenes.append({"llm": llm, "keybert": kb, "word_overlap": overlap, "semantic": semantic})
+
+    return {
+        "scenes": scenes,
+        "mean_word_overlap": float(np.mean([s["word_overlap"] for s in scenes])) if scenes else 0.0,
+        "mean_semantic": float(np.mean([s["semantic"] for s in scenes])) if scenes else 0.0,
+    }
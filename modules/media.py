@@ -0,0 +1,200 @@
+import os
+from collections import Counter
+from dataclasses import dataclass, replace
+from typing import List, Optional, Tuple
+import ffmpeg
+from utils.metrics import timed
+
+# Encoders used when a clip has to be re-encoded to match the others
+ENCODERS = {
+    "h264": "libx264",
+    "hevc": "libx265",
+    "vp9": "libvpx-vp9",
+    "av1": "libsvtav1",
+    "mpeg4": "mpeg4",
+}
+AUDIO_ENCODERS = {
+    "aac": "aac",
+    "mp3": "libmp3lame",
+    "opus": "libopus",
+}
+# ffprobe's H.264 profile names and the x264 profile that encodes them; other
+# profiles (Extended, the Intra variants, ...) are left to x264's default
+X264_PROFILES = {
+    "baseline": "baseline",
+    "constrained baseline": "baseline",
+    "main": "main",
+    "high": "high",
+    "high 10": "high10",
+    "high 4:2:2": "high422",
+    "high 4:4:4 predictive": "high444",
+}
+# Used when the clips' common profile has a codec we can't encode
+DEFAULT_CODEC = "h264"
+DEFAULT_PIX_FMT = "yuv420p"
+
+
+@dataclass(frozen=True)
+class ClipProfile:
+    """
+    Stream parameters that must match for clips to be joined without re-encoding.
+    """
+    codec: str
+    profile: Optional[str]
+    width: int
+    height: int
+    pix_fmt: str
+    fps: str               # exact frame rate as a fraction, e.g. "30000/1001"
+    time_base: str         # e.g. "1/15360"
+    audio_codec: Optional[str] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+
+
+def probe_clip(path: str) -> ClipProfile:
+    """
+    Reads a clip's stream parameters with ffprobe.
+
+    Raises:
+        ValueError: If the file has no video stream
+    """
+    with timed("probe"):
+        streams = ffmpeg.probe(path)["streams"]
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    if video is None:
+        raise ValueError(f"No video stream in {path}")
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+    return ClipProfile(
+        codec=video["codec_name"],
+        profile=video.get("profile"),
+        width=int(video["width"]),
+        height=int(video["height"]),
+        pix_fmt=video.get("pix_fmt", DEFAULT_PIX_FMT),
+        fps=video.get("r_frame_rate", "30/1"),
+        time_base=video.get("time_base", "1/15360"),
+        audio_codec=audio["codec_name"] if audio else None,
+        sample_rate=int(audio["sample_rate"]) if audio else None,
+        channels=int(audio["channels"]) if audio else None,
+    )
+
+
+def common_profile(profiles: List[ClipProfile]) -> ClipProfile:
+    """
+    Picks the target profile for a set of clips: the one most clips already
+    have, so the fewest clips need re-encoding. Ties go to the earliest clip.
+    """
+    counts = Counter(profiles)
+    target = max(profiles, key=lambda p: counts[p])
+    if target.codec not in ENCODERS:
+        target = replace(target, codec=DEFAULT_CODEC, profile=None, pix_fmt=DEFAULT_PIX_FMT)
+    if target.audio_codec is not None and target.audio_codec not in AUDIO_ENCODERS:
+        target = replace(target, audio_codec="aac")
+    return target
+
+
+def normalize_clip(input_path: str, output_path: str, target: ClipProfile):
+    """
+    Re-encodes one clip to exactly match `target`, letterboxing rather than
+    stretching when the aspect ratio differs.
+    """
+    source = ffmpeg.input(input_path)
+    video = (
+        source.video
+        .filter("scale", target.width, target.height, force_original_aspect_ratio="decrease")
+        .filter("pad", target.width, target.height, "(ow-iw)/2", "(oh-ih)/2")
+        .filter("setsar", 1)
+        .filter("fps", fps=target.fps)
+    )
+
+    video_args = {
+        "vcodec": ENCODERS[target.codec],
+        "pix_fmt": target.pix_fmt,
+        # Matching the mp4 track timescale keeps timestamps compatible for stream copy
+        "video_track_timescale": target.time_base.split("/")[1],
+    }
+    x264_profile = X264_PROFILES.get((target.profile or "").lower()) if target.codec == "h264" else None
+    if x264_profile:
+        video_args["profile:v"] = x264_profile
+
+    if target.audio_codec is None:
+        stream = ffmpeg.output(video, output_path, an=None, **video_args)
+    else:
+        has_audio = any(s.get("codec_type") == "audio" for s in ffmpeg.probe(input_path)["streams"])
+        if has_audio:
+            audio = source.audio
+        else:
+            # Give silent clips a matching silent track so the concat stays aligned
+            layout = "mono" if target.channels == 1 else "stereo"
+            audio = ffmpeg.input(f"anullsrc=channel_layout={layout}:sample_rate={target.sample_rate}", f="lavfi")
+        stream = ffmpeg.output(
+            video, audio, output_path,
+            acodec=AUDIO_ENCODERS[target.audio_codec],
+            ar=target.sample_rate,
+            ac=target.channels,
+            shortest=None,
+            **video_args,
+        )
+    with timed("normalize", codec=target.codec, resolution=f"{target.width}x{target.height}"):
+        stream.run(quiet=True, overwrite_output=True)
+
+
+def concat_copy(paths: List[str], output_path: str):
+    """
+    Joins clips with identical stream parameters using the concat demuxer,
+    copying the encoded streams instead of re-encoding them.
+    """
+    list_path = output_path + ".concat.txt"
+    with open(list_path, "w") as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    try:
+        with timed("concat", clips=len(paths)):
+            (
+                ffmpeg
+                .input(list_path, format="concat", safe=0)
+                .output(output_path, c="copy", movflags="+faststart")
+                .run(quiet=True, overwrite_output=True)
+            )
+    finally:
+        os.remove(list_path)
+
+
+def mix_narration(video_path: str, narration: List[Tuple[float, str]], output_path: str,
+                  background_volume: float = 0.3):
+    """
+    Lays narration over a finished video, each line starting at its offset.
+
+    The video stream is copied; only the audio is encoded. The clips' own
+    audio, if any, is kept underneath at `background_volume`.
+
+    Args:
+        video_path: Assembled ad
+        narration: (offset in seconds, audio file) per line
+        output_path: Where to write the narrated ad
+        background_volume: Gain applied to the original audio
+    """
+    source = ffmpeg.input(video_path)
+    lines = [
+        ffmpeg.input(path).audio.filter("adelay", delays=int(offset * 1000), all=1)
+        for offset, path in narration
+    ]
+    voice = lines[0] if len(lines) == 1 else ffmpeg.filter(lines, "amix", inputs=len(lines), normalize=0)
+    # Padded so the audio runs to the end of the video
+    voice = voice.filter("apad")
+
+    has_audio = any(s.get("codec_type") == "audio" for s in ffmpeg.probe(video_path)["streams"])
+    if has_audio:
+        background = source.audio.filter("volume", background_volume)
+        audio = ffmpeg.filter([background, voice], "amix", inputs=2, duration="first", normalize=0)
+    else:
+        audio = voice
+
+    with timed("mix_narration", lines=len(narration)):
+        (
+            ffmpeg
+            .output(source.video, audio, output_path, vcodec="copy", acodec="aac",
+                    shortest=None, movflags="+faststart")
+            .run(quiet=True, overwrite_output=True)
+        )
@@ -0,0 +1,284 @@
+import os
+import time
+import asyncio
+import threading
+from typing import List, Dict, Any, Optional, Coroutine
+import httpx
+from dotenv import load_dotenv
+from utils.search_cache import SearchCache, get_search_cache
+from modules.rate_limit import RateLimiter, get_rate_limiter
+from utils.metrics import PIXABAY_REQUESTS, trace
+
+load_dotenv()
+
+# ——— CONFIG ———
+PIXABAY_VIDEO_URL = os.getenv("PIXABAY_VIDEO_URL", "https://pixabay.com/api/videos/")
+PIXABAY_API_KEY = os.getenv("PIXABAY_API_KEY")
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("PIXABAY_MAX_CONCURRENCY", "8"))
+DEFAULT_TIMEOUT_S = float(os.getenv("PIXABAY_TIMEOUT_S", "10"))
+DEFAULT_MAX_CONNECTIONS = 20
+
+EMPTY_RESULT: Dict[str, Any] = {"total": 0, "totalHits": 0, "hits": []}
+
+
+# ——— ASYNC CLIENT ———
+class AsyncPixabayClient:
+    """
+    Async Pixabay video search over a single keep-alive connection pool.
+
+    All queries issued through one client share the same `httpx.AsyncClient`,
+    so the TCP/TLS handshake to pixabay.com is paid once rather than per query.
+    A semaphore bounds how many requests are in flight at a time, and an
+    optional SearchCache answers repeat queries without touching the network.
+    Requests that do reach Pixabay go through the shared rate limiter, which
+    spaces them to the per-minute quota and retries 429s.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT_S,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        base_url: str = PIXABAY_VIDEO_URL,
+        cache: Optional[SearchCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        """
+        Args:
+            api_key: Pixabay API key. Defaults to the PIXABAY_API_KEY environment variable.
+            max_concurrency: Maximum number of requests in flight at once
+            timeout: Per-request timeout in seconds
+            max_connections: Size of the keep-alive connection pool
+            base_url: Pixabay videos endpoint
+            cache: Response cache consulted before each request
+            rate_limiter: Defaults to the process-wide "pixabay" limiter
+        """
+        self.api_key = api_key or PIXABAY_API_KEY
+        if not self.api_key:
+            raise ValueError(
+                "No Pixabay API key provided. Either pass it directly or set the PIXABAY_API_KEY environment variable."
+            )
+
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.cache = cache
+        self.rate_limiter = rate_limiter or get_rate_limiter("pixabay")
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool and semaphore bind to the loop that uses them
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def search(self, query: str, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+        """
+        Search for videos on Pixabay with the given query.
+
+        Args:
+            query: Search term
+            page: Page number for pagination
+            per_page: Number of results per page
+
+        Returns:
+            Dictionary containing search results
+
+        Raises:
+            httpx.HTTPError: If the request fails or times out
+        """
+        if self.cache is not None:
+            cached = self.cache.get(query, page, per_page)
+            if cached is not None:
+                PIXABAY_REQUESTS.inc(cache="hit", status="ok")
+                trace("pixabay", query=query, page=page, cache="hit")
+                return cached
+
+        client = self._get_client()
+
+        async def get() -> httpx.Response:
+            response = await client.get(
+                self.base_url,
+                params={
+                    "key": self.api_key,
+                    "q": query,
+                    "page": page,
+                    "per_page": per_page
+                }
+            )
+            response.raise_for_status()
+            return response
+
+        cache_state = "miss" if self.cache is not None else "disabled"
+        start = time.perf_counter()
+        try:
+            async with self._semaphore:
+                response = await self.rate_limiter.acall(get)
+        except Exception as e:
+            PIXABAY_REQUESTS.inc(cache=cache_state, status="error")
+            trace("pixabay", query=query, page=page, cache=cache_state, status="error",
+                  duration_s=round(time.perf_counter() - start, 6), error=str(e))
+            raise
+        PIXABAY_REQUESTS.inc(cache=cache_state, status="ok")
+        trace("pixabay", query=query, page=page, cache=cache_state, status="ok",
+              duration_s=round(time.perf_counter() - start, 6))
+        result = response.json()
+
+        if self.cache is not None:
+            self.cache.set(query, page, per_page, result)
+        return result
+
+    async def search_many(
+        self,
+        queries: List[str],
+        page: int = 1,
+        per_page: int = 20,
+        raise_on_error: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run several searches concurrently.
+
+        Args:
+            queries: Search terms to send
+            page: Page number for pagination
+            per_page: Number of results per page
+            raise_on_error: Re-raise the first failed request instead of
+                substituting an empty result for it
+
+        Returns:
+            One result dict per query, in the same order as `queries`
+        """
+        results = await asyncio.gather(
+            *(self.search(q, page, per_page) for q in queries),
+            return_exceptions=True,
+        )
+
+        out = []
+        for query, result in zip(queries, results):
+            if isinstance(result, BaseException):
+                if raise_on_error:
+                    raise result
+                print(f"Error searching Pixabay for '{query}': {result}")
+                out.append(dict(EMPTY_RESULT))
+            else:
+                out.append(result)
+        return out
+
+    async def search_scenes(
+        self,
+        scene_queries: List[List[str]],
+        page: int = 1,
+        per_page: int = 20,
+        raise_on_error: bool = False,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run the searches for every scene of a script at once.
+
+        Args:
+            scene_queries: One list of search terms per scene
+            page: Page number for pagination
+            per_page: Number of results per page
+            raise_on_error: See `search_many`
+
+        Returns:
+            One list of result dicts per scene, in scene order
+        """
+        flat = [q for queries in scene_queries for q in queries]
+        results = await self.search_many(flat, page, per_page, raise_on_error)
+
+        out, i = [], 0
+        for queries in scene_queries:
+            out.append(results[i:i + len(queries)])
+            i += len(queries)
+        return out
+
+    async def aclose(self):
+        """Close the underlying connection pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+
+
+# ——— SYNC WRAPPER ———
+class PixabayClient:
+    """
+    Blocking facade over `AsyncPixabayClient` for the existing sync callers.
+
+    The async client lives on a private event loop running in a daemon thread,
+    so its connection pool stays warm across calls and the wrapper also works
+    when called from code that is itself running inside an event loop.
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Args:
+            **kwargs: Forwarded to `AsyncPixabayClient`. The shared SearchCache
+                is used unless `cache` is given explicitly.
+        """
+        kwargs.setdefault("cache", get_search_cache())
+        self.async_client = AsyncPixabayClient(**kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="pixabay-client", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, coro: Coroutine) -> Any:
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def search(self, query: str, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+        """Blocking version of `AsyncPixabayClient.search`."""
+        return self._run(self.async_client.search(query, page, per_page))
+
+    def search_many(
+        self,
+        queries: List[str],
+        page: int = 1,
+        per_page: int = 20,
+        raise_on_error: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Blocking version of `AsyncPixabayClient.search_many`."""
+        return self._run(self.async_client.search_many(queries, page, per_page, raise_on_error))
+
+    def search_scenes(
+        self,
+        scene_queries: List[List[str]],
+        page: int = 1,
+        per_page: int = 20,
+        raise_on_error: bool = False,
+    ) -> List[List[Dict[str, Any]]]:
+        """Blocking version of `AsyncPixabayClient.search_scenes`."""
+        return self._run(self.async_client.search_scenes(scene_queries, page, per_page, raise_on_error))
+
+    def close(self):
+        """Close the connection pool and stop the background loop."""
+        self._run(self.async_client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+_shared_client: Optional[PixabayClient] = None
+_shared_lock = threading.Lock()
+
+def get_pixabay_client() -> PixabayClient:
+    """
+    Returns the process-wide PixabayClient, creating it on first use.
+    """
+    global _shared_client
+    if _shared_client is None:
+        with _shared_lock:
+            if _shared_client is None:
+                _shared_client = PixabayClient()
+    return _shared_client
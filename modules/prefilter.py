@@ -0,0 +1,202 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ——— CONFIG ———
+# Candidates handed to the ranker after prefiltering
+PREFILTER_TOP_K = int(os.getenv("PREFILTER_TOP_K", "10"))
+# Hits requested per search query (Pixabay allows 3-200)
+SEARCH_PER_PAGE = min(200, max(3, int(os.getenv("SEARCH_PER_PAGE", "20"))))
+# Aspect ratios within this factor of 1 count as square
+SQUARE_TOLERANCE = 1.1
+
+# Weights of the heuristic score; each feature is scaled to [0, 1]
+SCORE_WEIGHTS: Dict[str, float] = {
+    "relevance": 0.35,   # position in Pixabay's result list
+    "duration": 0.20,    # clips close to the scene length mean less footage to fetch and trim
+    "aspect": 0.15,      # closeness to the target aspect ratio
+    "resolution": 0.10,  # largest rendition covers the target height
+    "downloads": 0.12,   # log-scaled, relative to the other candidates
+    "views": 0.08,
+}
+
+
+def parse_duration(value: Any) -> float:
+    """
+    Reads a scene duration such as "5s", "5 seconds" or 5 as seconds; 0 when unknown.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r"\d+(?:\.\d+)?", str(value or ""))
+    return float(match.group()) if match else 0.0
+
+
+def orientation(width: float, height: float) -> str:
+    """"landscape", "portrait" or "square"."""
+    if width <= 0 or height <= 0:
+        return "landscape"
+    ratio = width / height
+    if ratio > SQUARE_TOLERANCE:
+        return "landscape"
+    if ratio < 1 / SQUARE_TOLERANCE:
+        return "portrait"
+    return "square"
+
+
+@dataclass
+class PrefilterResult:
+    """Outcome of prefiltering one scene's candidates."""
+    indices: np.ndarray    # indices into the hits passed in, best first (top-k survivors)
+    scores: np.ndarray     # heuristic score for every hit; -inf for dropped ones
+    dropped_short: int     # hits shorter than the scene; 0 when relaxed
+    dropped_orientation: int
+    relaxed: bool = False  # nothing survived, so the filters were ignored and nothing was dropped
+
+
+def candidate_arrays(hits: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Loads the fields the prefilter needs into arrays aligned with `hits`.
+
+    Width and height come from the largest rendition.
+    """
+    n = len(hits)
+    width = np.zeros(n, dtype=np.float64)
+    height = np.zeros(n, dtype=np.float64)
+    for i, hit in enumerate(hits):
+        files = [f for f in (hit.get("videos") or {}).values() if f.get("url")]
+        if files:
+            largest = max(files, key=lambda f: f.get("width", 0) * f.get("height", 0))
+            width[i], height[i] = largest.get("width", 0), largest.get("height", 0)
+    return {
+        "duration": np.fromiter((h.get("duration") or 0 for h in hits), dtype=np.float64, count=n),
+        "views": np.fromiter((h.get("views") or 0 for h in hits), dtype=np.float64, count=n),
+        "downloads": np.fromiter((h.get("downloads") or 0 for h in hits), dtype=np.float64, count=n),
+        "width": width,
+        "height": height,
+    }
+
+
+def duration_fit(duration: np.ndarray, min_duration: float) -> np.ndarray:
+    """
+    1.0 for a clip exactly as long as the scene, falling off as clips get
+    longer (more footage to fetch) and, more steeply, shorter.
+    """
+    if min_duration <= 0:
+        return np.ones(len(duration))
+    duration = np.maximum(duration, 1e-9)
+    return np.where(duration >= min_duration, min_duration / duration, (duration / min_duration) ** 2)
+
+
+def _relative_log(values: np.ndarray) -> np.ndarray:
+    scaled = np.log1p(values)
+    top = scaled.max() if len(scaled) else 0.0
+    return scaled / top if top > 0 else np.zeros_like(scaled)
+
+
+def score_candidates(
+    arrays: Dict[str, np.ndarray],
+    min_duration: float,
+    target: Tuple[int, int],
+    positions: Optional[np.ndarray] = None,
+    weights: Dict[str, float] = SCORE_WEIGHTS,
+) -> np.ndarray:
+    """
+    Scores every candidate in one vectorized pass. Higher is better; the
+    maximum is the sum of `weights`.
+
+    Args:
+        arrays: Output of `candidate_arrays`
+        min_duration: Scene duration in seconds (0 when unknown)
+        target: Output (width, height)
+        positions: Each hit's position in its search results; defaults to list order
+        weights: Feature weights
+    """
+    n = len(arrays["duration"])
+    duration, width, height = arrays["duration"], arrays["width"], arrays["height"]
+    target_ratio = target[0] / target[1]
+    if positions is None:
+        positions = np.arange(n)
+
+    features = {
+        "relevance": 1.0 - positions / max(positions.max() + 1, 1),
+        "duration": duration_fit(duration, min_duration),
+        "aspect": 1.0 / (1.0 + np.abs(np.log(np.maximum(width, 1) / np.maximum(height, 1) / target_ratio))),
+        "resolution": np.clip(height / target[1], 0.0, 1.0),
+        "downloads": _relative_log(arrays["downloads"]),
+        "views": _relative_log(arrays["views"]),
+    }
+    return sum(weights.get(name, 0.0) * values for name, values in features.items())
+
+
+def prefilter_candidates(
+    hits: List[Dict[str, Any]],
+    min_duration: float = 0.0,
+    target: Tuple[int, int] = (1920, 1080),
+    top_k: int = PREFILTER_TOP_K,
+    positions: Optional[List[int]] = None,
+) -> PrefilterResult:
+    """
+    Drops candidates that can't serve the scene and keeps the best `top_k`.
+
+    A hit is dropped when it is shorter than `min_duration` or its
+    orientation differs from the target's (a portrait clip for a landscape
+    ad). If that would leave nothing, all hits are scored instead.
+
+    Args:
+        hits: Pixabay hits, in search-relevance order
+        min_duration: Scene duration in seconds (0 disables the check)
+        target: Output (width, height)
+        top_k: Candidates to keep
+        positions: Each hit's position in its own search results, when the
+            hits of several queries were merged; defaults to list order
+
+    Returns:
+        PrefilterResult; `indices` are best first
+    """
+    if not hits:
+        return PrefilterResult(np.zeros(0, dtype=np.int64), np.zeros(0), 0, 0)
+
+    arrays = candidate_arrays(hits)
+    too_short = arrays["duration"] < min_duration if min_duration > 0 else np.zeros(len(hits), dtype=bool)
+
+    ratio = arrays["width"] / np.maximum(arrays["height"], 1)
+    want = orientation(*target)
+    if want == "landscape":
+        wrong_orientation = ratio <= SQUARE_TOLERANCE
+    elif want == "portrait":
+        wrong_orientation = ratio >= 1 / SQUARE_TOLERANCE
+    else:
+        wrong_orientation = (ratio > SQUARE_TOLERANCE) | (ratio < 1 / SQUARE_TOLERANCE)
+    # Hits without size information are kept
+    wrong_orientation &= arrays["height"] > 0
+
+    keep = ~(too_short | wrong_orientation)
+    relaxed = not keep.any()
+    if relaxed:
+        keep = np.ones(len(hits), dtype=bool)
+
+    position_array = None if positions is None else np.asarray(positions, dtype=np.float64)
+    scores = np.where(keep, score_candidates(arrays, min_duration, target, position_array), -np.inf)
+    k = min(top_k, int(keep.sum()))
+    # argpartition keeps this linear in the number of hits
+    top = np.argpartition(-scores, k - 1)[:k] if k < len(hits) else np.arange(len(hits))
+    order = top[np.argsort(-scores[top], kind="stable")]
+    order = order[np.isfinite(scores[order])]
+    if relaxed:
+        # Every hit was scored after all, so nothing was actually dropped
+        dropped_short = dropped_orientation = 0
+    else:
+        dropped_short = int(too_short.sum())
+        dropped_orientation = int((wrong_orientation & ~too_short).sum())
+    return PrefilterResult(
+        indices=order,
+        scores=scores,
+        dropped_short=dropped_short,
+        dropped_orientation=dropped_orientation,
+        relaxed=relaxed,
+    )
@@ -0,0 +1,301 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+from dotenv import load_dotenv
+from utils.prompt_budget import count_tokens
+
+load_dotenv()
+
+# ——— CONFIG ———
+GROQ_RPM = float(os.getenv("GROQ_RPM", "30"))
+GROQ_TPM = float(os.getenv("GROQ_TPM", "6000"))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+PIXABAY_RPM = float(os.getenv("PIXABAY_RPM", "100"))
+PIXABAY_MAX_CONCURRENCY = int(os.getenv("PIXABAY_MAX_CONCURRENCY", "8"))
+RATE_LIMIT_MAX_ATTEMPTS = int(os.getenv("RATE_LIMIT_MAX_ATTEMPTS", "6"))
+RATE_LIMIT_MAX_BACKOFF_S = float(os.getenv("RATE_LIMIT_MAX_BACKOFF_S", "60"))
+
+# Responses that mean "slow down" rather than "this request is wrong"
+RETRY_STATUSES = (429, 503)
+
+T = TypeVar("T")
+
+
+def estimate_tokens(*texts: str, max_tokens: int = 0) -> int:
+    """Token cost of a request: the prompt's approximate token count plus the completion cap."""
+    return sum(count_tokens(t) for t in texts) + max_tokens
+
+
+def retry_after_s(exc: BaseException) -> Optional[float]:
+    """
+    Returns the wait the server asked for if `exc` is a rate-limit response
+    (0.0 when it gave no Retry-After), or None for any other error.
+
+    Works with requests, httpx and Groq SDK exceptions, which all expose the
+    HTTP response as `exc.response`.
+    """
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None) or getattr(exc, "status_code", None)
+    if status not in RETRY_STATUSES:
+        return None
+
+    value = response.headers.get("retry-after") if response is not None else None
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+
+
+class TokenBucket:
+    """
+    Refills continuously at `rate_per_min`, holding at most `capacity` units.
+    Not thread-safe on its own; `RateLimiter` guards it.
+    """
+
+    def __init__(self, rate_per_min: float, capacity: Optional[float] = None):
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_min
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+    def drain(self):
+        self.level = 0.0
+
+
+class RateLimiter:
+    """
+    Shared scheduler for one upstream API.
+
+    Every call waits for:
+    - a request from the requests-per-minute bucket,
+    - `cost` units from the tokens-per-minute bucket, if one is configured,
+    - a free slot under the adaptive concurrency limit, and
+    - the end of any cooldown a 429 asked for.
+
+    The concurrency limit follows AIMD: it grows by one slot per `limit`
+    successful calls up to `max_concurrency` and halves on every rate-limit
+    response, so it settles just under what the API sustains. A 429 also
+    empties the buckets and pauses all callers for the Retry-After period.
+    Rate-limited calls are retried with jittered exponential backoff, never
+    sooner than Retry-After.
+
+    Sync callers use `call`, or `hold` for responses read after the call
+    returns (streams); coroutines use `acall`. All share state, so threads
+    and event loops drawing on the same API are scheduled together.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_min: float,
+        tokens_per_min: Optional[float] = None,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_attempts: int = RATE_LIMIT_MAX_ATTEMPTS,
+        base_backoff_s: float = 1.0,
+        max_backoff_s: float = RATE_LIMIT_MAX_BACKOFF_S,
+    ):
+        """
+        Args:
+            name: Label used in log messages and stats
+            requests_per_min: Request budget
+            tokens_per_min: Token budget, or None if the API has none
+            max_concurrency: Upper bound for the adaptive concurrency limit
+            min_concurrency: Lower bound for the adaptive concurrency limit
+            max_attempts: Tries per call before a rate-limit error is raised
+            base_backoff_s: First backoff step
+            max_backoff_s: Cap for a single backoff
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_attempts = max_attempts
+        self.base_backoff_s = base_backoff_s
+        self.max_backoff_s = max_backoff_s
+
+        self._requests = TokenBucket(requests_per_min)
+        self._tokens = TokenBucket(tokens_per_min) if tokens_per_min else None
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.throttled = 0
+        self.failures = 0
+
+    @property
+    def concurrency_limit(self) -> int:
+        return max(self.min_concurrency, int(self._limit))
+
+    def _try_enter(self, cost: float) -> float:
+        """Takes a slot and budget if available; otherwise returns how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self._cooldown_until - now,
+                self._requests.wait_time(1, now),
+                self._tokens.wait_time(cost, now) if self._tokens else 0.0,
+            )
+            if wait > 0:
+                return wait
+            if self._in_flight >= self.concurrency_limit:
+                # Slots free up on completion; poll again shortly
+                return 0.05
+            self._requests.take(1)
+            if self._tokens:
+                self._tokens.take(cost)
+            self._in_flight += 1
+            return 0.0
+
+    def _exit(self, retry_after: Optional[float] = None, failed: bool = False):
+        with self._lock:
+            self._in_flight -= 1
+            if failed:
+                # Other errors say nothing about the rate limit
+                return
+            if retry_after is None:
+                self.calls += 1
+                self._limit = min(self.max_concurrency, self._limit + 1.0 / self._limit)
+                return
+            self.throttled += 1
+            self._limit = max(self.min_concurrency, self._limit / 2)
+            # The server's view of our budget is what counts; start refilling from empty
+            self._requests.drain()
+            if self._tokens:
+                self._tokens.drain()
+            if retry_after:
+                self._cooldown_until = max(self._cooldown_until, time.monotonic() + retry_after)
+
+    def _backoff(self, attempt: int, retry_after: float) -> float:
+        ceiling = min(self.max_backoff_s, self.base_backoff_s * 2 ** attempt)
+        return max(retry_after, random.uniform(0, ceiling)) + random.uniform(0, self.base_backoff_s / 2)
+
+    def _give_up(self, attempt: int, exc: BaseException) -> bool:
+        if attempt + 1 < self.max_attempts:
+            return False
+        with self._lock:
+            self.failures += 1
+        print(f"{self.name}: still rate limited after {self.max_attempts} attempts: {exc}")
+        return True
+
+    def call(self, fn: Callable[..., T], *args, cost: float = 1, **kwargs) -> T:
+        """
+        Runs `fn(*args, **kwargs)` under the limits, retrying rate-limit errors.
+
+        Args:
+            fn: Function performing one API request; it must raise on a 429
+            cost: Tokens the request is expected to use (ignored without a token budget)
+
+        Raises:
+            Whatever `fn` raises, once retries are exhausted or for non rate-limit errors
+        """
+        result = self._enter_call(fn, args, kwargs, cost)
+        self._exit(None)
+        return result
+
+    @contextmanager
+    def hold(self, fn: Callable[..., T], *args, cost: float = 1, **kwargs) -> Iterator[T]:
+        """
+        Like `call`, but keeps the concurrency slot until the with block
+        exits, for responses that are consumed after `fn` returns, such as a
+        streamed completion.
+
+        Raises:
+            Whatever `fn` raises, once retries are exhausted or for non rate-limit errors
+        """
+        result = self._enter_call(fn, args, kwargs, cost)
+        try:
+            yield result
+        except BaseException:
+            # e.g. the stream broke off or its reader went away
+            self._exit(failed=True)
+            raise
+        self._exit(None)
+
+    def _enter_call(self, fn: Callable[..., T], args: tuple, kwargs: Dict[str, Any], cost: float) -> T:
+        """Runs `fn` under the limits with retries; on success its slot is still held."""
+        for attempt in range(self.max_attempts):
+            while (wait := self._try_enter(cost)) > 0:
+                time.sleep(wait)
+            try:
+                return fn(*args, **kwargs)
+            except BaseException as e:
+                retry_after = retry_after_s(e)
+                self._exit(retry_after, failed=retry_after is None)
+                if retry_after is None or self._give_up(attempt, e):
+                    raise
+                time.sleep(self._backoff(attempt, retry_after))
+
+    async def acall(self, fn: Callable[..., Awaitable[T]], *args, cost: float = 1, **kwargs) -> T:
+        """Async version of `call` for coroutine functions."""
+        for attempt in range(self.max_attempts):
+            while (wait := self._try_enter(cost)) > 0:
+                await asyncio.sleep(wait)
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException as e:
+                retry_after = retry_after_s(e)
+                self._exit(retry_after, failed=retry_after is None)
+                if retry_after is None or self._give_up(attempt, e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+                continue
+            self._exit(None)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns call counters and the current concurrency limit."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "failures": self.failures,
+                "in_flight": self._in_flight,
+                "concurrency_limit": self.concurrency_limit,
+            }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_shared_lock = threading.Lock()
+
+def get_rate_limiter(name: str) -> RateLimiter:
+    """
+    Returns the process-wide limiter for "groq" or "pixabay".
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _shared_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                if name == "groq":
+                    limiter = RateLimiter("groq", GROQ_RPM, GROQ_TPM, GROQ_MAX_CONCURRENCY)
+                elif name == "pixabay":
+                    limiter = RateLimiter("pixabay", PIXABAY_RPM, None, PIXABAY_MAX_CONCURRENCY)
+                else:
+                    raise ValueError(f"Unknown rate limiter '{name}', expected 'groq' or 'pixabay'")
+                _limiters[name] = limiter
+    return limiter
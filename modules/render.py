@@ -0,0 +1,242 @@
+import os
+import re
+import time
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import ffmpeg
+from dotenv import load_dotenv
+from utils.metrics import timed
+
+load_dotenv()
+
+# ——— CONFIG ———
+# x264/x265 settings per named preset; "draft" is for previews
+ENCODER_PRESETS: Dict[str, Dict[str, object]] = {
+    "draft":    {"preset": "ultrafast", "crf": 30},
+    "standard": {"preset": "veryfast", "crf": 23},
+    "high":     {"preset": "slow", "crf": 18},
+}
+RENDER_PRESET = os.getenv("RENDER_PRESET", "standard")
+RENDER_VCODEC = os.getenv("RENDER_VCODEC", "libx264")
+RENDER_FPS = os.getenv("RENDER_FPS", "30")
+RENDER_AUDIO_RATE = 48000
+# Font for on-screen text; fontconfig's default sans font when unset
+RENDER_FONT_FILE = os.getenv("RENDER_FONT_FILE")
+# Text height as a fraction of the video height
+RENDER_FONT_SCALE = float(os.getenv("RENDER_FONT_SCALE", "0.06"))
+# On-screen text appears this long after its scene starts and leaves as long before it ends
+TEXT_MARGIN_S = 0.2
+# Clip audio is pushed down by up to this ratio while narration plays
+DUCKING_RATIO = float(os.getenv("DUCKING_RATIO", "8"))
+
+
+@dataclass
+class RenderSegment:
+    """One scene of the render: a trimmed clip and what to show over it."""
+    scene_id: int
+    path: str
+    duration_s: float
+    text: str = ""
+    has_audio: bool = True
+
+
+@dataclass
+class RenderStats:
+    output_path: str
+    frames: int
+    wall_time_s: float
+    encode_fps: float     # frames encoded per second of wall time
+    speed: float          # seconds of video per second of wall time
+    text_burned: bool
+
+
+def parse_fps(fps: str) -> float:
+    """Frame rate from "30" or a fraction such as "30000/1001"."""
+    num, _, den = str(fps).partition("/")
+    return float(num) / float(den or 1)
+
+
+@lru_cache(maxsize=None)
+def has_filter(name: str) -> bool:
+    """Whether the local ffmpeg build has the named filter (drawtext needs libfreetype)."""
+    try:
+        listing = subprocess.run(["ffmpeg", "-hide_banner", "-filters"], capture_output=True, text=True).stdout
+    except OSError:
+        return False
+    return re.search(rf"^\s*\S+\s+{re.escape(name)}\s", listing, re.MULTILINE) is not None
+
+
+def encoded_frames(stderr: bytes) -> Optional[int]:
+    """Frames ffmpeg reports having encoded, from its final progress line; None if absent."""
+    counts = re.findall(rb"frame=\s*(\d+)", stderr or b"")
+    return int(counts[-1]) if counts else None
+
+
+def plan_segments(paths: List[Tuple[int, str]], durations: Dict[int, float],
+                  texts: Dict[int, str]) -> List[RenderSegment]:
+    """
+    Builds render segments from trimmed clips, probing each clip for its
+    audio track and real length; a segment lasts the scene's duration or the
+    clip, whichever is shorter.
+
+    Args:
+        paths: (scene id, trimmed clip path), in script order
+        durations: Scene durations in seconds
+        texts: On-screen text per scene
+    """
+    segments = []
+    for scene_id, path in paths:
+        info = ffmpeg.probe(path)
+        clip_s = float(info.get("format", {}).get("duration") or 0) or durations.get(scene_id, 0.0)
+        segments.append(RenderSegment(
+            scene_id=scene_id,
+            path=path,
+            duration_s=min(durations.get(scene_id, clip_s), clip_s),
+            text=(texts.get(scene_id) or "").strip(),
+            has_audio=any(s.get("codec_type") == "audio" for s in info["streams"]),
+        ))
+    return segments
+
+
+def _scene_video(source, segment: RenderSegment, size: Tuple[int, int], fps: str, text_file: Optional[str]):
+    width, height = size
+    video = (
+        source.video
+        .filter("trim", duration=segment.duration_s)
+        .filter("setpts", "PTS-STARTPTS")
+        .filter("scale", width, height, force_original_aspect_ratio="decrease")
+        .filter("pad", width, height, "(ow-iw)/2", "(oh-ih)/2")
+        .filter("setsar", 1)
+        .filter("fps", fps=fps)
+    )
+    if text_file:
+        options = {"fontfile": RENDER_FONT_FILE} if RENDER_FONT_FILE else {}
+        video = video.filter(
+            "drawtext",
+            textfile=text_file,
+            fontsize=max(12, int(height * RENDER_FONT_SCALE)),
+            fontcolor="white",
+            box=1,
+            boxcolor="black@0.45",
+            boxborderw=int(height * 0.015),
+            x="(w-text_w)/2",
+            y="h-text_h-h/10",
+            enable=f"between(t,{TEXT_MARGIN_S},{max(TEXT_MARGIN_S, segment.duration_s - TEXT_MARGIN_S)})",
+            **options,
+        )
+    return video
+
+
+def _scene_audio(source, segment: RenderSegment):
+    if segment.has_audio:
+        audio = (
+            source.audio
+            .filter("atrim", duration=segment.duration_s)
+            .filter("asetpts", "PTS-STARTPTS")
+        )
+    else:
+        audio = ffmpeg.input(f"anullsrc=sample_rate={RENDER_AUDIO_RATE}", f="lavfi", t=segment.duration_s).audio
+    # concat needs every segment's audio in the same format
+    return audio.filter("aformat", sample_rates=RENDER_AUDIO_RATE, channel_layouts="stereo")
+
+
+def render_ad(
+    segments: List[RenderSegment],
+    output_path: str,
+    size: Tuple[int, int],
+    narration: Optional[List[Tuple[float, str]]] = None,
+    fps: str = RENDER_FPS,
+    preset: str = RENDER_PRESET,
+    vcodec: str = RENDER_VCODEC,
+) -> RenderStats:
+    """
+    Renders the final ad in one ffmpeg run with a single encode.
+
+    One filter graph scales and pads every clip to `size`, burns in each
+    scene's on-screen text for the length of the scene, concatenates the
+    scenes, and mixes the narration over the clip audio. The clip audio is
+    ducked (sidechain-compressed) whenever narration plays.
+
+    Args:
+        segments: Scenes in order, from `plan_segments`
+        output_path: Where to write the MP4
+        size: Output (width, height)
+        narration: (offset in seconds, audio file) per voice-over line
+        fps: Output frame rate
+        preset: Name in ENCODER_PRESETS
+        vcodec: ffmpeg video encoder; the presets use x264/x265 option names
+
+    Returns:
+        RenderStats with the encode rate, for sizing render workers
+
+    Raises:
+        ValueError: For no segments or an unknown preset
+        ffmpeg.Error: If ffmpeg fails
+    """
+    if not segments:
+        raise ValueError("Nothing to render")
+    if preset not in ENCODER_PRESETS:
+        raise ValueError(f"Unknown render preset '{preset}', expected one of {', '.join(ENCODER_PRESETS)}")
+
+    burn_text = any(s.text for s in segments) and has_filter("drawtext")
+    if any(s.text for s in segments) and not burn_text:
+        print("ffmpeg has no drawtext filter (needs libfreetype); rendering without on-screen text")
+
+    with tempfile.TemporaryDirectory(prefix="render-") as text_dir:
+        streams = []
+        for segment in segments:
+            text_file = None
+            if burn_text and segment.text:
+                # A text file sidesteps drawtext's escaping rules for quotes and colons
+                text_file = os.path.join(text_dir, f"scene_{segment.scene_id}.txt")
+                with open(text_file, "w") as f:
+                    f.write(segment.text)
+            # One input per clip feeds both its video and audio chains
+            source = ffmpeg.input(segment.path)
+            streams += [_scene_video(source, segment, size, fps, text_file), _scene_audio(source, segment)]
+        joined = ffmpeg.concat(*streams, v=1, a=1).node
+        video, audio = joined[0], joined[1]
+
+        if narration:
+            lines = [
+                ffmpeg.input(path).audio
+                .filter("aformat", sample_rates=RENDER_AUDIO_RATE, channel_layouts="stereo")
+                .filter("adelay", delays=int(offset * 1000), all=1)
+                for offset, path in narration
+            ]
+            voice = lines[0] if len(lines) == 1 else ffmpeg.filter(lines, "amix", inputs=len(lines), normalize=0)
+            voice = voice.filter("apad").filter_multi_output("asplit")
+            ducked = ffmpeg.filter([audio, voice[0]], "sidechaincompress",
+                                   threshold=0.03, ratio=DUCKING_RATIO, attack=20, release=400)
+            audio = ffmpeg.filter([ducked, voice[1]], "amix", inputs=2, duration="first", normalize=0)
+
+        total_s = sum(s.duration_s for s in segments)
+        output = ffmpeg.output(
+            video, audio, output_path,
+            vcodec=vcodec,
+            pix_fmt="yuv420p",
+            acodec="aac",
+            audio_bitrate="128k",
+            movflags="+faststart",
+            **ENCODER_PRESETS[preset],
+        )
+        with timed("render", scenes=len(segments), preset=preset, text=burn_text,
+                   narration=len(narration or [])) as span:
+            start = time.perf_counter()
+            _, stderr = output.run(quiet=True, overwrite_output=True)
+            wall = time.perf_counter() - start
+            # What ffmpeg actually encoded; the planned count only if it printed no stats
+            frames = encoded_frames(stderr) or int(round(total_s * parse_fps(fps)))
+            span.update(frames=frames, encode_fps=round(frames / max(wall, 1e-9), 1))
+
+    return RenderStats(
+        output_path=output_path,
+        frames=frames,
+        wall_time_s=wall,
+        encode_fps=frames / max(wall, 1e-9),
+        speed=total_s / max(wall, 1e-9),
+        text_burned=burn_text,
+    )
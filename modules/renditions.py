@@ -0,0 +1,104 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ——— CONFIG ———
+# Output resolution of the final ad; renditions smaller than this are upscaled
+TARGET_RESOLUTION = os.getenv("TARGET_RESOLUTION", "1920x1080")
+# Optional cap on the total bytes downloaded for one script (0 = no cap)
+SCRIPT_BYTE_BUDGET = int(os.getenv("SCRIPT_BYTE_BUDGET", "0"))
+
+Rendition = Tuple[str, Dict[str, Any]]
+
+
+def parse_resolution(resolution: str) -> Tuple[int, int]:
+    """Parses "1920x1080" into (1920, 1080)."""
+    width, height = resolution.lower().split("x")
+    return int(width), int(height)
+
+
+def _size(file: Dict[str, Any]) -> int:
+    # Pixabay occasionally reports size 0; fall back to pixel count as a proxy
+    return file.get("size") or file.get("width", 0) * file.get("height", 0)
+
+
+def available_renditions(files: Dict[str, Dict[str, Any]]) -> List[Rendition]:
+    """
+    Returns the renditions that actually have a file, smallest first.
+
+    Args:
+        files: The `videos` dict of a Pixabay hit ({"large": {...}, "medium": {...}, ...})
+    """
+    renditions = [(name, f) for name, f in files.items() if f.get("url")]
+    return sorted(renditions, key=lambda r: (_size(r[1]), r[1].get("width", 0) * r[1].get("height", 0)))
+
+
+def meets_resolution(file: Dict[str, Any], target: Tuple[int, int]) -> bool:
+    """True if the rendition covers the target frame without upscaling."""
+    return file.get("width", 0) >= target[0] and file.get("height", 0) >= target[1]
+
+
+def select_rendition(files: Dict[str, Dict[str, Any]], target: Tuple[int, int]) -> Rendition:
+    """
+    Picks the smallest rendition that meets the target resolution, or the
+    highest-resolution one if none does.
+
+    Args:
+        files: The `videos` dict of a Pixabay hit
+        target: (width, height) of the output
+
+    Returns:
+        (rendition name, file dict)
+
+    Raises:
+        ValueError: If the hit has no downloadable rendition
+    """
+    renditions = available_renditions(files)
+    if not renditions:
+        raise ValueError("No downloadable rendition available")
+
+    for name, f in renditions:
+        if meets_resolution(f, target):
+            return name, f
+    return max(renditions, key=lambda r: r[1].get("width", 0) * r[1].get("height", 0))
+
+
+def select_renditions_for_script(
+    files_per_scene: List[Dict[str, Dict[str, Any]]],
+    target: Tuple[int, int],
+    byte_budget: Optional[int] = None,
+) -> List[Rendition]:
+    """
+    Picks one rendition per scene, then fits the whole script into a byte budget.
+
+    Each scene starts with `select_rendition`. While the total exceeds
+    `byte_budget`, the scene with the largest current file steps down to its
+    next smaller rendition; scenes that can't step down further are left as is.
+
+    Args:
+        files_per_scene: The `videos` dict of each scene's chosen hit
+        target: (width, height) of the output
+        byte_budget: Maximum total bytes, or None/0 for no limit
+
+    Returns:
+        (rendition name, file dict) per scene, in the same order
+    """
+    options = [available_renditions(files) for files in files_per_scene]
+    choices = [select_rendition(files, target) for files in files_per_scene]
+    if not byte_budget:
+        return choices
+
+    positions = [[name for name, _ in opts].index(choice[0]) for opts, choice in zip(options, choices)]
+    total = sum(_size(f) for _, f in choices)
+    while total > byte_budget:
+        downgradable = [i for i, pos in enumerate(positions) if pos > 0]
+        if not downgradable:
+            break
+        i = max(downgradable, key=lambda i: _size(choices[i][1]))
+        positions[i] -= 1
+        total -= _size(choices[i][1])
+        choices[i] = options[i][positions[i]]
+        total += _size(choices[i][1])
+    return choices
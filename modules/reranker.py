@@ -0,0 +1,179 @@
+import os
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Callable
+import numpy as np
+from dotenv import load_dotenv
+from utils.embeddings import EMBEDDING_MODEL, get_sentence_model
+
+load_dotenv()
+
+# ——— CONFIG ———
+# "llm" keeps the Groq ranking call, "embedding" scores candidate tags locally,
+# "visual" scores candidate thumbnails with CLIP (modules.visual_reranker)
+RANKER_MODE = os.getenv("VIDEO_RANKER", "llm")
+RANKER_MODES = ("llm", "embedding", "visual")
+# Below this gap between the two best cosine scores the call is handed to the LLM
+RANK_MARGIN = float(os.getenv("VIDEO_RANK_MARGIN", "0.02"))
+# How many of the best-scoring candidates the LLM fallback gets to see
+FALLBACK_TOP_K = 10
+
+
+@dataclass
+class RankResult:
+    """Outcome of ranking one scene's candidates."""
+    best_index: int        # index into the candidate list that was passed in
+    scores: np.ndarray     # cosine similarity for every candidate
+    order: np.ndarray      # candidate indices, best first
+    used_fallback: bool = False
+
+
+def candidate_text(video: Dict[str, Any]) -> str:
+    """The text a Pixabay hit is matched on."""
+    return video.get("tags", "") or ""
+
+
+def rank_from_scores(
+    scores: np.ndarray,
+    videos: List[Dict[str, Any]],
+    margin: float = RANK_MARGIN,
+    llm_fallback: Optional[Callable[[List[Dict[str, Any]]], int]] = None,
+) -> RankResult:
+    """
+    Picks the best-scoring candidate, handing close calls to the LLM.
+
+    Args:
+        scores: One score per candidate, higher is better
+        videos: The candidates, aligned with `scores`
+        margin: Minimum gap between the top two scores for a confident pick
+        llm_fallback: Called with the top candidates, best first, when the
+            two best scores are within `margin`; returns an index into that list
+
+    Returns:
+        RankResult with the chosen index and the scores for all candidates
+    """
+    order = np.argsort(-scores, kind="stable")
+    result = RankResult(best_index=int(order[0]), scores=scores, order=order)
+
+    too_close = len(order) > 1 and scores[order[0]] - scores[order[1]] < margin
+    if too_close and llm_fallback is not None:
+        top = order[:FALLBACK_TOP_K]
+        picked = llm_fallback([videos[i] for i in top])
+        if 0 <= picked < len(top):
+            result.best_index = int(top[picked])
+        result.used_fallback = True
+    return result
+
+
+def check_ranker(ranker: str) -> str:
+    """
+    Returns `ranker` if it names a ranker.
+
+    Raises:
+        ValueError: For an unknown ranker name
+    """
+    if ranker not in RANKER_MODES:
+        raise ValueError(f"Unknown ranker '{ranker}', expected one of {', '.join(RANKER_MODES)}")
+    return ranker
+
+
+class EmbeddingReranker:
+    """
+    Ranks Pixabay hits against a scene description with a local
+    sentence-transformers model instead of an LLM round trip.
+
+    Descriptions and tag strings are encoded in one batch on CPU and scored
+    with a single matrix product of normalized embeddings.
+    """
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        margin: float = RANK_MARGIN,
+        batch_size: int = 64,
+    ):
+        """
+        Args:
+            model_name: sentence-transformers model used for both sides
+            margin: Minimum gap between the top two scores for a confident pick
+            batch_size: Encoding batch size
+        """
+        self.model_name = model_name
+        self.margin = margin
+        self.batch_size = batch_size
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        model = get_sentence_model(self.model_name)
+        return model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+
+    def score_many(
+        self,
+        scene_descriptions: List[str],
+        candidate_lists: List[List[Dict[str, Any]]],
+    ) -> List[np.ndarray]:
+        """
+        Scores every candidate of every scene in one encoding pass.
+
+        Args:
+            scene_descriptions: One visual description per scene
+            candidate_lists: The Pixabay hits for each scene
+
+        Returns:
+            One array of cosine similarities per scene, aligned with its candidates
+        """
+        # Identical tag strings are common across scenes; encode each once
+        unique_texts: Dict[str, int] = {}
+        for videos in candidate_lists:
+            for video in videos:
+                unique_texts.setdefault(candidate_text(video), len(unique_texts))
+
+        embeddings = self._encode(list(scene_descriptions) + list(unique_texts))
+        scene_emb = embeddings[:len(scene_descriptions)]
+        text_emb = embeddings[len(scene_descriptions):]
+
+        scores = []
+        for i, videos in enumerate(candidate_lists):
+            if not videos:
+                scores.append(np.zeros(0, dtype=np.float32))
+                continue
+            idx = np.fromiter((unique_texts[candidate_text(v)] for v in videos), dtype=np.int64)
+            scores.append(text_emb[idx] @ scene_emb[i])
+        return scores
+
+    def score(self, scene_description: str, videos: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Returns the cosine similarity of every candidate to the scene description.
+        """
+        return self.score_many([scene_description], [videos])[0]
+
+    def rank(
+        self,
+        scene_description: str,
+        videos: List[Dict[str, Any]],
+        llm_fallback: Optional[Callable[[List[Dict[str, Any]]], int]] = None,
+        scores: Optional[np.ndarray] = None,
+    ) -> RankResult:
+        """
+        Picks the best candidate for a scene.
+
+        Args:
+            scene_description: The scene's visual description
+            videos: Candidate Pixabay hits
+            llm_fallback: Called with the top candidates, best first, when the
+                two best scores are within `margin`; returns an index into that list
+            scores: Precomputed scores from `score_many`, if available
+
+        Returns:
+            RankResult with the chosen index and the scores for all candidates
+        """
+        if not videos:
+            raise ValueError("Cannot rank an empty candidate list")
+
+        if scores is None:
+            scores = self.score(scene_description, videos)
+        return rank_from_scores(scores, videos, self.margin, llm_fallback)
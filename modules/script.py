@@ -1,34 +1,29 @@
 import os
 import requests
 import json
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 from utils.prompt import get_ad_script_prompt
+from utils.json_stream import SceneStreamParser
+from modules.script_cache import get_script_cache
+from modules.rate_limit import get_rate_limiter, estimate_tokens
+from utils.metrics import llm_call
 
 load_dotenv()
 
 # ——— CONFIG ———
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 # ——— SCRIPT GENERATOR ———
-def generate_ad_script(prompt: str) -> list:
+def _build_request(prompt: str) -> Tuple[Dict[str, str], Dict[str, Any]]:
     """
-    Sends the user prompt to Groq's LLM model and returns
-    a list of scene dicts:
-    [
-      {
-        "scene": 1,
-        "duration": "5s",
-        "visual_description": "...",
-        "dialogue": "...",
-        "on_screen_text": "..."
-      },
-      ...
-    ]
+    Builds the headers and chat-completions payload for a script request.
     """
     # Get prompts from the prompt module
     prompts = get_ad_script_prompt(prompt)
-    
+
     headers = {
         "Authorization": f"Bearer {GROQ_API_KEY}",
         "Content-Type": "application/json",
@@ -43,18 +38,154 @@ def generate_ad_script(prompt: str) -> list:
         "temperature": 0.7,
         "max_tokens": 800,
     }
+    return headers, payload
+
+def _completion_request(headers: Dict[str, str], payload: Dict[str, Any], stream: bool):
+    """Returns the request function and its token cost for the Groq rate limiter."""
+    def post() -> requests.Response:
+        resp = requests.post(GROQ_API_URL, headers=headers, json=payload, stream=stream)
+        if not resp.ok:
+            resp.close()
+        resp.raise_for_status()
+        return resp
 
-    resp = requests.post(GROQ_API_URL, headers=headers, json=payload)
-    resp.raise_for_status()
-    content = resp.json()["choices"][0]["message"]["content"]
+    # The completion cap is charged up front, so a long stream stays within GROQ_TPM
+    cost = estimate_tokens(*(m["content"] for m in payload["messages"]), max_tokens=payload["max_tokens"])
+    return post, cost
 
-    # Parse out the JSON array
+def _post_completion(headers: Dict[str, str], payload: Dict[str, Any]) -> requests.Response:
+    """
+    Sends one chat-completions request through the shared Groq rate limiter.
+
+    Raises:
+        requests.HTTPError: If the API call fails (429s only after the limiter's retries)
+    """
+    post, cost = _completion_request(headers, payload, stream=False)
+    return get_rate_limiter("groq").call(post, cost=cost)
+
+@contextmanager
+def _stream_completion(headers: Dict[str, str], payload: Dict[str, Any]) -> Iterator[requests.Response]:
+    """
+    Opens a streamed chat-completions response. Its Groq concurrency slot is
+    held until the with block exits, so the whole stream counts against the limiter.
+
+    Raises:
+        requests.HTTPError: If the API call fails (429s only after the limiter's retries)
+    """
+    post, cost = _completion_request(headers, payload, stream=True)
+    with get_rate_limiter("groq").hold(post, cost=cost) as resp, resp:
+        yield resp
+
+def cached_ad_script(prompt: str) -> Tuple[Optional[list], Optional[str]]:
+    """
+    Looks the campaign idea up in the script cache.
+
+    Returns:
+        (script, tier) with tier "exact" or "semantic", or (None, None) on a miss
+    """
+    cache = get_script_cache()
+    if cache is None:
+        return None, None
+    return cache.get(prompt)
+
+def parse_script(content: str) -> List[Dict[str, Any]]:
+    """
+    Reads the scene list out of a script completion.
+
+    Accepts the bare array the prompt asks for as well as the graph's
+    `{"scenes": [{"scene_id": ...}]}` shape, and returns scenes keyed by `scene`.
+    """
     try:
-        script = json.loads(content)
+        parsed = json.loads(content)
     except json.JSONDecodeError:
         # If the model returns extra text, try to extract the JSON substring
         start = content.find("[")
         end = content.rfind("]") + 1
-        script = json.loads(content[start:end])
+        parsed = json.loads(content[start:end])
+
+    scenes = parsed.get("scenes", []) if isinstance(parsed, dict) else parsed
+    return [
+        {"scene": scene.get("scene", scene.get("scene_id")), **{k: v for k, v in scene.items() if k != "scene_id"}}
+        for scene in scenes
+    ]
+
+def generate_ad_script(prompt: str, bypass_cache: bool = False) -> list:
+    """
+    Sends the user prompt to Groq's LLM model and returns
+    a list of scene dicts:
+    [
+      {
+        "scene": 1,
+        "duration": "5s",
+        "visual_description": "...",
+        "dialogue": "...",
+        "on_screen_text": "..."
+      },
+      ...
+    ]
+
+    Identical or near-identical campaign ideas are served from the script
+    cache; pass bypass_cache=True to always ask the LLM for a fresh script.
+    """
+    if not bypass_cache:
+        script, _ = cached_ad_script(prompt)
+        if script is not None:
+            return script
+
+    headers, payload = _build_request(prompt)
+
+    with llm_call("script", payload["model"]) as span:
+        body = _post_completion(headers, payload).json()
+        usage = body.get("usage") or {}
+        span["prompt_tokens"] = usage.get("prompt_tokens", 0)
+        span["completion_tokens"] = usage.get("completion_tokens", 0)
+    content = body["choices"][0]["message"]["content"]
+
+    script = parse_script(content)
+
+    cache = get_script_cache()
+    if cache is not None:
+        cache.put(prompt, script)
+    return script
+
+def stream_ad_script(prompt: str) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the completion from Groq and yields each scene dict as soon as
+    its JSON object is complete, while later scenes are still being generated.
+
+    Raises:
+        requests.HTTPError: If the API call fails
+        ValueError: If the completion contains no scene array
+    """
+    headers, payload = _build_request(prompt)
+    payload["stream"] = True
+
+    parser = SceneStreamParser()
+    with llm_call("script.stream", payload["model"]) as span, \
+            _stream_completion(headers, payload) as resp:
+        for line in resp.iter_lines(decode_unicode=True):
+            # Server-sent events: "data: {...}" lines, terminated by "data: [DONE]"
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+
+            chunk = json.loads(data)
+            # Groq reports usage on the final chunk
+            usage = (chunk.get("x_groq") or {}).get("usage") or chunk.get("usage")
+            if usage:
+                span["prompt_tokens"] = usage.get("prompt_tokens", 0)
+                span["completion_tokens"] = usage.get("completion_tokens", 0)
+            if not chunk.get("choices"):
+                continue
+            delta = chunk["choices"][0].get("delta", {}).get("content")
+            if delta:
+                yield from parser.feed(delta)
+
+    if not parser.scenes:
+        raise ValueError("No scenes found in the streamed completion")
 
-    return script
\ No newline at end of file
+    cache = get_script_cache()
+    if cache is not None:
+        cache.put(prompt, parser.scenes)
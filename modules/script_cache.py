@@ -0,0 +1,237 @@
+import os
+import re
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from utils.embeddings import EMBEDDING_MODEL, get_sentence_model
+
+load_dotenv()
+
+# ——— CONFIG ———
+SCRIPT_CACHE_ENABLED = os.getenv("SCRIPT_CACHE_ENABLED", "1") != "0"
+SCRIPT_CACHE_SIZE = int(os.getenv("SCRIPT_CACHE_SIZE", "256"))
+# The semantic tier loads a sentence-transformers model, so it is opt-in
+SCRIPT_CACHE_SEMANTIC = os.getenv("SCRIPT_CACHE_SEMANTIC", "0") == "1"
+# Cosine similarity above which a stored script is served for a new campaign idea
+SCRIPT_CACHE_SIMILARITY = float(os.getenv("SCRIPT_CACHE_SIMILARITY", "0.92"))
+SCRIPT_CACHE_INDEX_PATH = os.getenv("SCRIPT_CACHE_INDEX_PATH", os.path.join(".cache", "script_index.sqlite"))
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercases, collapses whitespace and drops trailing punctuation."""
+    return re.sub(r"\s+", " ", prompt.lower()).strip().rstrip(".!?").strip()
+
+
+class ScriptCache:
+    """
+    Two-tier cache of generated ad scripts.
+
+    1. Exact tier: an in-memory LRU keyed on the normalized prompt.
+    2. Semantic tier (optional): every stored script's campaign idea is
+       embedded with sentence-transformers and kept in a persistent SQLite
+       index; a new idea whose cosine similarity to a stored one reaches
+       `threshold` is served that script.
+
+    The cache never fails a request: lookup and store errors are printed and
+    treated as a miss or a skipped write.
+
+    Entries are separated by `namespace`, since the raw API path and the
+    LangGraph node produce scripts in different shapes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SCRIPT_CACHE_SIZE,
+        threshold: float = SCRIPT_CACHE_SIMILARITY,
+        index_path: str = SCRIPT_CACHE_INDEX_PATH,
+        model_name: str = EMBEDDING_MODEL,
+        semantic: bool = SCRIPT_CACHE_SEMANTIC,
+    ):
+        """
+        Args:
+            max_entries: Capacity of the exact-match LRU
+            threshold: Minimum cosine similarity for a semantic hit
+            index_path: SQLite file holding the embedding index, or ":memory:"
+            model_name: sentence-transformers model used to embed campaign ideas
+            semantic: Enable the embedding tier; otherwise only exact matches hit
+        """
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.model_name = model_name
+        self.semantic = semantic
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lru: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Embedding matrix per namespace, rows aligned with `_scripts`
+        self._embeddings: Dict[str, np.ndarray] = {}
+        self._scripts: Dict[str, list] = {}
+        self._conn = None
+        if not semantic:
+            return
+
+        if index_path != ":memory:" and os.path.dirname(index_path):
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        self._conn = sqlite3.connect(index_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS script_index (
+                namespace TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                script TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                PRIMARY KEY (namespace, prompt)
+            )
+            """
+        )
+        self._conn.commit()
+        for namespace, script, embedding in self._conn.execute(
+            "SELECT namespace, script, embedding FROM script_index"
+        ):
+            self._append(namespace, json.loads(script), np.frombuffer(embedding, dtype=np.float32))
+
+    def warm(self):
+        """Loads the embedding model ahead of the first request."""
+        if self.semantic:
+            get_sentence_model(self.model_name)
+
+    def _embed(self, prompt: str) -> np.ndarray:
+        model = get_sentence_model(self.model_name)
+        return model.encode(
+            prompt, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+        ).astype(np.float32)
+
+    def _append(self, namespace: str, script: Any, embedding: np.ndarray):
+        matrix = self._embeddings.get(namespace)
+        row = embedding.reshape(1, -1)
+        self._embeddings[namespace] = row if matrix is None else np.vstack([matrix, row])
+        self._scripts.setdefault(namespace, []).append(script)
+
+    def _remember(self, key: Tuple[str, str], script: Any):
+        self._lru[key] = script
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, prompt: str, namespace: str = "default") -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Looks up a script for a campaign idea.
+
+        Returns:
+            (script, tier) where tier is "exact" or "semantic", or (None, None) on a miss
+        """
+        key = (namespace, normalize_prompt(prompt))
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.exact_hits += 1
+                return self._lru[key], "exact"
+            matrix = self._embeddings.get(namespace)
+
+        if matrix is not None:
+            try:
+                similarities = matrix @ self._embed(key[1])
+            except Exception as e:
+                print(f"Semantic script cache lookup failed, treating as a miss: {e}")
+                similarities = None
+            best = int(np.argmax(similarities)) if similarities is not None else None
+            if best is not None and similarities[best] >= self.threshold:
+                with self._lock:
+                    script = self._scripts[namespace][best]
+                    self._remember(key, script)
+                    self.semantic_hits += 1
+                return script, "semantic"
+
+        with self._lock:
+            self.misses += 1
+        return None, None
+
+    def put(self, prompt: str, script: Any, namespace: str = "default"):
+        """
+        Adds a freshly generated script to both tiers.
+        """
+        normalized = normalize_prompt(prompt)
+        with self._lock:
+            self._remember((namespace, normalized), script)
+        if not self.semantic:
+            return
+        try:
+            self._index(namespace, normalized, script)
+        except Exception as e:
+            print(f"Could not add the script to the semantic cache index: {e}")
+
+    def _index(self, namespace: str, normalized: str, script: Any):
+        embedding = self._embed(normalized)
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM script_index WHERE namespace = ? AND prompt = ?", (namespace, normalized)
+            ).fetchone()
+            if exists:
+                return
+            self._conn.execute(
+                "INSERT INTO script_index (namespace, prompt, script, embedding) VALUES (?, ?, ?, ?)",
+                (namespace, normalized, json.dumps(script), embedding.tobytes()),
+            )
+            self._conn.commit()
+            self._append(namespace, script, embedding)
+
+    def warm_from_db(self, limit: int = 1000, namespace: str = "default") -> int:
+        """
+        Indexes scripts already stored in the Postgres `scripts` table.
+
+        Returns:
+            Number of rows read
+        """
+        from utils.db_config import pooled_connection
+
+        with pooled_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT user_prompt, script FROM scripts LIMIT %s", (limit,))
+                rows = cursor.fetchall()
+
+        for prompt, script in rows:
+            # json/jsonb columns arrive decoded, text columns don't
+            if isinstance(script, str):
+                script = json.loads(script)
+            self.put(prompt, script, namespace)
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters per tier and the index size."""
+        with self._lock:
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "lru_entries": len(self._lru),
+                "indexed": {ns: len(scripts) for ns, scripts in self._scripts.items()},
+            }
+
+
+_shared_cache: Optional[ScriptCache] = None
+_shared_failed = False
+_shared_lock = threading.Lock()
+
+def get_script_cache() -> Optional[ScriptCache]:
+    """
+    Returns the process-wide ScriptCache, or None if disabled via
+    SCRIPT_CACHE_ENABLED=0 or if it could not be opened.
+    """
+    global _shared_cache, _shared_failed
+    if not SCRIPT_CACHE_ENABLED or _shared_failed:
+        return None
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None and not _shared_failed:
+                try:
+                    _shared_cache = ScriptCache()
+                except Exception as e:
+                    print(f"Script cache unavailable, scripts will not be cached: {e}")
+                    _shared_failed = True
+    return _shared_cache
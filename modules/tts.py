@@ -0,0 +1,286 @@
+import io
+import os
+import json
+import time
+import wave
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import numpy as np
+from dotenv import load_dotenv
+from utils.metrics import timed, with_trace, TTS_CACHE
+
+load_dotenv()
+
+# ——— CONFIG ———
+# "elevenlabs", "playht", "stub" (local test tone, no API) or "none" for no narration
+TTS_BACKEND = os.getenv("TTS_BACKEND", "none")
+TTS_BACKENDS = ("elevenlabs", "playht", "stub", "none")
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "4"))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(".cache", "tts"))
+
+ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
+ELEVENLABS_VOICE = os.getenv("ELEVENLABS_VOICE", "21m00Tcm4TlvDq8ikWAM")
+ELEVENLABS_MODEL = os.getenv("ELEVENLABS_MODEL", "eleven_multilingual_v2")
+
+PLAYHT_USER_ID = os.getenv("PLAYHT_USER_ID")
+PLAYHT_API_KEY = os.getenv("PLAYHT_API_KEY")
+PLAYHT_VOICE = os.getenv(
+    "PLAYHT_VOICE",
+    "s3://voice-cloning-zero-shot/d9ff78ba-d016-47f6-b0ef-dd630f59414e/female-cs/manifest.json",
+)
+
+
+class TTSBackend:
+    """
+    Turns one line of dialogue into audio.
+
+    Subclasses set `name`, `voice`, `settings` and `extension` and implement
+    `synthesize`. Everything that changes the audio must be in `voice` or
+    `settings`, since together with the text they form the cache key.
+    """
+    name = "base"
+    extension = "mp3"
+
+    def __init__(self, voice: str, settings: Optional[Dict[str, Any]] = None):
+        self.voice = voice
+        self.settings = settings or {}
+
+    def synthesize(self, text: str) -> bytes:
+        """Returns the encoded audio (in `extension` format) for `text`."""
+        raise NotImplementedError
+
+
+class StubBackend(TTSBackend):
+    """
+    Local backend for tests and benchmarks: a quiet tone lasting about as
+    long as the text would take to speak, after an optional simulated delay.
+    """
+    name = "stub"
+    extension = "wav"
+
+    def __init__(self, voice: str = "stub", words_per_s: float = 2.5, latency_s: float = 0.0,
+                 sample_rate: int = 22050):
+        """
+        Args:
+            voice: Only used in the cache key
+            words_per_s: Speaking rate the audio length is based on
+            latency_s: Simulated synthesis time per call
+            sample_rate: Output sample rate
+        """
+        super().__init__(voice, {"words_per_s": words_per_s, "sample_rate": sample_rate})
+        self.latency_s = latency_s
+
+    def synthesize(self, text: str) -> bytes:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        rate = self.settings["sample_rate"]
+        duration_s = max(0.5, len(text.split()) / self.settings["words_per_s"])
+        t = np.arange(int(duration_s * rate)) / rate
+        samples = (3000 * np.sin(2 * np.pi * 220 * t)).astype("<i2")
+
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(rate)
+            f.writeframes(samples.tobytes())
+        return buffer.getvalue()
+
+
+class ElevenLabsBackend(TTSBackend):
+    name = "elevenlabs"
+
+    def __init__(self, voice: str = ELEVENLABS_VOICE, model: str = ELEVENLABS_MODEL,
+                 api_key: Optional[str] = ELEVENLABS_API_KEY, output_format: str = "mp3_44100_128"):
+        super().__init__(voice, {"model": model, "output_format": output_format})
+        from elevenlabs.client import ElevenLabs
+        self._client = ElevenLabs(api_key=api_key)
+
+    def synthesize(self, text: str) -> bytes:
+        chunks = self._client.text_to_speech.convert(
+            voice_id=self.voice,
+            text=text,
+            model_id=self.settings["model"],
+            output_format=self.settings["output_format"],
+        )
+        return b"".join(chunks)
+
+
+class PlayHTBackend(TTSBackend):
+    name = "playht"
+
+    def __init__(self, voice: str = PLAYHT_VOICE, user_id: Optional[str] = PLAYHT_USER_ID,
+                 api_key: Optional[str] = PLAYHT_API_KEY):
+        super().__init__(voice, {"format": "mp3"})
+        from pyht import Client
+        self._client = Client(user_id=user_id, api_key=api_key)
+
+    def synthesize(self, text: str) -> bytes:
+        from pyht.client import TTSOptions, Format
+        options = TTSOptions(voice=self.voice, format=Format.FORMAT_MP3)
+        return b"".join(self._client.tts(text, options))
+
+
+def create_tts_backend(name: str = TTS_BACKEND) -> Optional[TTSBackend]:
+    """
+    Builds the named backend; None for "none".
+
+    Raises:
+        ValueError: For an unknown backend name
+    """
+    if name == "none":
+        return None
+    if name == "stub":
+        return StubBackend()
+    if name == "elevenlabs":
+        return ElevenLabsBackend()
+    if name == "playht":
+        return PlayHTBackend()
+    raise ValueError(f"Unknown TTS backend '{name}', expected one of {', '.join(TTS_BACKENDS)}")
+
+
+@dataclass
+class NarrationResult:
+    scene_id: int
+    audio_path: Optional[str]
+    cached: bool = False
+    error: Optional[str] = None
+
+
+class Narrator:
+    """
+    Synthesizes scene dialogue in the background, with a file cache.
+
+    Audio is stored under a hash of (backend, text, voice, settings), so
+    re-rendering an ad, or a tagline shared by several scenes or campaigns,
+    costs no TTS call. Identical lines requested at the same time share one
+    synthesis.
+    """
+
+    def __init__(self, backend: TTSBackend, cache_dir: str = TTS_CACHE_DIR, max_workers: int = TTS_WORKERS):
+        """
+        Args:
+            backend: TTS backend to synthesize with
+            cache_dir: Directory holding synthesized audio
+            max_workers: Lines synthesized concurrently
+        """
+        self.backend = backend
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts")
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def cache_key(self, text: str) -> str:
+        payload = json.dumps({
+            "backend": self.backend.name,
+            "text": text,
+            "voice": self.backend.voice,
+            "settings": self.backend.settings,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{self.backend.extension}")
+
+    def submit(self, text: str) -> Future:
+        """
+        Starts synthesizing `text`, or returns the synthesis already running.
+
+        Returns:
+            Future resolving to (audio path, whether it came from the cache)
+        """
+        text = " ".join(text.split())
+        key = self.cache_key(text)
+        with self._lock:
+            future = self._inflight.get(key)
+            started = future is None
+            if started:
+                future = self._executor.submit(with_trace(self._synthesize), text, key)
+                self._inflight[key] = future
+        if started:
+            future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def narrate(self, script: List[Dict[str, Any]]) -> Dict[int, Future]:
+        """
+        Starts synthesizing every scene's dialogue and returns immediately.
+
+        Args:
+            script: Scenes with `scene` (or `scene_id`) and `dialogue`
+
+        Returns:
+            {scene_id: Future resolving to a NarrationResult}; scenes without
+            dialogue are left out
+        """
+        futures = {}
+        for scene in script:
+            scene_id = scene.get("scene", scene.get("scene_id"))
+            text = (scene.get("dialogue") or "").strip()
+            if text:
+                futures[scene_id] = self._as_result(scene_id, self.submit(text))
+        return futures
+
+    @staticmethod
+    def collect(futures: Dict[int, Future]) -> Dict[int, NarrationResult]:
+        """Waits for `narrate`'s futures."""
+        return {scene_id: future.result() for scene_id, future in futures.items()}
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    @staticmethod
+    def _as_result(scene_id: int, synthesis: Future) -> Future:
+        done: Future = Future()
+
+        def on_done(f: Future):
+            try:
+                path, cached = f.result()
+                done.set_result(NarrationResult(scene_id, path, cached))
+            except Exception as e:
+                done.set_result(NarrationResult(scene_id, None, error=f"{type(e).__name__}: {e}"))
+
+        synthesis.add_done_callback(on_done)
+        return done
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def _synthesize(self, text: str, key: str):
+        path = self.path_for(key)
+        if os.path.exists(path):
+            TTS_CACHE.inc(result="hit")
+            return path, True
+        TTS_CACHE.inc(result="miss")
+
+        with timed("tts", backend=self.backend.name, chars=len(text)):
+            audio = self.backend.synthesize(text)
+        # Write then rename, so a file under its final name is always complete
+        part_path = f"{path}.{threading.get_ident()}.part"
+        with open(part_path, "wb") as f:
+            f.write(audio)
+        os.replace(part_path, path)
+        return path, False
+
+
+_narrators: Dict[str, Narrator] = {}
+_narrators_lock = threading.Lock()
+
+def get_narrator(backend: str = TTS_BACKEND) -> Optional[Narrator]:
+    """
+    Returns the process-wide Narrator for a backend, or None for "none".
+    """
+    if backend == "none":
+        return None
+    narrator = _narrators.get(backend)
+    if narrator is None:
+        with _narrators_lock:
+            narrator = _narrators.get(backend)
+            if narrator is None:
+                narrator = Narrator(create_tts_backend(backend))
+                _narrators[backend] = narrator
+    return narrator
@@ -1,11 +1,27 @@
 import os
-import requests
 import re
+import httpx
 from typing import List, Dict, Any, Optional
 import argparse
 from dotenv import load_dotenv
 from groq import Groq
 from utils.prompt import get_video_finder_prompts
+from modules.pixabay_client import PixabayClient, get_pixabay_client, EMPTY_RESULT
+from modules.reranker import EmbeddingReranker, RANKER_MODE, RANKER_MODES, check_ranker
+from modules.visual_reranker import get_visual_reranker
+from modules.keywords import generate_search_terms, SEARCH_TERMS_BACKEND, SEARCH_TERMS_BACKENDS
+from modules.renditions import select_rendition, parse_resolution, TARGET_RESOLUTION
+from modules.prefilter import prefilter_candidates, parse_duration, SEARCH_PER_PAGE
+from modules.rate_limit import get_rate_limiter, estimate_tokens
+from utils.metrics import llm_call, timed
+from utils.prompt_budget import fit_candidates, RANK_MAX_TOKENS, SEARCH_TERMS_MAX_TOKENS
+
+def _usage(response) -> Dict[str, int]:
+    """Token counts from a Groq chat-completions response, for `llm_call`."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    return {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
 
 class PixabayVideoFinder:
     """
@@ -13,12 +29,24 @@ class PixabayVideoFinder:
     based on natural language scene descriptions.
     """
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        ranker: str = RANKER_MODE,
+        search_terms_backend: str = SEARCH_TERMS_BACKEND,
+        target_resolution: str = TARGET_RESOLUTION,
+    ):
         """
         Initialize the PixabayVideoFinder with your API key.
 
         Args:
             api_key: Your Pixabay API key. If None, will try to load from environment variables.
+            ranker: "llm" to rank candidates with Groq, "embedding" to rank their tags
+                locally or "visual" to rank their thumbnails with CLIP; the local
+                rankers only consult the LLM when the top scores are too close
+            search_terms_backend: "llm", "keybert", or "auto" (LLM with a KeyBERT
+                fallback when Groq is slow or failing)
+            target_resolution: Output resolution; clips in the other orientation are skipped
         """
         # Load API key from environment if not provided
         load_dotenv()
@@ -29,39 +57,80 @@ class PixabayVideoFinder:
                 "No Pixabay API key provided. Either pass it directly or set the PIXABAY_API_KEY environment variable."
             )
 
-        self.base_url = "https://pixabay.com/api/videos/"
+        # Share the process-wide connection pool unless a different key was given
+        if self.api_key == os.environ.get("PIXABAY_API_KEY"):
+            self.client = get_pixabay_client()
+        else:
+            self.client = PixabayClient(api_key=self.api_key)
 
-    def _generate_search_terms(self, scene_description: str, llm_client: Groq) -> List[str]:
-        """
-        Generate relevant search terms from a scene description using an LLM.
+        self.ranker = check_ranker(ranker)
+        self.reranker = None
+        if ranker == "embedding":
+            self.reranker = EmbeddingReranker()
+        elif ranker == "visual":
+            self.reranker = get_visual_reranker()
 
-        Args:
-            scene_description: Natural language description of the video needed
-            llm_client: Groq LLM client
+        if search_terms_backend not in SEARCH_TERMS_BACKENDS:
+            raise ValueError(
+                f"Unknown search terms backend '{search_terms_backend}', expected one of {SEARCH_TERMS_BACKENDS}"
+            )
+        self.search_terms_backend = search_terms_backend
+        self.target = parse_resolution(target_resolution)
 
-        Returns:
-            List of search terms to try
+    def _llm_search_terms(self, scene_description: str, llm_client: Groq) -> List[str]:
+        """
+        Ask the LLM for search terms, letting any API error propagate.
         """
         # Get the prompt from the utils module
         prompts = get_video_finder_prompts(scene_description)
         prompt = prompts["search_terms_prompt"]
 
-        try:
-            # Use Groq's LLaMA-3 model for efficient keyword generation
-            response = llm_client.chat.completions.create(
+        # Use Groq's LLaMA-3 model for efficient keyword generation
+        with llm_call("video_finder.search_terms", "llama3-8b-8192") as span:
+            response = get_rate_limiter("groq").call(
+                llm_client.chat.completions.create,
                 model="llama3-8b-8192",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.5,  # Lower temperature for more focused results
-                max_tokens=100
+                max_tokens=SEARCH_TERMS_MAX_TOKENS,
+                cost=estimate_tokens(prompt, max_tokens=SEARCH_TERMS_MAX_TOKENS),
             )
-            search_terms = response.choices[0].message.content.strip().split('\n')
+            span.update(_usage(response))
+        search_terms = response.choices[0].message.content.strip().split('\n')
 
-            return [term.strip() for term in search_terms if term.strip()]
+        return [term.strip() for term in search_terms if term.strip()]
+
+    def _generate_search_terms(self, scene_description: str, llm_client: Groq) -> List[str]:
+        """
+        Generate relevant search terms from a scene description using an LLM.
+
+        Args:
+            scene_description: Natural language description of the video needed
+            llm_client: Groq LLM client
+
+        Returns:
+            List of search terms to try
+        """
+        try:
+            return self._llm_search_terms(scene_description, llm_client)
         except Exception as e:
             print(f"Error generating search terms: {e}")
             # Fallback to basic keyword extraction
             return [scene_description]
 
+    def _search_terms_for(self, scene_descriptions: List[str], llm_client: Groq) -> List[List[str]]:
+        """
+        Generate search terms for several scenes with the configured backend.
+
+        KeyBERT handles all descriptions in one batched pass; in "auto" mode the
+        LLM is asked first and KeyBERT only fills in for slow or failed calls.
+        """
+        if self.search_terms_backend == "auto":
+            llm_terms = lambda d: self._llm_search_terms(d, llm_client)
+        else:
+            llm_terms = lambda d: self._generate_search_terms(d, llm_client)
+        return generate_search_terms(scene_descriptions, llm_terms, self.search_terms_backend)
+
     def search_videos(self, query: str, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
         """
         Search for videos on Pixabay with the given query.
@@ -75,20 +144,10 @@ class PixabayVideoFinder:
             Dictionary containing search results
         """
         try:
-            response = requests.get(
-                self.base_url,
-                params={
-                    "key": self.api_key,
-                    "q": query,
-                    "page": page,
-                    "per_page": per_page
-                }
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return self.client.search(query, page, per_page)
+        except httpx.HTTPError as e:
             print(f"Error searching Pixabay: {e}")
-            return {"total": 0, "totalHits": 0, "hits": []}
+            return dict(EMPTY_RESULT)
 
     def _rank_videos(self, videos: List[Dict[str, Any]], scene_description: str, llm_client: Groq) -> List[Dict[str, Any]]:
         """
@@ -105,38 +164,33 @@ class PixabayVideoFinder:
         if not videos:
             return []
 
-        # Prepare video information for ranking
-        video_info = []
-        for i, video in enumerate(videos[:10]):  # Limit to top 10 to avoid token limits
-            tags = video.get("tags", "")
-            duration = video.get("duration", 0)
-            resolution = f"{video.get('videos', {}).get('large', {}).get('width', 0)}x{video.get('videos', {}).get('large', {}).get('height', 0)}"
-            video_info.append(f"Video {i+1}: Tags: {tags}, Duration: {duration}s, Resolution: {resolution}, Views: {video.get('views', 0)}")
-
-        video_info_text = "\n".join(video_info)
-
-        # Get the prompt from the utils module
-        prompts = get_video_finder_prompts(scene_description, video_info_text)
-        prompt = prompts["rank_videos_prompt"]
+        # Send as many candidates as fit the prompt's token budget, as a compact table
+        render = lambda table: get_video_finder_prompts(scene_description, table)["rank_videos_prompt"]
+        candidates, video_info_text = fit_candidates(videos, render)
+        prompt = render(video_info_text)
 
         try:
             # Use Mixtral for better reasoning capabilities when selecting the best video
-            response = llm_client.chat.completions.create(
-                model="mistral-saba-24b",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,  # Lower temperature for more deterministic selection
-                max_tokens=10
-            )
+            with llm_call("video_finder.rank", "mistral-saba-24b") as span:
+                response = get_rate_limiter("groq").call(
+                    llm_client.chat.completions.create,
+                    model="mistral-saba-24b",
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.1,  # Lower temperature for more deterministic selection
+                    max_tokens=RANK_MAX_TOKENS,
+                    cost=estimate_tokens(prompt, max_tokens=RANK_MAX_TOKENS),
+                )
+                span.update(_usage(response))
             selection_text = response.choices[0].message.content.strip()
 
             # Parse selection
             try:
-                # Extract just the digits from the response
+                # Extract the zero-based index from {"best_index": n}
                 digits = re.findall(r'\d+', selection_text)
                 if digits:
-                    selected_idx = int(digits[0]) - 1
-                    if 0 <= selected_idx < len(videos):
-                        return [videos[selected_idx]]
+                    selected_idx = int(digits[0])
+                    if 0 <= selected_idx < len(candidates):
+                        return [candidates[selected_idx]]
 
                 # If parsing fails or index is invalid, return the first video
                 return [videos[0]]
@@ -147,38 +201,120 @@ class PixabayVideoFinder:
             print(f"Error selecting best video: {e}")
             return [videos[0]]
 
-    def find_videos(self, scene_description: str, llm_client: Groq) -> List[Dict[str, Any]]:
+    def _rank_videos_embedding(self, videos: List[Dict[str, Any]], scene_description: str, llm_client: Groq) -> List[Dict[str, Any]]:
+        """
+        Find the single best video match using local embedding similarity of
+        the tags ("embedding" ranker) or thumbnails ("visual" ranker).
+
+        Falls back to `_rank_videos` on the best-scoring candidates only when
+        the top two scores are too close to call.
+
+        Args:
+            videos: List of video results from Pixabay
+            scene_description: Original scene description
+            llm_client: Groq LLM client, used only for the fallback
+
+        Returns:
+            List containing only the best matching video
+        """
+        if not videos:
+            return []
+
+        def llm_fallback(top: List[Dict[str, Any]]) -> int:
+            picked = self._rank_videos(top, scene_description, llm_client)[0]
+            return next(i for i, video in enumerate(top) if video is picked)
+
+        result = self.reranker.rank(scene_description, videos, llm_fallback=llm_fallback)
+        return [videos[result.best_index]]
+
+    def find_videos(self, scene_description: str, llm_client: Groq, duration: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Find the single most appropriate video for a scene using LLM-generated search terms.
 
         Args:
             scene_description: Natural language description of the scene
             llm_client: Groq LLM client
+            duration: Optional scene duration such as "5s"; shorter clips are skipped
 
         Returns:
             List containing only the most relevant video
         """
-        search_terms = self._generate_search_terms(scene_description, llm_client)
+        with timed("search_terms", backend=self.search_terms_backend):
+            search_terms = self._search_terms_for([scene_description], llm_client)[0]
         print(f"Generated search terms: {search_terms}")
 
-        all_videos = []
-        for term in search_terms:
-            results = self.search_videos(term)
-            if results.get("hits"):
-                all_videos.extend(results["hits"])
+        # Send all queries at once over the shared connection pool
+        with timed("search", queries=len(search_terms)):
+            results = self.client.search_many(search_terms, per_page=SEARCH_PER_PAGE)
+        return self._pick_best(scene_description, results, llm_client, duration)
+
+    def find_videos_for_script(
+        self,
+        scene_descriptions: List[str],
+        llm_client: Groq,
+        durations: Optional[List[Optional[str]]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Find the best video for every scene of a script.
+
+        Search terms for all scenes are generated in one pass and all Pixabay
+        queries for the script are sent at once.
 
-        if not all_videos:
+        Args:
+            scene_descriptions: Natural language description of each scene
+            llm_client: Groq LLM client
+            durations: Optional duration of each scene, such as "5s"
+
+        Returns:
+            One list per scene containing only its most relevant video
+        """
+        with timed("search_terms", backend=self.search_terms_backend, scenes=len(scene_descriptions)):
+            scene_terms = self._search_terms_for(scene_descriptions, llm_client)
+        with timed("search", queries=sum(len(terms) for terms in scene_terms)):
+            scene_results = self.client.search_scenes(scene_terms, per_page=SEARCH_PER_PAGE)
+        durations = durations or [None] * len(scene_descriptions)
+        return [
+            self._pick_best(description, results, llm_client, duration)
+            for description, results, duration in zip(scene_descriptions, scene_results, durations)
+        ]
+
+    def _pick_best(
+        self,
+        scene_description: str,
+        search_results: List[Dict[str, Any]],
+        llm_client: Groq,
+        duration: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Merge the hits of several searches, prefilter them and rank the rest for one scene.
+        """
+        # Remove duplicates by video ID, keeping each clip's best position in any search
+        unique_videos: Dict[int, Dict[str, Any]] = {}
+        positions: Dict[int, int] = {}
+        for results in search_results:
+            for position, video in enumerate(results.get("hits") or []):
+                unique_videos.setdefault(video["id"], video)
+                positions[video["id"]] = min(position, positions.get(video["id"], position))
+
+        if not unique_videos:
             print("No videos found for the given search terms.")
             return []
 
-        # Remove duplicates by video ID
-        unique_videos = {}
-        for video in all_videos:
-            if video["id"] not in unique_videos:
-                unique_videos[video["id"]] = video
+        # Skip clips that are too short or in the wrong orientation and keep the top few
+        candidates = list(unique_videos.values())
+        with timed("prefilter", candidates=len(candidates)):
+            prefiltered = prefilter_candidates(
+                candidates, parse_duration(duration), self.target,
+                positions=[positions[v["id"]] for v in candidates],
+            )
+            candidates = [candidates[i] for i in prefiltered.indices]
 
-        # Find the best video using LLM
-        best_video = self._rank_videos(list(unique_videos.values()), scene_description, llm_client)
+        # Find the best video using the configured ranker
+        with timed("rank", ranker=self.ranker, candidates=len(candidates)):
+            if self.ranker in ("embedding", "visual"):
+                best_video = self._rank_videos_embedding(candidates, scene_description, llm_client)
+            else:
+                best_video = self._rank_videos(candidates, scene_description, llm_client)
 
         # Return only the best match
         return best_video
@@ -188,6 +324,14 @@ def main():
     """Command line interface for the PixabayVideoFinder."""
     parser = argparse.ArgumentParser(description='Find the perfect video on Pixabay for a scene description')
     parser.add_argument('scene', help='Natural language description of the scene')
+    parser.add_argument('--ranker', choices=RANKER_MODES, default=RANKER_MODE,
+                        help='How to pick the best clip among the search results')
+    parser.add_argument('--search-terms', choices=list(SEARCH_TERMS_BACKENDS), default=SEARCH_TERMS_BACKEND,
+                        help='How to turn the scene description into search queries')
+    parser.add_argument('--target-resolution', default=TARGET_RESOLUTION,
+                        help='Output resolution, e.g. 1920x1080; picks the smallest file that meets it')
+    parser.add_argument('--duration', default=None,
+                        help='Scene duration, e.g. 5s; shorter clips are skipped')
 
     args = parser.parse_args()
 
@@ -205,11 +349,16 @@ def main():
         return
 
     # Initialize Groq client
-    llm_client = Groq(api_key=groq_api_key)
+    # Retries on 429 are handled by the shared rate limiter
+    llm_client = Groq(api_key=groq_api_key, max_retries=0)
 
     try:
-        finder = PixabayVideoFinder()
-        videos = finder.find_videos(args.scene, llm_client)
+        finder = PixabayVideoFinder(
+            ranker=args.ranker,
+            search_terms_backend=args.search_terms,
+            target_resolution=args.target_resolution,
+        )
+        videos = finder.find_videos(args.scene, llm_client, duration=args.duration)
 
         if not videos:
             print(f"\nNo videos found for scene: '{args.scene}'\n")
@@ -223,17 +372,14 @@ def main():
         print(f"  Tags: {video.get('tags')}")
         print(f"  Duration: {video.get('duration')} seconds")
 
-        # Get the highest quality video URL
+        # Get the smallest video file that meets the target resolution
         video_urls = video.get("videos", {})
-        best_url = None
-        for quality in ["large", "medium", "small", "tiny"]:
-            if quality in video_urls and video_urls[quality].get("url"):
-                best_url = video_urls[quality]["url"]
-                quality_label = quality
-                break
-
-        if best_url:
-            print(f"  Video URL ({quality_label}): {best_url}")
+        try:
+            quality_label, best_file = select_rendition(video_urls, parse_resolution(args.target_resolution))
+            print(f"  Video URL ({quality_label}, {best_file['width']}x{best_file['height']}, "
+                  f"{best_file.get('size', 0)} bytes): {best_file['url']}")
+        except ValueError:
+            pass
 
         print(f"  Preview page: {video.get('pageURL')}")
         print()
@@ -0,0 +1,276 @@
+import io
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Iterable
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from utils.embeddings import get_sentence_model
+from utils.lazy import singleton
+from utils.metrics import timed, with_trace, IMAGE_EMBEDDINGS
+from modules.reranker import RankResult, RANK_MARGIN, rank_from_scores
+from modules.renditions import available_renditions
+
+load_dotenv()
+
+# ——— CONFIG ———
+# CLIP model that embeds both thumbnails and scene descriptions
+VISUAL_RANK_MODEL = os.getenv("VISUAL_RANK_MODEL", "clip-ViT-B-32")
+# Only the first candidates, in the order given, have their thumbnails scored
+VISUAL_RANK_MAX_CANDIDATES = int(os.getenv("VISUAL_RANK_MAX_CANDIDATES", "24"))
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "8"))
+THUMBNAIL_TIMEOUT_S = float(os.getenv("THUMBNAIL_TIMEOUT_S", "10"))
+IMAGE_EMBEDDING_CACHE_PATH = os.getenv(
+    "IMAGE_EMBEDDING_CACHE_PATH", os.path.join(".cache", "image_embeddings.sqlite")
+)
+
+
+def thumbnail_url(video: Dict[str, Any]) -> Optional[str]:
+    """
+    URL of the smallest thumbnail of a Pixabay hit; CLIP downsizes to 224px anyway.
+    """
+    for _, file in available_renditions(video.get("videos") or {}):
+        if file.get("thumbnail"):
+            return file["thumbnail"]
+    return None
+
+
+class ImageEmbeddingCache:
+    """
+    Persistent store of thumbnail embeddings keyed by (model, Pixabay id).
+
+    Pixabay ids are stable and thumbnails don't change, so a clip is embedded
+    once and reused across every later campaign.
+    """
+
+    def __init__(self, path: str = IMAGE_EMBEDDING_CACHE_PATH):
+        """
+        Args:
+            path: SQLite file, or ":memory:"
+        """
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS image_embeddings (
+                model TEXT NOT NULL,
+                pixabay_id INTEGER NOT NULL,
+                embedding BLOB NOT NULL,
+                PRIMARY KEY (model, pixabay_id)
+            )
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get_many(self, model: str, pixabay_ids: Iterable[int]) -> Dict[int, np.ndarray]:
+        """Returns the stored embeddings among `pixabay_ids`."""
+        ids = list(dict.fromkeys(int(i) for i in pixabay_ids))
+        found: Dict[int, np.ndarray] = {}
+        # SQLite caps the number of bound parameters per statement
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT pixabay_id, embedding FROM image_embeddings WHERE model = ? AND pixabay_id IN ({placeholders})",
+                    (model, *chunk),
+                ).fetchall()
+            for pixabay_id, blob in rows:
+                found[pixabay_id] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model: str, embeddings: Dict[int, np.ndarray]):
+        """Stores embeddings, replacing any existing ones for the same ids."""
+        if not embeddings:
+            return
+        rows = [(model, int(i), e.astype(np.float32).tobytes()) for i, e in embeddings.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO image_embeddings (model, pixabay_id, embedding) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def count(self, model: Optional[str] = None) -> int:
+        with self._lock:
+            if model is None:
+                return self._conn.execute("SELECT COUNT(*) FROM image_embeddings").fetchone()[0]
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM image_embeddings WHERE model = ?", (model,)
+            ).fetchone()[0]
+
+
+class VisualReranker:
+    """
+    Ranks Pixabay hits by what their footage shows rather than their tags.
+
+    Candidate thumbnails are fetched concurrently, embedded in batches with a
+    CLIP model and scored by cosine similarity against the CLIP text
+    embedding of the scene description. Thumbnail embeddings are persisted
+    per Pixabay id, so repeat candidates cost one SQLite lookup.
+    """
+
+    def __init__(
+        self,
+        model_name: str = VISUAL_RANK_MODEL,
+        model: Optional[Any] = None,
+        cache: Optional[ImageEmbeddingCache] = None,
+        max_candidates: int = VISUAL_RANK_MAX_CANDIDATES,
+        margin: float = RANK_MARGIN,
+        max_workers: int = THUMBNAIL_WORKERS,
+        timeout: float = THUMBNAIL_TIMEOUT_S,
+        batch_size: int = 32,
+    ):
+        """
+        Args:
+            model_name: sentence-transformers CLIP model; also the cache key
+            model: Any object with a sentence-transformers style `encode` that
+                accepts both PIL images and strings, used instead of loading
+                `model_name` (e.g. a tiny local model in tests)
+            cache: Embedding store; defaults to one at IMAGE_EMBEDDING_CACHE_PATH
+            max_candidates: Candidates scored per call, in the order given
+            margin: Minimum gap between the top two scores for a confident pick
+            max_workers: Concurrent thumbnail downloads
+            timeout: Per-thumbnail request timeout
+            batch_size: Images per encoding batch
+        """
+        self.model_name = model_name
+        self._model = model
+        self.cache = cache or ImageEmbeddingCache()
+        self.max_candidates = max_candidates
+        self.margin = margin
+        self.timeout = timeout
+        self.batch_size = batch_size
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+
+    @property
+    def model(self):
+        return self._model if self._model is not None else get_sentence_model(self.model_name)
+
+    def warm(self):
+        """Loads the CLIP model ahead of the first request."""
+        if self._model is None:
+            get_sentence_model(self.model_name)
+
+    def _encode(self, items: List[Any]) -> np.ndarray:
+        return self.model.encode(
+            items,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        ).astype(np.float32)
+
+    def _fetch_thumbnail(self, url: str):
+        from PIL import Image
+
+        try:
+            response = self._session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            return Image.open(io.BytesIO(response.content)).convert("RGB")
+        except Exception as e:
+            print(f"Could not fetch thumbnail {url}: {e}")
+            return None
+
+    def image_embeddings(self, videos: List[Dict[str, Any]]) -> Dict[int, np.ndarray]:
+        """
+        Returns the thumbnail embedding of every candidate that has one,
+        embedding and storing only those not cached yet.
+        """
+        ids = [v["id"] for v in videos]
+        embeddings = self.cache.get_many(self.model_name, ids)
+
+        missing = {}
+        for video in videos:
+            url = thumbnail_url(video)
+            if video["id"] not in embeddings and url:
+                missing.setdefault(video["id"], url)
+        IMAGE_EMBEDDINGS.inc(len(embeddings), result="hit")
+        if not missing:
+            return embeddings
+
+        with timed("thumbnails", candidates=len(missing)) as span:
+            fetched = list(self._executor.map(with_trace(self._fetch_thumbnail), missing.values()))
+            loaded = [(pixabay_id, image) for pixabay_id, image in zip(missing, fetched) if image is not None]
+            span["fetched"] = len(loaded)
+            if loaded:
+                vectors = self._encode([image for _, image in loaded])
+                new = {pixabay_id: vector for (pixabay_id, _), vector in zip(loaded, vectors)}
+                self.cache.put_many(self.model_name, new)
+                embeddings.update(new)
+        IMAGE_EMBEDDINGS.inc(len(missing), result="miss")
+        return embeddings
+
+    def score_many(
+        self,
+        scene_descriptions: List[str],
+        candidate_lists: List[List[Dict[str, Any]]],
+    ) -> List[np.ndarray]:
+        """
+        Scores every candidate of every scene, fetching and embedding each
+        distinct thumbnail once and all descriptions in one batch.
+
+        Candidates beyond `max_candidates` in a scene's list, and those whose
+        thumbnail could not be fetched, score -1.
+
+        Returns:
+            One array of cosine similarities per scene, aligned with its candidates
+        """
+        scored = [videos[:self.max_candidates] for videos in candidate_lists]
+        unique = list({v["id"]: v for videos in scored for v in videos}.values())
+        embeddings = self.image_embeddings(unique)
+        texts = self._encode(list(scene_descriptions))
+
+        scores = []
+        for text, videos, kept in zip(texts, candidate_lists, scored):
+            row = np.full(len(videos), -1.0, dtype=np.float32)
+            for i, video in enumerate(kept):
+                embedding = embeddings.get(video["id"])
+                if embedding is not None:
+                    row[i] = float(embedding @ text)
+            scores.append(row)
+        return scores
+
+    def score(self, scene_description: str, videos: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Cosine similarity of every candidate's thumbnail to the scene description.
+        """
+        return self.score_many([scene_description], [videos])[0]
+
+    def rank(
+        self,
+        scene_description: str,
+        videos: List[Dict[str, Any]],
+        llm_fallback: Optional[Callable[[List[Dict[str, Any]]], int]] = None,
+    ) -> RankResult:
+        """
+        Picks the candidate whose thumbnail best matches the scene.
+
+        Args:
+            scene_description: The scene's visual description
+            videos: Candidate Pixabay hits, most promising first
+            llm_fallback: Called with the top candidates, best first, when the
+                two best scores are within `margin`; returns an index into that list
+
+        Returns:
+            RankResult with the chosen index and the scores for all candidates
+        """
+        if not videos:
+            raise ValueError("Cannot rank an empty candidate list")
+
+        return rank_from_scores(self.score(scene_description, videos), videos, self.margin, llm_fallback)
+
+
+@singleton
+def get_visual_reranker() -> VisualReranker:
+    """Returns the process-wide VisualReranker."""
+    return VisualReranker()
@@ -1,61 +1,517 @@
 import os
+import time
+import threading
 import ffmpeg
 import requests
-from module.script import generate_ad_script
-from module.video_finder import VideoFinderAgent
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, List, Optional
+from modules.script import generate_ad_script
+from modules.downloader import ClipDownloader, clip_key
+from modules.media import probe_clip, common_profile, normalize_clip, concat_copy, mix_narration
+from modules.tts import get_narrator, Narrator, NarrationResult, TTS_BACKEND
+from modules.render import plan_segments, render_ad, RENDER_PRESET
+from modules.prefilter import parse_duration
+from modules.renditions import parse_resolution, TARGET_RESOLUTION
+from graph.pipeline import run_pipeline, get_run_state
+from graph.checkpoint import delete_checkpoints
+from utils.metrics import timed, with_trace
+
+# One ffmpeg process per core
+TRIM_WORKERS = int(os.getenv("TRIM_WORKERS", str(os.cpu_count() or 1)))
+# "download" fetches whole source files; "remote" lets ffmpeg read only the
+# leading seconds straight from the URL, downloading only if that fails
+TRIM_MODE = os.getenv("TRIM_MODE", "download")
+# "copy" joins the trimmed clips by stream copy wherever possible; "render"
+# re-encodes once with on-screen text, scaling and ducked narration
+ASSEMBLY_MODE = os.getenv("ASSEMBLY_MODE", "copy")
+ASSEMBLY_MODES = ("copy", "render")
+
+@dataclass
+class TrimResult:
+    scene_id: int
+    output_path: Optional[str]
+    wall_time_s: float
+    error: Optional[str] = None
+    source: str = "download"        # "download" or "remote"
+
+@dataclass
+class AssemblyResult:
+    output_path: Optional[str]
+    mode: str                       # "stream_copy", "normalized" or "rendered"
+    normalized_scenes: List[int]
+    wall_time_s: float
+    error: Optional[str] = None
+    narrated_scenes: List[int] = field(default_factory=list)
+    encode_fps: Optional[float] = None
+    # Scenes left out because their clip search or trim failed
+    missing_scenes: List[int] = field(default_factory=list)
 
 class VideoAssembler:
-    def __init__(self, output_dir: str = "outputs/final", temp_dir: str = "outputs/temp"):
+    def __init__(self, output_dir: str = "outputs/final", temp_dir: str = "outputs/temp",
+                 downloader: Optional[ClipDownloader] = None):
         self.output_dir = output_dir
         self.temp_dir = temp_dir
         os.makedirs(self.output_dir, exist_ok=True)
         os.makedirs(self.temp_dir, exist_ok=True)
         self.script = []
         self.clips = {}
+        # Pass a shared downloader so concurrent assemblers reuse one clip cache
+        self.downloader = downloader or ClipDownloader(os.path.join(self.temp_dir, "clips"))
+        # Cache paths of every download this assembler submitted, released by `release_clips`
+        self._submitted: List[str] = []
+        self._submitted_lock = threading.Lock()
 
     def load_script_and_clips(self, script, clips):
         self.script = script
         self.clips = clips
 
-    def _download_video_if_needed(self, url: str, scene_id: int) -> str:
-        filename = os.path.join(self.temp_dir, f"scene_{scene_id}_raw.mp4")
-        if not os.path.exists(filename):
-            r = requests.get(url, stream=True)
-            with open(filename, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
-        return filename
-
-    def trim_clips(self):
-        for scene in self.script:
-            scene_id = scene['scene']
-            duration_s = int(scene['duration'].replace('s', ''))
-            clip_info = self.clips.get(scene_id)
-            if not clip_info:
-                print(f"⚠️ No clip found for scene {scene_id}")
-                continue
+    def _submit_download(self, clip_info: Dict):
+        key = clip_key(clip_info['video_file_url'], clip_info.get('pixabay_id'), clip_info.get('rendition'))
+        with self._submitted_lock:
+            self._submitted.append(self.downloader.path_for(key))
+        return self.downloader.submit(
+            clip_info['video_file_url'],
+            pixabay_id=clip_info.get('pixabay_id'),
+            rendition=clip_info.get('rendition'),
+            expected_size=clip_info.get('file_size'),
+        )
 
-            input_path = self._download_video_if_needed(clip_info['video_file_url'], scene_id)
-            output_path = os.path.join(self.temp_dir, f"scene_{scene_id}_trimmed.mp4")
+    def release_clips(self):
+        """
+        Unpins the source clips this assembler downloaded, so the shared
+        cache can evict them again. Call once trimming and assembly are done.
+        """
+        with self._submitted_lock:
+            paths, self._submitted = self._submitted, []
+        self.downloader.release(paths)
 
+    def download_clips(self) -> Dict[int, str]:
+        """Downloads every scene's clip in parallel; returns {scene_id: local path}."""
+        futures = {
+            scene_id: self._submit_download(clip_info)
+            for scene_id, clip_info in self.clips.items()
+        }
+        paths = {}
+        for scene_id, future in futures.items():
             try:
-                (
-                    ffmpeg
-                    .input(input_path, ss=0, t=duration_s)
-                    .output(output_path, codec='copy')
-                    .run(quiet=True, overwrite_output=True)
-                )
-                print(f"✅ Trimmed scene {scene_id} to {duration_s}s → {output_path}")
-            except ffmpeg.Error as e:
-                print(f"❌ Error trimming scene {scene_id}: {e}")
+                paths[scene_id] = future.result()
+            except Exception as e:
+                print(f"❌ Error downloading clip for scene {scene_id}: {e}")
+        return paths
 
-if __name__ == '__main__':
-    assembler = VideoAssembler()
-    agent = VideoFinderAgent(api_key=os.getenv('PIXABAY_API_KEY'), per_page=50)
-    prompt = "Promote a short Europe travel spot highlighting no-quarantine rules."
-    script = generate_ad_script(prompt)
-    print(f"The generated script: {script}")
-    clips = agent.process_script(script)
+    def _trim_one(self, scene_id: int, input_path: str, duration_s: float) -> TrimResult:
+        output_path = os.path.join(self.temp_dir, f"scene_{scene_id}_trimmed.mp4")
+        start = time.perf_counter()
+        try:
+            (
+                ffmpeg
+                .input(input_path, ss=0, t=duration_s)
+                .output(output_path, codec='copy')
+                .run(quiet=True, overwrite_output=True)
+            )
+        except ffmpeg.Error as e:
+            stderr = e.stderr.decode(errors='replace').strip() if e.stderr else str(e)
+            return TrimResult(scene_id, None, time.perf_counter() - start, stderr)
+        except Exception as e:
+            return TrimResult(scene_id, None, time.perf_counter() - start, str(e))
+        return TrimResult(scene_id, output_path, time.perf_counter() - start)
+
+    def _trim_remote(self, scene_id: int, url: str, duration_s: float) -> TrimResult:
+        """
+        Trims straight from the clip URL. ffmpeg issues Range requests, so only
+        the container index and the first `duration_s` seconds are fetched.
+        """
+        output_path = os.path.join(self.temp_dir, f"scene_{scene_id}_trimmed.mp4")
+        start = time.perf_counter()
+        try:
+            head = requests.head(url, allow_redirects=True, timeout=10)
+            if head.headers.get("Accept-Ranges", "").lower() != "bytes":
+                # Without range support ffmpeg would end up reading the whole file anyway
+                return TrimResult(scene_id, None, time.perf_counter() - start,
+                                  "server does not support range requests", "remote")
+            (
+                ffmpeg
+                .input(url, t=duration_s, seekable=1, multiple_requests=1, reconnect=1)
+                .output(output_path, codec='copy')
+                # Fail on demuxing errors instead of writing an empty file
+                .global_args('-xerror')
+                .run(quiet=True, overwrite_output=True)
+            )
+            if os.path.getsize(output_path) < 1024:
+                return TrimResult(scene_id, None, time.perf_counter() - start,
+                                  "remote trim produced no media", "remote")
+        except ffmpeg.Error as e:
+            stderr = e.stderr.decode(errors='replace').strip() if e.stderr else str(e)
+            return TrimResult(scene_id, None, time.perf_counter() - start, stderr, "remote")
+        except Exception as e:
+            return TrimResult(scene_id, None, time.perf_counter() - start, str(e), "remote")
+        return TrimResult(scene_id, output_path, time.perf_counter() - start, source="remote")
+
+    def _traced(self, trim_fn: Callable[..., TrimResult], scene_id: int, *args) -> TrimResult:
+        """Runs one trim attempt as a timed "trim" stage."""
+        with timed("trim", scene_id=scene_id) as span:
+            result = trim_fn(scene_id, *args)
+            span["source"] = result.source
+            if result.error:
+                span["status"] = "error"
+                span["error"] = result.error[-500:]
+        return result
+
+    @staticmethod
+    def _forward(done: Future, scene_id: int, f: Future):
+        """Passes a finished trim on to `done`, turning an exception into a failed TrimResult."""
+        try:
+            result = f.result()
+        except Exception as e:
+            result = TrimResult(scene_id, None, 0.0, str(e))
+        done.set_result(result)
+
+    def _trim_remote_or_download(self, scene_id: int, clip_info: Dict, duration_s: float,
+                                 pool: ThreadPoolExecutor) -> Future:
+        """Tries a remote trim first and falls back to download-then-trim."""
+        done: Future = Future()
+
+        def on_remote(f: Future):
+            # Future callbacks swallow exceptions, so every path must resolve `done`
+            try:
+                result = f.result()
+                if result.error is None:
+                    done.set_result(result)
+                    return
+                download = self._submit_download(clip_info)
+                fallback = self._trim_when_downloaded(scene_id, download, duration_s, pool)
+            except Exception as e:
+                done.set_result(TrimResult(scene_id, None, 0.0, str(e)))
+                return
+            fallback.add_done_callback(lambda r: self._forward(done, scene_id, r))
+
+        remote = pool.submit(with_trace(self._traced), self._trim_remote, scene_id,
+                             clip_info['video_file_url'], duration_s)
+        remote.add_done_callback(on_remote)
+        return done
+
+    def _trim_when_downloaded(self, scene_id: int, download: Future, duration_s: float,
+                              pool: ThreadPoolExecutor) -> Future:
+        """Queues the scene's trim as soon as its own download finishes."""
+        done: Future = Future()
+        # Bound now; the callback runs on whichever thread finished the download
+        traced = with_trace(self._traced)
+
+        def on_downloaded(f: Future):
+            try:
+                input_path = f.result()
+            except Exception as e:
+                done.set_result(TrimResult(scene_id, None, 0.0, f"download failed: {e}"))
+                return
+            try:
+                trim = pool.submit(traced, self._trim_one, scene_id, input_path, duration_s)
+            except Exception as e:
+                # e.g. RuntimeError once the pool is shutting down
+                done.set_result(TrimResult(scene_id, None, 0.0, str(e)))
+                return
+            trim.add_done_callback(lambda t: self._forward(done, scene_id, t))
+
+        download.add_done_callback(on_downloaded)
+        return done
+
+    def trim_clips(self, max_workers: int = TRIM_WORKERS, mode: str = TRIM_MODE) -> List[TrimResult]:
+        """
+        Downloads and trims every scene's clip.
+
+        All downloads start at once, and each scene is handed to a bounded pool
+        of ffmpeg workers as soon as its own download completes, so trimming
+        overlaps with the remaining downloads. Each worker drives a separate
+        ffmpeg process, so scenes are trimmed on separate cores.
+
+        In "remote" mode ffmpeg reads each clip URL directly and stops after
+        the scene's duration, which avoids downloading large source files;
+        scenes whose server or container layout doesn't allow that fall back
+        to the download path.
+
+        Args:
+            max_workers: Concurrent ffmpeg processes; 1 trims scenes one at a time
+            mode: "download" or "remote"
+
+        Returns:
+            One TrimResult per scene, in script order
+        """
+        if mode not in ("download", "remote"):
+            raise ValueError(f"Unknown trim mode '{mode}', expected 'download' or 'remote'")
+
+        results: Dict[int, Future] = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="trim") as pool:
+            for scene in self.script:
+                scene_id = scene['scene']
+                duration_s = parse_duration(scene.get('duration'))
+                clip_info = self.clips.get(scene_id)
+                if not clip_info or duration_s <= 0:
+                    results[scene_id] = Future()
+                    error = "no clip found" if not clip_info else f"invalid scene duration {scene.get('duration')!r}"
+                    results[scene_id].set_result(TrimResult(scene_id, None, 0.0, error))
+                    continue
+
+                if mode == "remote":
+                    results[scene_id] = self._trim_remote_or_download(scene_id, clip_info, duration_s, pool)
+                else:
+                    download = self._submit_download(clip_info)
+                    results[scene_id] = self._trim_when_downloaded(scene_id, download, duration_s, pool)
+
+            # Wait inside the pool's scope so late callbacks can still submit work
+            return [future.result() for future in results.values()]
+
+    def assemble(self, trim_results: List[TrimResult], output_name: str = "final_ad.mp4",
+                 max_workers: int = TRIM_WORKERS) -> AssemblyResult:
+        """
+        Joins the trimmed scenes into the final ad.
+
+        Every clip is probed first. When all of them share codec, resolution,
+        pixel format, frame rate and timebase they are joined by stream copy
+        alone; otherwise only the clips that differ from the most common
+        profile are re-encoded to it before the stream-copy join.
+
+        Args:
+            trim_results: Output of `trim_clips`; failed scenes are skipped
+            output_name: File name inside `output_dir`
+            max_workers: Concurrent probe/re-encode processes
+
+        Returns:
+            AssemblyResult describing which path was taken
+        """
+        start = time.perf_counter()
+        clips = [r for r in trim_results if r.output_path]
+        if not clips:
+            return AssemblyResult(None, "stream_copy", [], 0.0, "no trimmed clips to assemble")
+
+        output_path = os.path.join(self.output_dir, output_name)
+        normalized = []
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="assemble") as pool:
+                profiles = list(pool.map(with_trace(probe_clip), [r.output_path for r in clips]))
+                target = common_profile(profiles)
+
+                paths = [r.output_path for r in clips]
+                jobs = []
+                for i, (clip, profile) in enumerate(zip(clips, profiles)):
+                    if profile == target:
+                        continue
+                    paths[i] = os.path.join(self.temp_dir, f"scene_{clip.scene_id}_normalized.mp4")
+                    normalized.append(clip.scene_id)
+                    jobs.append(pool.submit(with_trace(normalize_clip), clip.output_path, paths[i], target))
+                for job in jobs:
+                    job.result()
+
+            concat_copy(paths, output_path)
+        except Exception as e:
+            if isinstance(e, ffmpeg.Error) and e.stderr:
+                e = e.stderr.decode(errors='replace').strip()
+            mode = "normalized" if normalized else "stream_copy"
+            return AssemblyResult(None, mode, normalized, time.perf_counter() - start, str(e))
+
+        mode = "normalized" if normalized else "stream_copy"
+        return AssemblyResult(output_path, mode, normalized, time.perf_counter() - start)
+
+    def add_narration(self, assembled: AssemblyResult, trim_results: List[TrimResult],
+                      narration: Dict[int, NarrationResult],
+                      output_name: str = "final_ad_narrated.mp4") -> AssemblyResult:
+        """
+        Mixes each scene's voice-over into the assembled ad, starting where
+        the scene starts. Scenes that were skipped during assembly, and lines
+        that failed to synthesize, get no narration.
+
+        Returns:
+            A new AssemblyResult pointing at the narrated file, or `assembled`
+            unchanged (with `error` set) if mixing failed
+        """
+        start = time.perf_counter()
+        durations = {scene['scene']: parse_duration(scene.get('duration')) for scene in self.script}
+        lines, offset = [], 0.0
+        for result in trim_results:
+            if not result.output_path:
+                continue
+            line = narration.get(result.scene_id)
+            if line and line.audio_path:
+                lines.append((result.scene_id, offset, line.audio_path))
+            offset += durations.get(result.scene_id, 0.0)
+        if not lines:
+            return assembled
+
+        output_path = os.path.join(self.output_dir, output_name)
+        try:
+            mix_narration(assembled.output_path, [(o, path) for _, o, path in lines], output_path)
+        except Exception as e:
+            if isinstance(e, ffmpeg.Error) and e.stderr:
+                e = e.stderr.decode(errors='replace').strip()
+            return replace(assembled, error=f"narration failed: {e}")
+        return replace(assembled, output_path=output_path,
+                       wall_time_s=assembled.wall_time_s + time.perf_counter() - start,
+                       narrated_scenes=[scene_id for scene_id, _, _ in lines])
+
+    def render(self, trim_results: List[TrimResult], narration: Optional[Dict[int, NarrationResult]] = None,
+               output_name: str = "final_ad.mp4", resolution: str = TARGET_RESOLUTION,
+               preset: str = RENDER_PRESET) -> AssemblyResult:
+        """
+        Produces the final ad in a single encode: every trimmed clip is scaled
+        to `resolution`, gets its scene's on-screen text, and is joined with
+        the others while the narration is mixed over the ducked clip audio.
+
+        Args:
+            trim_results: Output of `trim_clips`; failed scenes are skipped
+            narration: Voice-over per scene, from `Narrator.collect`
+            output_name: File name inside `output_dir`
+            resolution: Output size, e.g. "1920x1080"
+            preset: Encoder preset name (see `modules.render.ENCODER_PRESETS`)
+
+        Returns:
+            AssemblyResult with mode "rendered" and the encode rate
+        """
+        start = time.perf_counter()
+        clips = [(r.scene_id, r.output_path) for r in trim_results if r.output_path]
+        if not clips:
+            return AssemblyResult(None, "rendered", [], 0.0, "no trimmed clips to assemble")
+
+        durations = {scene['scene']: parse_duration(scene.get('duration')) for scene in self.script}
+        texts = {scene['scene']: scene.get('on_screen_text', '') for scene in self.script}
+        output_path = os.path.join(self.output_dir, output_name)
+        try:
+            segments = plan_segments(clips, durations, texts)
+            # Each line starts with its scene, at the scene's real offset in the render
+            lines, offset = [], 0.0
+            for segment in segments:
+                line = (narration or {}).get(segment.scene_id)
+                if line and line.audio_path:
+                    lines.append((segment.scene_id, offset, line.audio_path))
+                offset += segment.duration_s
+            stats = render_ad(segments, output_path, parse_resolution(resolution),
+                              narration=[(o, path) for _, o, path in lines], preset=preset)
+        except Exception as e:
+            if isinstance(e, ffmpeg.Error) and e.stderr:
+                e = e.stderr.decode(errors='replace').strip()
+            return AssemblyResult(None, "rendered", [], time.perf_counter() - start, str(e))
+        return AssemblyResult(output_path, "rendered", [], time.perf_counter() - start,
+                              narrated_scenes=[scene_id for scene_id, _, _ in lines],
+                              encode_fps=stats.encode_fps)
+
+# Called with (stage, details) as each stage of `make_ad` starts and finishes
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+def make_ad(prompt: str, assembler: Optional[VideoAssembler] = None,
+            progress: Optional[ProgressCallback] = None, bypass_cache: bool = False,
+            run_id: Optional[str] = None, tts_backend: str = TTS_BACKEND,
+            assembly: str = ASSEMBLY_MODE, **pipeline_options) -> AssemblyResult:
+    """
+    Runs the whole flow for one campaign idea: script, clip search, download
+    and trim, then assembly.
+
+    Args:
+        prompt: Campaign idea
+        assembler: Assembler to use; defaults to one writing under outputs/
+        progress: Optional callback receiving (stage, details) updates
+        bypass_cache: Always generate a fresh script
+        run_id: Checkpoint the clip search under this id. Calling again with
+            the same id reuses the saved script and every scene already found;
+            checkpoints are dropped once the ad is assembled with every scene
+        tts_backend: Voice-over backend ("elevenlabs", "playht", "stub" or "none");
+            dialogue is synthesized while clips are searched and trimmed
+        assembly: "copy" or "render" (single encode with on-screen text)
+        **pipeline_options: Passed to `run_pipeline` (ranker, target_resolution, ...)
+
+    Returns:
+        AssemblyResult of the final ad; scenes it had to leave out are in
+        `missing_scenes`, and such a run keeps its checkpoints for a retry
+    """
+    if assembly not in ASSEMBLY_MODES:
+        raise ValueError(f"Unknown assembly mode '{assembly}', expected 'copy' or 'render'")
+    assembler = assembler or VideoAssembler()
+    report = progress or (lambda stage, details: None)
+
+    report("script", {"status": "started"})
+    saved = get_run_state(run_id) if run_id else None
+    if saved and saved.get("script"):
+        script = saved["script"]["scenes"]
+        report("script", {"status": "done", "scenes": len(script), "resumed": True})
+    else:
+        with timed("script"):
+            script = generate_ad_script(prompt, bypass_cache=bypass_cache)
+        report("script", {"status": "done", "scenes": len(script)})
+
+    # Voice-over is synthesized in the background while clips are found and trimmed
+    narrator = get_narrator(tts_backend)
+    narration = narrator.narrate(script) if narrator else {}
+    if narration:
+        report("narration", {"status": "started", "lines": len(narration)})
+
+    # Search all scenes concurrently through the LangGraph pipeline
+    report("search", {"status": "started"})
+    with timed("find_clips", scenes=len(script)):
+        # The prompt and every option go along so a checkpointed run records
+        # what it was for, and a failed job can be rebuilt from it
+        run_options = {"bypass_cache": bypass_cache, "tts_backend": tts_backend,
+                       "assembly": assembly, **pipeline_options}
+        result = run_pipeline(user_prompt=prompt, script=script, run_id=run_id,
+                              run_options=run_options, **pipeline_options)
+    clips, missing = {}, []
+    for clip in result["clips"]:
+        if clip.get("error"):
+            missing.append({"scene_id": clip["scene_id"], "error": clip["error"]})
+            continue
+        clips[clip["scene_id"]] = {**clip, "video_file_url": clip["video_url"]}
+    report("search", {"status": "done", "found": len(clips), "missing": missing})
     assembler.load_script_and_clips(script, clips)
 
-    assembler.trim_clips()
\ No newline at end of file
+    try:
+        report("trim", {"status": "started"})
+        with timed("download_and_trim", scenes=len(clips)):
+            trimmed = assembler.trim_clips()
+        report("trim", {
+            "status": "done",
+            "trimmed": [r.scene_id for r in trimmed if not r.error],
+            "failed": [{"scene_id": r.scene_id, "error": r.error} for r in trimmed if r.error],
+        })
+
+        lines: Dict[int, NarrationResult] = {}
+        if narration:
+            with timed("narration_wait", lines=len(narration)):
+                lines = Narrator.collect(narration)
+            report("narration", {
+                "status": "done",
+                "cached": [r.scene_id for r in lines.values() if r.cached],
+                "failed": [{"scene_id": r.scene_id, "error": r.error} for r in lines.values() if r.error],
+            })
+
+        report("assemble", {"status": "started"})
+        with timed("assemble") as span:
+            if assembly == "render":
+                resolution = pipeline_options.get("target_resolution", TARGET_RESOLUTION)
+                final = assembler.render(trimmed, lines, resolution=resolution)
+            else:
+                final = assembler.assemble(trimmed)
+                if lines and not final.error:
+                    final = assembler.add_narration(final, trimmed, lines)
+            span.update(mode=final.mode, normalized=len(final.normalized_scenes))
+            if final.error:
+                span["status"] = "error"
+                span["error"] = final.error[-500:]
+        missing_scenes = sorted({m["scene_id"] for m in missing} | {r.scene_id for r in trimmed if r.error})
+        final = replace(final, missing_scenes=missing_scenes)
+        report("assemble", {"status": "failed" if final.error else "done", "mode": final.mode,
+                            "output_path": final.output_path, "error": final.error,
+                            "encode_fps": final.encode_fps, "missing_scenes": missing_scenes})
+    finally:
+        # Source clips stay pinned in the shared cache only while this run uses them
+        assembler.release_clips()
+    # A partial ad keeps its checkpoints, so a resume only retries the scenes that failed
+    if run_id and not final.error and not final.missing_scenes:
+        delete_checkpoints(run_id)
+    return final
+
+if __name__ == '__main__':
+    prompt = "Promote a short Europe travel spot highlighting no-quarantine rules."
+    final = make_ad(prompt, progress=lambda stage, details: print(f"[{stage}] {details}"))
+    if final.error:
+        print(f"Assembly failed: {final.error}")
+    else:
+        if final.missing_scenes:
+            print(f"Scenes {final.missing_scenes} have no clip and were left out")
+        print(f"Final ad ({final.mode}, re-encoded scenes {final.normalized_scenes}): "
+              f"{final.output_path} ({final.wall_time_s:.2f}s)")
@@ -4,8 +4,15 @@ This module handles database configuration and operations.
 
 import os
 import json
+import queue
+import threading
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
+from utils.metrics import timed, DB_ROWS
 
 # Load environment variables
 load_dotenv()
@@ -17,10 +24,23 @@ DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
+# Connection pool and background writer settings
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "5"))
+DB_WRITE_QUEUE_SIZE = int(os.getenv("DB_WRITE_QUEUE_SIZE", "1000"))
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "100"))
+# How long a caller may block on a full queue before the write is rejected
+DB_WRITE_ENQUEUE_TIMEOUT_S = float(os.getenv("DB_WRITE_ENQUEUE_TIMEOUT_S", "2"))
+
+INSERT_SCRIPTS_QUERY = "INSERT INTO scripts (user_prompt, script) VALUES %s"
+
+_pool: Optional[ThreadedConnectionPool] = None
+_writer: Optional["ScriptWriter"] = None
+
 def get_db_connection():
     """
     Creates and returns a connection to the PostgreSQL database.
-    
+
     Returns:
         A connection object to the database
     """
@@ -32,33 +52,208 @@ def get_db_connection():
         port=DB_PORT
     )
 
+def init_db_pool(minconn: int = DB_POOL_MIN, maxconn: int = DB_POOL_MAX) -> ThreadedConnectionPool:
+    """
+    Creates the process-wide connection pool. Call once at application startup.
+
+    Args:
+        minconn: Connections opened up front
+        maxconn: Upper bound on open connections
+
+    Returns:
+        The connection pool
+    """
+    global _pool
+    if _pool is None:
+        _pool = ThreadedConnectionPool(
+            minconn,
+            maxconn,
+            dbname=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            host=DB_HOST,
+            port=DB_PORT
+        )
+    return _pool
+
+def close_db_pool():
+    """
+    Closes every connection in the pool.
+    """
+    global _pool
+    if _pool is not None:
+        _pool.closeall()
+        _pool = None
+
+@contextmanager
+def pooled_connection():
+    """
+    Yields a connection from the pool, or a fresh one if no pool was created.
+    """
+    if _pool is None:
+        connection = get_db_connection()
+        try:
+            yield connection
+        finally:
+            connection.close()
+        return
+
+    connection = _pool.getconn()
+    try:
+        yield connection
+    except Exception:
+        # Don't hand a connection in an unknown state back to the pool
+        _pool.putconn(connection, close=True)
+        raise
+    else:
+        _pool.putconn(connection)
+
+def insert_scripts(rows: List[Tuple[str, str]]):
+    """
+    Inserts several scripts in one multi-row INSERT.
+
+    Args:
+        rows: (campaign_idea, script JSON) tuples
+    """
+    try:
+        with timed("db_write", rows=len(rows)), pooled_connection() as connection:
+            try:
+                with connection.cursor() as cursor:
+                    execute_values(cursor, INSERT_SCRIPTS_QUERY, rows)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+    except Exception:
+        DB_ROWS.inc(len(rows), status="error")
+        raise
+    DB_ROWS.inc(len(rows), status="ok")
+
+
+class ScriptWriter:
+    """
+    Background writer that takes script inserts off the request path.
+
+    Requests enqueue scripts; a single worker thread drains the queue and
+    writes whatever has accumulated as one batched INSERT. The queue is
+    bounded, so under sustained overload `submit` blocks and then rejects
+    instead of growing without limit, and `stop` flushes everything queued
+    before returning.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        max_queue: int = DB_WRITE_QUEUE_SIZE,
+        batch_size: int = DB_WRITE_BATCH_SIZE,
+        enqueue_timeout: float = DB_WRITE_ENQUEUE_TIMEOUT_S,
+    ):
+        """
+        Args:
+            max_queue: Maximum number of scripts waiting to be written
+            batch_size: Maximum rows per INSERT
+            enqueue_timeout: Seconds `submit` waits for room in a full queue
+        """
+        self.batch_size = batch_size
+        self.enqueue_timeout = enqueue_timeout
+        self.written = 0
+        self.failed = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Starts the worker thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="script-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, campaign_idea: str, script: list):
+        """
+        Queues a script for insertion.
+
+        Raises:
+            queue.Full: If the queue stays full for `enqueue_timeout` seconds
+        """
+        self._queue.put((campaign_idea, json.dumps(script)), timeout=self.enqueue_timeout)
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Writes every queued script, then stops the worker thread.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            # Collect whatever else is already waiting, up to one batch
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if self._STOP in batch:
+                stopping = True
+                batch = [row for row in batch if row is not self._STOP]
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, rows: List[Tuple[str, str]]):
+        try:
+            insert_scripts(rows)
+            self.written += len(rows)
+            print(f"Inserted {len(rows)} script(s) successfully!")
+        except Exception as error:
+            self.failed += len(rows)
+            print(f"Error while inserting {len(rows)} script(s): {error}")
+
+
+def start_script_writer() -> ScriptWriter:
+    """
+    Starts the process-wide background writer used by `store_script_in_db`.
+    """
+    global _writer
+    if _writer is None:
+        _writer = ScriptWriter()
+        _writer.start()
+    return _writer
+
+def stop_script_writer():
+    """
+    Drains and stops the background writer.
+    """
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
 def store_script_in_db(campaign_idea: str, script: list):
     """
     Stores the generated script into the PostgreSQL database.
-    
+
+    When the background writer is running the script is only queued, and
+    the insert happens off the caller's thread; otherwise it is written
+    immediately.
+
     Args:
         campaign_idea: The original user prompt/campaign idea
         script: The generated script as a list of scene dictionaries
+
+    Raises:
+        queue.Full: If the background writer is saturated
     """
-    connection = None
-    try:
-        # Connect to the PostgreSQL database
-        connection = get_db_connection()
-        cursor = connection.cursor()
+    if _writer is not None:
+        _writer.submit(campaign_idea, script)
+        return
 
-        # Insert the script into the scripts table
-        insert_query = """
-        INSERT INTO scripts (user_prompt, script)
-        VALUES (%s, %s)
-        """
-        cursor.execute(insert_query, (campaign_idea, json.dumps(script)))
-        connection.commit()
+    try:
+        insert_scripts([(campaign_idea, json.dumps(script))])
         print("Script inserted successfully!")
-
     except Exception as error:
         print(f"Error while inserting script: {error}")
-    finally:
-        # Close the database connection
-        if connection:
-            cursor.close()
-            connection.close()
@@ -0,0 +1,38 @@
+"""
+This module loads and shares sentence-transformers models.
+"""
+
+import os
+import threading
+from typing import Dict
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Default text embedding model; small enough to run on CPU per request
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")
+
+_models: Dict[str, object] = {}
+_models_lock = threading.Lock()
+
+def get_sentence_model(model_name: str = EMBEDDING_MODEL):
+    """
+    Returns a SentenceTransformer, loading it once per process.
+
+    Args:
+        model_name: Model name or local path understood by sentence-transformers
+
+    Returns:
+        A shared SentenceTransformer instance
+    """
+    model = _models.get(model_name)
+    if model is None:
+        with _models_lock:
+            model = _models.get(model_name)
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(model_name, device=EMBEDDING_DEVICE)
+                _models[model_name] = model
+    return model
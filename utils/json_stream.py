@@ -0,0 +1,82 @@
+"""
+This module parses a JSON array of objects incrementally, as text streams in.
+"""
+
+import json
+from typing import Any, Dict, List
+
+class SceneStreamParser:
+    """
+    Incremental parser for the scene array produced by the script LLM.
+
+    Feed it completion text chunk by chunk; each call returns the scene objects
+    whose closing brace arrived in that chunk. Any text before the first "["
+    (e.g. "Here is your script:") is skipped, mirroring the find("[") fallback
+    in `modules.script.generate_ad_script`.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.scenes: List[Dict[str, Any]] = []
+        self._pos = 0             # next character of `buffer` to scan
+        self._array_started = False
+        self._array_closed = False
+        self._depth = 0           # nesting depth; 1 means directly inside the array
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+
+    @property
+    def done(self) -> bool:
+        """True once the closing "]" of the scene array has been seen."""
+        return self._array_closed
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Consumes a chunk of completion text.
+
+        Args:
+            chunk: The next piece of streamed text
+
+        Returns:
+            Scene dicts completed by this chunk, in order
+
+        Raises:
+            json.JSONDecodeError: If a completed object is not valid JSON
+        """
+        self.buffer += chunk
+        completed = []
+
+        while self._pos < len(self.buffer) and not self._array_closed:
+            ch = self.buffer[self._pos]
+
+            if not self._array_started:
+                if ch == "[":
+                    self._array_started = True
+                    self._depth = 1
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if ch == "{" and self._depth == 1:
+                    self._object_start = self._pos
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if ch == "}" and self._depth == 1 and self._object_start is not None:
+                    scene = json.loads(self.buffer[self._object_start:self._pos + 1])
+                    self._object_start = None
+                    self.scenes.append(scene)
+                    completed.append(scene)
+                elif self._depth == 0:
+                    self._array_closed = True
+
+            self._pos += 1
+
+        return completed
@@ -0,0 +1,48 @@
+"""
+This module provides lazily built, process-wide singletons.
+
+Clients, chains and models are expensive to import and construct, so modules
+expose them through `@singleton` getters instead of building them at import
+time. The first call builds the object; later calls from any thread get the
+same instance.
+"""
+
+import threading
+from functools import wraps
+from typing import Callable, List, TypeVar
+
+T = TypeVar("T")
+
+
+def singleton(factory: Callable[[], T]) -> Callable[[], T]:
+    """
+    Turns a zero-argument factory into a thread-safe, build-once getter.
+
+    Usage:
+        @singleton
+        def get_script_chain() -> Runnable:
+            from langchain_groq import ChatGroq
+            ...
+
+    The getter gains `is_built()` and `reset()` (the latter for tests and
+    configuration changes).
+    """
+    lock = threading.Lock()
+    state: List[T] = []
+
+    @wraps(factory)
+    def get() -> T:
+        if not state:
+            with lock:
+                if not state:
+                    state.append(factory())
+        return state[0]
+
+    def reset():
+        with lock:
+            state.clear()
+
+    get.is_built = lambda: bool(state)
+    get.reset = reset
+    return get
+
@@ -0,0 +1,307 @@
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import bisect
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ——— CONFIG ———
+# "0" silences the JSON trace log; metrics are always collected
+TRACE_LOG_ENABLED = os.getenv("TRACE_LOG_ENABLED", "1") != "0"
+# Append trace events to this file instead of stderr
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH")
+
+# Stage latencies range from a cache hit to a full render
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelValues = Tuple[str, ...]
+T = TypeVar("T")
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items
+        ]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, set by the caller."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items
+        ]
+
+
+class Histogram(_Metric):
+    """Bucketed distribution with a running sum and count per label set."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., +Inf count], sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(c), t[0])) for key, (c, t) in self._values.items())
+        lines = self._header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = ("le", _format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Holds metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for m in metrics for line in m.render()) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ——— METRICS ———
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "ad_stage_seconds", "Wall time of each pipeline stage", ("stage", "status")))
+LLM_SECONDS = REGISTRY.register(Histogram(
+    "ad_llm_request_seconds", "Wall time of LLM calls, including rate-limit waits", ("caller", "model", "status")))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "ad_llm_tokens_total", "Tokens reported by the LLM API", ("caller", "kind")))
+PIXABAY_REQUESTS = REGISTRY.register(Counter(
+    "ad_pixabay_requests_total", "Pixabay searches by cache outcome and result", ("cache", "status")))
+DOWNLOAD_BYTES = REGISTRY.register(Counter(
+    "ad_download_bytes_total", "Clip bytes fetched over the network"))
+CLIP_CACHE = REGISTRY.register(Counter(
+    "ad_clip_cache_total", "Clip downloads served from the local cache or fetched", ("result",)))
+IMAGE_EMBEDDINGS = REGISTRY.register(Counter(
+    "ad_image_embedding_cache_total", "Thumbnail embeddings served from the persistent cache or computed", ("result",)))
+TTS_CACHE = REGISTRY.register(Counter(
+    "ad_tts_cache_total", "Narration lines served from the audio cache or synthesized", ("result",)))
+DB_ROWS = REGISTRY.register(Counter(
+    "ad_db_rows_total", "Script rows written to Postgres", ("status",)))
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    "ad_http_request_seconds", "API request latency", ("method", "route", "status")))
+RATE_LIMIT = REGISTRY.register(Gauge(
+    "ad_rate_limiter", "Shared rate limiter state", ("api", "field")))
+JOBS = REGISTRY.register(Gauge(
+    "ad_jobs", "Full-video jobs known to the API process", ("status",)))
+
+
+# ——— TRACING ———
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+
+_logger = logging.getLogger("video_app.trace")
+_logger.propagate = False
+if TRACE_LOG_ENABLED and not _logger.handlers:
+    _handler = logging.FileHandler(TRACE_LOG_PATH) if TRACE_LOG_PATH else logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    _logger.addHandler(_handler)
+    _logger.setLevel(logging.INFO)
+
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+@contextmanager
+def trace_context(trace_id: Optional[str] = None) -> Iterator[str]:
+    """
+    Tags every trace event inside the block with `trace_id` (a new one if omitted).
+
+    Thread pools don't inherit it; wrap tasks with `with_trace` when submitting.
+    """
+    trace_id = trace_id or uuid.uuid4().hex
+    token = _trace_id.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        _trace_id.reset(token)
+
+
+def with_trace(fn: Callable[..., T]) -> Callable[..., T]:
+    """Binds the current trace id to `fn`, for running it on another thread."""
+    trace_id = _trace_id.get()
+
+    def run(*args, **kwargs) -> T:
+        token = _trace_id.set(trace_id)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _trace_id.reset(token)
+    return run
+
+
+def trace(event: str, **fields):
+    """Writes one JSON trace line tagged with the current trace id."""
+    if not TRACE_LOG_ENABLED:
+        return
+    record = {"ts": round(time.time(), 6), "event": event, "trace_id": _trace_id.get(), **fields}
+    _logger.info(json.dumps(record, default=str))
+
+
+@contextmanager
+def timed(stage: str, **fields) -> Iterator[Dict[str, Any]]:
+    """
+    Times a block as pipeline stage `stage`.
+
+    Records `ad_stage_seconds` and a "stage" trace event. The yielded dict is
+    merged into the trace event, so the block can attach details such as
+    byte counts. Exceptions are recorded with status "error" and re-raised.
+
+    Usage:
+        with timed("download", key=key) as span:
+            ...
+            span["bytes"] = size
+    """
+    span: Dict[str, Any] = dict(fields)
+    status = "ok"
+    start = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        status = "error"
+        span.setdefault("error", str(e) or type(e).__name__)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        status = span.pop("status", status)
+        STAGE_SECONDS.observe(duration, stage=stage, status=status)
+        trace("stage", stage=stage, status=status, duration_s=round(duration, 6), **span)
+
+
+@contextmanager
+def llm_call(caller: str, model: str) -> Iterator[Dict[str, Any]]:
+    """
+    Times one LLM request. Set `prompt_tokens` and `completion_tokens` on the
+    yielded dict from the API's usage report to count tokens.
+    """
+    span: Dict[str, Any] = {}
+    status = "ok"
+    start = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        status = "error"
+        span["error"] = str(e) or type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        LLM_SECONDS.observe(duration, caller=caller, model=model, status=status)
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if span.get(kind):
+                LLM_TOKENS.inc(span[kind], caller=caller, kind=kind.split("_")[0])
+        trace("llm", caller=caller, model=model, status=status, duration_s=round(duration, 6), **span)
+
+
+def record_rate_limiters(stats: Dict[str, Dict[str, Any]]):
+    """Copies `RateLimiter.stats()` per API into the `ad_rate_limiter` gauge."""
+    for api, values in stats.items():
+        for field, value in values.items():
+            RATE_LIMIT.set(value, api=api, field=field)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List
 
 # Define the Pydantic models for the script output
 class Scene(BaseModel):
@@ -18,4 +18,7 @@ class SearchTermsOutput(BaseModel):
     queries: List[str]
 
 class RankVideoOutput(BaseModel):
-    best_index: int  # zero‑based index of the single best clip
\ No newline at end of file
+    best_index: int  # zero‑based index of the single best clip
+
+class AssignmentOutput(BaseModel):
+    rankings: Dict[str, List[int]]  # scene id -> candidate indices, best first
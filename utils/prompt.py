@@ -1,11 +1,11 @@
-from langchain.prompts import PromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from utils.models import ScriptOutput, SearchTermsOutput, RankVideoOutput
+from typing import Optional
+from utils.lazy import singleton
+
+# LangChain is slow to import, so prompt templates and parsers are built on
+# first use; the templates themselves are plain strings.
 
 # 1) Script generation prompt
-script_parser = PydanticOutputParser(pydantic_object=ScriptOutput)
-script_prompt = PromptTemplate(
-    template="""
+SCRIPT_TEMPLATE = """
 You are an expert ad scriptwriter.
 
 Your task is to help a client transform their campaign idea into a **unique and imaginative** 30-second (or whatever length the client wants) video script.
@@ -34,99 +34,158 @@ Your output should be in JSON format with 2–4 creative scenes (total duration
 {format_instructions}
 
 Client's campaign idea: {user_prompt}
-""",
-    input_variables=["user_prompt"],
-    partial_variables={"format_instructions": script_parser.get_format_instructions()}
-)
+"""
+
+@singleton
+def get_script_parser():
+    from langchain.output_parsers import PydanticOutputParser
+    from utils.models import ScriptOutput
+    return PydanticOutputParser(pydantic_object=ScriptOutput)
+
+@singleton
+def get_script_prompt():
+    from langchain.prompts import PromptTemplate
+    return PromptTemplate(
+        template=SCRIPT_TEMPLATE,
+        input_variables=["user_prompt"],
+        partial_variables={"format_instructions": get_script_parser().get_format_instructions()}
+    )
+
+# The raw Groq API path parses a bare array keyed by `scene`, so it gets this
+# instead of the ScriptOutput parser's format instructions
+SCRIPT_ARRAY_INSTRUCTIONS = "Respond only with the JSON array of scenes shown above: no wrapping object, no other text."
+
+def get_ad_script_prompt(user_prompt: str) -> dict:
+    """
+    Returns the chat messages used by `modules.script` for the raw Groq API.
+
+    Args:
+        user_prompt: The client's campaign idea
+
+    Returns:
+        Dictionary containing the system_prompt and user_prompt
+    """
+    return {
+        "system_prompt": "You are an expert ad scriptwriter. Respond only with the JSON array of scenes.",
+        "user_prompt": SCRIPT_TEMPLATE.format(format_instructions=SCRIPT_ARRAY_INSTRUCTIONS, user_prompt=user_prompt),
+    }
 
 # ——— VIDEO FINDER ———
+# Kept short: Groq latency grows with prompt tokens, and the structured
+# outputs below need no format instructions beyond the example.
 # 1) Search terms prompt
-search_terms_parser = PydanticOutputParser(pydantic_object=SearchTermsOutput)
-search_terms_prompt = PromptTemplate(
-    template="""
-I need to find ONE perfect video clip that precisely matches this scene description:
+SEARCH_TERMS_TEMPLATE = """Scene: "{scene_description}"
 
-"{scene_description}"
+Give 3 specific Pixabay video search queries for this scene: distinctive visual elements, actions, settings.
+Reply with JSON only, e.g. {{"queries": ["sunset beach", "palm trees", "gentle waves"]}}
+"""
 
-Generate 3 highly specific search queries for Pixabay.
-Focus on distinctive visual elements, actions, and settings.
-List only the queries as a JSON array under the key "queries".
+# Same request for callers that parse plain lines instead of JSON
+SEARCH_TERMS_LINES_TEMPLATE = """Scene: "{scene_description}"
 
-For example:
-{{"queries": ["sunset beach", "palm trees", "gentle waves"]}}
+Give 3 specific Pixabay video search queries for this scene: distinctive visual elements, actions, settings.
+Reply with the queries only, one per line, no numbering.
+"""
 
-""",
-    input_variables=["scene_description"],
-    partial_variables={"format_instructions": search_terms_parser.get_format_instructions()}
-)
+@singleton
+def get_search_terms_parser():
+    from langchain.output_parsers import PydanticOutputParser
+    from utils.models import SearchTermsOutput
+    return PydanticOutputParser(pydantic_object=SearchTermsOutput)
 
-# 2) Ranking prompt
-rank_video_parser = PydanticOutputParser(pydantic_object=RankVideoOutput)
-rank_videos_prompt = PromptTemplate(
-    template="""
-I need to find THE SINGLE BEST video clip that perfectly matches this scene description:
+@singleton
+def get_search_terms_prompt():
+    from langchain.prompts import PromptTemplate
+    return PromptTemplate(template=SEARCH_TERMS_TEMPLATE, input_variables=["scene_description"])
 
+# 2) Ranking prompt; `video_info` is a table from `utils.prompt_budget.encode_candidates`
+RANK_VIDEOS_TEMPLATE = """Pick THE SINGLE BEST stock clip for this scene:
 "{scene_description}"
 
-Here are potential video options from Pixabay (up to 10), formatted as a JSON list under the key "options":
-
+Candidates (i = index, sec = duration, res = height, views):
 {video_info}
 
-Carefully analyze the tags and attributes. Then return ONLY the JSON output, nothing else.
-
-Output format:
-{{"best_index": <zero-based index of best video>}}
-
-DO NOT explain your reasoning.
-DO NOT include any text before or after the JSON.
-""",
-    input_variables=["scene_description", "video_info"],
-    partial_variables={"format_instructions": rank_video_parser.get_format_instructions()}
-)
-
-
-# def get_video_finder_prompts(scene_description: str, video_info_text: str = None) -> dict:
-#     """
-#     Returns the prompts for the video finder agent.
+Reply with JSON only: {{"best_index": <i>}}
+"""
 
-#     Args:
-#         scene_description: Natural language description of the scene
-#         video_info_text: Optional text containing information about videos to rank
+@singleton
+def get_rank_video_parser():
+    from langchain.output_parsers import PydanticOutputParser
+    from utils.models import RankVideoOutput
+    return PydanticOutputParser(pydantic_object=RankVideoOutput)
 
-#     Returns:
-#         Dictionary containing the search_terms_prompt and rank_videos_prompt
-#     """
-#     # Prompt for generating search terms
-#     search_terms_prompt = f"""
-#     I need to find ONE perfect video clip that precisely matches this scene description:
+@singleton
+def get_rank_videos_prompt():
+    from langchain.prompts import PromptTemplate
+    return PromptTemplate(template=RANK_VIDEOS_TEMPLATE, input_variables=["scene_description", "video_info"])
 
-#     "{scene_description}"
+# 3) Script-level assignment prompt: one call ranks candidates for every scene.
+# `scenes` lists each scene with the candidate indices it may use; `video_info`
+# is the table of all candidates from `encode_candidates`.
+ASSIGN_CLIPS_TEMPLATE = """Pick stock clips for every scene of an ad. Each scene needs its own clip.
 
-#     Generate 3 highly specific search queries I should use to find this exact video on Pixabay.
-#     Focus on the most distinctive visual elements, actions, and settings that would be present.
-#     Be precise and concrete rather than abstract or conceptual.
+Scenes (id: description; allowed candidates):
+{scenes}
 
-#     List only the search terms, each on a new line, without numbering or additional explanations.
-#     """
-
-#     # Prompt for ranking videos (only used if video_info_text is provided)
-#     rank_videos_prompt = None
-#     if video_info_text:
-#         rank_videos_prompt = f"""
-#         I need to find THE SINGLE BEST video clip that perfectly matches this scene description:
-
-#         "{scene_description}"
-
-#         Here are potential video options from Pixabay:
-
-#         {video_info_text}
-
-#         Analyze each video's tags and attributes carefully. Consider how well each video would visually represent the scene.
+Candidates (i = index, sec = duration, res = height, views):
+{video_info}
 
-#         Return ONLY the number of the single best video (e.g., "3"). Do not return multiple numbers or any other text.
-#         """
+For each scene, list its 3 best allowed candidates, best first.
+Reply with JSON only: {{"rankings": {{"<scene id>": [<i>, <i>, <i>]}}}}
+"""
+
+@singleton
+def get_assignment_parser():
+    from langchain.output_parsers import PydanticOutputParser
+    from utils.models import AssignmentOutput
+    return PydanticOutputParser(pydantic_object=AssignmentOutput)
+
+@singleton
+def get_assign_clips_prompt():
+    from langchain.prompts import PromptTemplate
+    return PromptTemplate(template=ASSIGN_CLIPS_TEMPLATE, input_variables=["scenes", "video_info"])
+
+def get_video_finder_prompts(scene_description: str, video_info_text: Optional[str] = None) -> dict:
+    """
+    Returns the prompts `modules.video_finder` sends to the raw Groq API.
+
+    Args:
+        scene_description: Natural language description of the scene
+        video_info_text: Optional candidate table from `encode_candidates`
+
+    Returns:
+        Dictionary containing the search_terms_prompt and rank_videos_prompt
+        (None when no candidates were given)
+    """
+    rank_videos_prompt = None
+    if video_info_text:
+        rank_videos_prompt = RANK_VIDEOS_TEMPLATE.format(
+            scene_description=scene_description, video_info=video_info_text
+        )
+    return {
+        "search_terms_prompt": SEARCH_TERMS_LINES_TEMPLATE.format(scene_description=scene_description),
+        "rank_videos_prompt": rank_videos_prompt,
+    }
+
+def warm_prompts():
+    """Builds every prompt template and parser."""
+    for getter in (get_script_prompt, get_search_terms_prompt, get_search_terms_parser,
+                   get_rank_videos_prompt, get_rank_video_parser,
+                   get_assign_clips_prompt, get_assignment_parser):
+        getter()
+
+# The old module-level names still resolve, built on first access
+_LAZY_ATTRIBUTES = {
+    "script_parser": get_script_parser,
+    "script_prompt": get_script_prompt,
+    "search_terms_parser": get_search_terms_parser,
+    "search_terms_prompt": get_search_terms_prompt,
+    "rank_video_parser": get_rank_video_parser,
+    "rank_videos_prompt": get_rank_videos_prompt,
+}
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-#     return {
-#         "search_terms_prompt": search_terms_prompt,
-#         "rank_videos_prompt": rank_videos_prompt
-#     }
\ No newline at end of file
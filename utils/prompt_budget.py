@@ -0,0 +1,121 @@
+"""
+This module keeps LLM prompts small: token counting, a compact encoding of
+ranking candidates, and trimming candidates to a per-call token budget.
+"""
+
+import os
+import re
+from typing import Any, Callable, Dict, List, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# ——— CONFIG ———
+# Upper bound on the prompt tokens of one ranking call; candidates are
+# dropped from the end of the list until the prompt fits
+RANK_PROMPT_TOKEN_BUDGET = int(os.getenv("RANK_PROMPT_TOKEN_BUDGET", "600"))
+# Most candidates shown to the LLM in one ranking call
+RANK_MAX_CANDIDATES = int(os.getenv("RANK_MAX_CANDIDATES", "10"))
+# Completion caps for structured outputs: {"best_index": 12} and three short queries
+RANK_MAX_TOKENS = int(os.getenv("RANK_MAX_TOKENS", "16"))
+SEARCH_TERMS_MAX_TOKENS = int(os.getenv("SEARCH_TERMS_MAX_TOKENS", "60"))
+# Script-level assignment answers three indices per scene
+ASSIGN_MAX_TOKENS_PER_SCENE = 16
+
+# Words, runs of up to three digits and single punctuation marks, which is
+# roughly how BPE tokenizers split English text and numbers
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Approximate token count of `text` for the Groq-hosted models.
+
+    Counts words, digit groups and punctuation; words longer than eight
+    letters count once more per eight letters, as tokenizers split them.
+    """
+    return sum(1 + (len(piece) - 1) // 8 for piece in _TOKEN_PATTERN.findall(text))
+
+
+def compact_number(value: Any) -> str:
+    """Formats a count the way people skim it: 208001 -> "208k"."""
+    try:
+        n = float(value or 0)
+    except (TypeError, ValueError):
+        return "0"
+    for limit, suffix in ((1e9, "b"), (1e6, "m"), (1e3, "k")):
+        if n >= limit:
+            return f"{n / limit:.0f}{suffix}"
+    return f"{n:.0f}"
+
+
+def split_tags(tags: str) -> List[str]:
+    """
+    Splits a Pixabay tag string and removes repetition: exact duplicates, and
+    single words already contained in a longer tag ("beach" next to "sunset beach").
+    """
+    unique = list(dict.fromkeys(t.strip().lower() for t in (tags or "").split(",") if t.strip()))
+    phrase_words = {word for tag in unique if " " in tag for word in tag.split()}
+    return [tag for tag in unique if " " in tag or tag not in phrase_words]
+
+
+def _resolution(video: Dict[str, Any]) -> str:
+    heights = [f.get("height", 0) for f in (video.get("videos") or {}).values() if f.get("url")]
+    return f"{max(heights)}p" if heights else "?"
+
+
+def encode_candidates(videos: List[Dict[str, Any]]) -> str:
+    """
+    Encodes ranking candidates as a compact table, one row per option.
+
+    Tags every option shares are listed once above the table, so rows only
+    carry what tells the options apart. Indexes are zero-based positions in
+    `videos`.
+
+    Example:
+        shared tags: beach, sea
+        i|sec|res|views|tags
+        0|17|1080p|208k|waves, sand
+        1|12|2160p|45k|sunset, palm trees
+    """
+    tag_lists = [split_tags(v.get("tags", "")) for v in videos]
+    shared = set.intersection(*map(set, tag_lists)) if len(tag_lists) > 1 else set()
+
+    lines = []
+    if shared:
+        lines.append("shared tags: " + ", ".join(t for t in tag_lists[0] if t in shared))
+    lines.append("i|sec|res|views|tags")
+    for i, (video, tags) in enumerate(zip(videos, tag_lists)):
+        distinct = ", ".join(t for t in tags if t not in shared) or "-"
+        lines.append(f"{i}|{video.get('duration', 0)}|{_resolution(video)}|{compact_number(video.get('views'))}|{distinct}")
+    return "\n".join(lines)
+
+
+def fit_candidates(
+    videos: List[Dict[str, Any]],
+    render: Callable[[str], str],
+    budget: int = RANK_PROMPT_TOKEN_BUDGET,
+    max_candidates: int = RANK_MAX_CANDIDATES,
+) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Picks how many candidates a ranking prompt can carry.
+
+    Candidates are kept in order and dropped from the end until the full
+    prompt fits in `budget` tokens; at least one is always kept.
+
+    Args:
+        videos: Candidates, most promising first
+        render: Builds the full prompt from an encoded candidate table
+        budget: Prompt token budget
+        max_candidates: Most candidates to consider
+
+    Returns:
+        (the candidates that fit, their encoded table)
+    """
+    kept = list(videos[:max_candidates])
+    table = encode_candidates(kept)
+    while len(kept) > 1 and count_tokens(render(table)) > budget:
+        kept.pop()
+        table = encode_candidates(kept)
+    return kept, table
@@ -0,0 +1,186 @@
+"""
+This module provides a persistent, size-bounded cache for Pixabay search responses.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Cache configuration
+SEARCH_CACHE_PATH = os.getenv("PIXABAY_CACHE_PATH", os.path.join(".cache", "pixabay_search.sqlite"))
+# Pixabay asks clients to cache search results for 24 hours
+SEARCH_CACHE_TTL_S = float(os.getenv("PIXABAY_CACHE_TTL_S", str(24 * 60 * 60)))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("PIXABAY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SEARCH_CACHE_ENABLED = os.getenv("PIXABAY_CACHE_ENABLED", "1") != "0"
+
+class SearchCache:
+    """
+    SQLite-backed cache of Pixabay search responses keyed by (query, page, per_page).
+
+    Entries older than `ttl_s` are treated as misses. Once the stored payloads
+    exceed `max_bytes`, the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = SEARCH_CACHE_PATH,
+        ttl_s: float = SEARCH_CACHE_TTL_S,
+        max_bytes: int = SEARCH_CACHE_MAX_BYTES,
+    ):
+        """
+        Args:
+            path: SQLite database file, or ":memory:"
+            ttl_s: Seconds an entry stays valid
+            max_bytes: Upper bound on the total size of cached payloads
+        """
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL with relaxed syncing keeps the per-hit access-time update cheap
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS search_cache (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS search_cache_accessed ON search_cache (accessed_at)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(query: str, page: int, per_page: int) -> str:
+        """Builds the cache key; queries are compared case- and whitespace-insensitively."""
+        normalized = " ".join(query.lower().split())
+        return f"{normalized}|{page}|{per_page}"
+
+    def get(self, query: str, page: int = 1, per_page: int = 20) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached response, or None on a miss or expired entry.
+        """
+        key = self.make_key(query, page, per_page)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_s:
+                if row is not None:
+                    self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, query: str, page: int, per_page: int, response: Dict[str, Any]):
+        """
+        Stores a response and evicts least recently used entries if over the byte limit.
+        """
+        key = self.make_key(query, page, per_page)
+        payload = json.dumps(response, separators=(",", ":"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO search_cache (key, response, size, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (key, payload, len(payload), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute(
+            "DELETE FROM search_cache WHERE created_at < ?", (now - self.ttl_s,)
+        )
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM search_cache"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evict = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM search_cache ORDER BY accessed_at ASC"
+        ):
+            if total <= self.max_bytes:
+                break
+            evict.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM search_cache WHERE key = ?", evict)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns hit/miss counters and the current size of the cache.
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM search_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def clear(self):
+        """Removes every entry and resets the counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM search_cache")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache: Optional[SearchCache] = None
+_shared_lock = threading.Lock()
+
+def get_search_cache() -> Optional[SearchCache]:
+    """
+    Returns the process-wide SearchCache, or None if caching is disabled
+    via PIXABAY_CACHE_ENABLED=0.
+    """
+    global _shared_cache
+    if not SEARCH_CACHE_ENABLED:
+        return None
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = SearchCache()
+    return _shared_cache